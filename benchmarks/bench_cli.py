@@ -0,0 +1,53 @@
+# End-to-end CLI latency and peak RSS against the local stub server, each run is a fresh process:
+#
+#   python -m benchmarks.bench_cli --things 5000
+
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.common import install_argument_parser, start_stub, report, Result
+
+
+COMMANDS = (
+    ("qozy things", ["things"]),
+    ("qozy --cache things", ["--cache", "things"]),
+    ("qozy bridges", ["bridges"]),
+    ("qozy thing set", ["thing", "thing-0", "set", "switch0", "on"]),
+    ("qozy rules", ["rules"]),
+)
+
+
+def run_cli(port, arguments, cache_directory):
+    command = [sys.executable, "-c", "from qozy_client.cli import main; main()", "--host", "127.0.0.1", "--port", str(port), "--no-colors"]
+
+    start = time.perf_counter()
+    subprocess.run(command + arguments, stdout=subprocess.DEVNULL, check=True, env=dict(os.environ, QOZY_CACHE_DIR=cache_directory))
+
+    return time.perf_counter() - start
+
+
+def main():
+    opts = install_argument_parser("Benchmark the qozy CLI against a stub daemon").parse_args()
+
+    results = []
+
+    # the state cache is in a directory of its own instead of the user's
+    with start_stub(opts) as server, tempfile.TemporaryDirectory() as cache_directory:
+        for name, arguments in COMMANDS:
+            run_cli(server.port, arguments, cache_directory)
+
+            timings = [run_cli(server.port, arguments, cache_directory) for _ in range(opts.repeat)]
+
+            # ru_maxrss is the peak of all waited-for children so far, in KiB on Linux
+            peak_memory = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024
+
+            results.append(Result(name, timings, peak_memory, 1))
+
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
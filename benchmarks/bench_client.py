@@ -0,0 +1,40 @@
+# Library latency, throughput and memory against the local stub server:
+#
+#   python -m benchmarks.bench_client --things 5000 --channels 8
+
+from qozy_client.client import Client
+from benchmarks.common import install_argument_parser, start_stub, measure, report
+
+
+def main():
+    opts = install_argument_parser("Benchmark qozy_client.Client against a stub daemon").parse_args()
+
+    with start_stub(opts) as server:
+        client = Client("127.0.0.1", server.port)
+
+        thing = client.thing("thing-0")
+        channel = thing.channel("switch0")
+
+        def things():
+            return len(list(client.things()))
+
+        def bridges():
+            return len(list(client.bridges()))
+
+        def thing_set():
+            channel.apply(True)
+            return 1
+
+        def rules():
+            return len(list(client.rules()))
+
+        report([
+            measure("things", things, opts.repeat),
+            measure("bridges", bridges, opts.repeat),
+            measure("thing set", thing_set, opts.repeat),
+            measure("rules", rules, opts.repeat),
+        ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# Client.things() for a large install, decoded in this process and split per bridge over worker processes:
+#
+#   python -m benchmarks.bench_decoding --bridges 32 --things 50000 --channels 5 --processes 2,4,8
+#
+# The stub shares this process, it encodes the same payloads for every variant. Pools are started before
+# measuring, so the numbers are for a refresh of an already running client.
+
+import os
+from qozy_client.client import Client, IdentityMap
+from qozy_client.decoding import DecodePool
+from benchmarks.common import install_argument_parser, start_stub, measure, report, writer
+
+
+def main():
+    parser = install_argument_parser("Benchmark decoding things in worker processes")
+    parser.set_defaults(bridges=32, things=50000, channels=5, repeat=3)
+    parser.add_argument("--processes", default="2,4", help="comma separated worker counts")
+    opts = parser.parse_args()
+
+    process_counts = [int(count) for count in opts.processes.split(",") if count]
+
+    with start_stub(opts) as server:
+        def refresh(client):
+            # fresh identity map, otherwise later runs would only refresh interned instances
+            client.identity_map = IdentityMap(client)
+
+            return len(list(client.things()))
+
+        client = Client(url=server.url)
+        results = [measure("single process", lambda: refresh(client), opts.repeat, memory=False)]
+
+        if not DecodePool.worthwhile():
+            # the client doesn't start a pool on a single CPU, there is nothing to compare
+            writer.writeline("Process decoding is skipped on a single CPU")
+            process_counts = []
+
+        for processes in process_counts:
+            pool_client = Client(url=server.url)
+            # every listing goes through the workers, whatever its size
+            pool_client.enable_process_decoding(processes=processes, min_things=0)
+
+            # starts the workers and checks both paths agree
+            assert refresh(pool_client) == refresh(client)
+
+            results.append(measure("{:d} worker process(es)".format(processes), lambda: refresh(pool_client), opts.repeat, memory=False))
+
+            pool_client.close()
+
+        client.close()
+
+    writer.writeline("{:d} CPU(s)".format(os.cpu_count()))
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# Thing construction time and memory from a decoded payload (default 10k things x 5 channels = 50k channels),
+# comparing lazy channel hydration with forcing every Channel object to be built:
+#
+#   python -m benchmarks.bench_hydration --things 10000 --channels 5
+
+from qozy_client.client import Client, IdentityMap
+from benchmarks.common import install_argument_parser, start_stub, measure, report
+
+
+def main():
+    parser = install_argument_parser("Benchmark Thing/Channel construction from a decoded payload")
+    parser.set_defaults(things=10000, channels=5)
+    opts = parser.parse_args()
+
+    with start_stub(opts) as server:
+        client = Client("127.0.0.1", server.port)
+        payload = client.get("/things", params={"expand": True})
+
+    def build():
+        # fresh identity map, otherwise later runs would only refresh interned instances
+        client.identity_map = IdentityMap(client)
+
+        return [client._load_thing(thing) for thing in payload.values()]
+
+    def construct():
+        build()
+        return len(payload)
+
+    def count_channels():
+        return sum(len(thing.channels()) for thing in build())
+
+    def hydrate_channels():
+        return sum(len(list(thing.channels().values())) for thing in build())
+
+    report([
+        measure("construct things", construct, opts.repeat),
+        measure("len(channels())", count_channels, opts.repeat),
+        measure("all channels hydrated", hydrate_channels, opts.repeat),
+    ])
+
+
+if __name__ == "__main__":
+    main()
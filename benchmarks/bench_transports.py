@@ -0,0 +1,72 @@
+# Latency and throughput per transport against the local stub server, the stub only speaks HTTP/1.1 so
+# HTTP/2 is measured against an external daemon given with --h2-url (h2:// or h2c://, needs httpx[http2]):
+#
+#   python -m benchmarks.bench_transports --things 2000
+#   python -m benchmarks.bench_transports --h2-url h2://qozy.example:9876/api
+
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from qozy_client.client import Client
+from qozy_client.stub import StubServer, UnixStubServer, SyntheticInstall
+from qozy_client.transport import HttpTransport, create_transport
+from benchmarks.common import install_argument_parser, measure, report
+
+
+def transport_results(name, client, repeat, parallel):
+    def thing():
+        client.get("/things/thing-0")
+        return 1
+
+    def things():
+        return len(client.get("/things", params={"expand": True}))
+
+    def concurrent_things():
+        with ThreadPoolExecutor(max_workers=parallel) as executor:
+            list(executor.map(lambda _: client.get("/things/thing-0"), range(parallel * 10)))
+
+        return parallel * 10
+
+    return [
+        measure("{:s}: thing".format(name), thing, repeat, memory=False),
+        measure("{:s}: things".format(name), things, repeat, memory=False),
+        measure("{:s}: {:d} parallel".format(name, parallel), concurrent_things, repeat, memory=False),
+    ]
+
+
+def main():
+    parser = install_argument_parser("Benchmark qozy_client transports")
+    parser.add_argument("--parallel", type=int, default=8)
+    parser.add_argument("--h2-url", type=str, dest="h2_url")
+    opts = parser.parse_args()
+
+    install = SyntheticInstall(bridges=opts.bridges, things=opts.things, channels=opts.channels, rules=opts.rules, triggers=opts.triggers)
+    socket_path = os.path.join(tempfile.mkdtemp(), "qozy.sock")
+
+    results = []
+
+    with StubServer(install, latency=opts.latency) as server:
+        clients = (
+            ("http, no keep-alive", Client(url=server.url, transport=HttpTransport(server.url, keep_alive=False))),
+            ("http", Client(url=server.url)),
+        )
+
+        for name, client in clients:
+            results.extend(transport_results(name, client, opts.repeat, opts.parallel))
+            client.close()
+
+    with UnixStubServer(socket_path, install, latency=opts.latency) as server:
+        client = Client(url=server.url)
+        results.extend(transport_results("http+unix", client, opts.repeat, opts.parallel))
+        client.close()
+
+    if opts.h2_url:
+        client = Client(url=opts.h2_url, transport=create_transport(opts.h2_url))
+        results.extend(transport_results("http/2", client, opts.repeat, opts.parallel))
+        client.close()
+
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
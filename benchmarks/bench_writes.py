@@ -0,0 +1,59 @@
+# A slider dragged across a dimmer channel, applied directly and through the write-behind queue:
+#
+#   python -m benchmarks.bench_writes --latency 0.02 --moves 100 --rate 100
+#
+# The time is until the final value reached the stub, requests are counted on the stub side.
+
+import time
+from qozy_client.client import Client
+from benchmarks.common import install_argument_parser, start_stub, measure, report, writer
+
+
+def main():
+    parser = install_argument_parser("Benchmark write coalescing for rapid channel applies")
+    parser.add_argument("--moves", type=int, default=100, help="applies per slider drag")
+    parser.add_argument("--rate", type=float, default=100, help="applies per second")
+    parser.add_argument("--interval", type=float, default=0.1, help="write-behind flush interval in seconds")
+    opts = parser.parse_args()
+
+    with start_stub(opts) as server:
+        direct_client = Client(url=server.url)
+        queued_client = Client(url=server.url)
+        write_queue = queued_client.enable_write_behind(interval=opts.interval)
+
+        stored = server.install.things["thing-0"]["channels"]["switch0"]
+
+        def drag(client):
+            channel = client.thing("thing-0").channel("switch0")
+            started = time.monotonic()
+
+            for move in range(opts.moves):
+                # applies are paced by the slider, not by the daemon
+                time.sleep(max(0, started + move / opts.rate - time.monotonic()))
+                channel.apply(move)
+
+            while stored["value"] != opts.moves - 1:
+                time.sleep(0.001)
+
+            stored["value"] = None
+
+            return opts.moves
+
+        report([
+            measure("direct", lambda: drag(direct_client), opts.repeat, memory=False),
+            measure("write-behind", lambda: drag(queued_client), opts.repeat, memory=False),
+        ])
+
+        stats = write_queue.stats()
+
+        writer.writeline()
+        writer.writeline("write-behind: {:d} applies, {:d} sent, {:d} dropped, {:d} failed".format(
+            stats.submitted, stats.sent, stats.dropped, stats.failed,
+        ))
+
+        queued_client.close()
+        direct_client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import statistics
+import sys
+import time
+import tracemalloc
+from qozy_client.stub import StubServer, SyntheticInstall
+from qozy_client.utils.cli import CliWriter
+
+
+writer = CliWriter(sys.stdout)
+
+
+def install_argument_parser(description):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--bridges", type=int, default=10)
+    parser.add_argument("--things", type=int, default=1000)
+    parser.add_argument("--channels", type=int, default=5, help="channels per thing")
+    parser.add_argument("--rules", type=int, default=500)
+    parser.add_argument("--triggers", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0, help="artificial stub latency per request in seconds")
+
+    return parser
+
+
+def start_stub(opts):
+    install = SyntheticInstall(
+        bridges=opts.bridges,
+        things=opts.things,
+        channels=opts.channels,
+        rules=opts.rules,
+        triggers=opts.triggers,
+    )
+
+    return StubServer(install, latency=opts.latency)
+
+
+class Result():
+    def __init__(self, name, timings, peak_memory, items):
+        self.name = name
+        self.timings = timings
+        self.peak_memory = peak_memory
+        self.items = items
+
+    @property
+    def median(self):
+        return statistics.median(self.timings)
+
+    @property
+    def throughput(self):
+        return self.items / self.median if self.median else 0
+
+
+def measure(name, function, repeat=5, memory=True):
+    # one warm-up run, which also counts the produced items and traces allocations
+    if memory:
+        tracemalloc.start()
+
+    items = function()
+
+    if memory:
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    else:
+        peak_memory = None
+
+    timings = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    return Result(name, timings, peak_memory, items or 1)
+
+
+def report(results):
+    table = writer.table("BENCHMARK", "MIN (ms)", "MEDIAN (ms)", "MAX (ms)", "ITEMS/s", "PEAK MEM (KiB)")
+
+    for result in results:
+        table.row(
+            result.name,
+            "{:.2f}".format(min(result.timings) * 1000),
+            "{:.2f}".format(result.median * 1000),
+            "{:.2f}".format(max(result.timings) * 1000),
+            "{:.0f}".format(result.throughput),
+            "{:.0f}".format(result.peak_memory / 1024) if result.peak_memory is not None else "-",
+        )
+
+    table.write()
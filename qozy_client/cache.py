@@ -0,0 +1,271 @@
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from qozy_client.client import Bridge, Thing
+from qozy_client.utils.paths import default_cache_directory
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS validators (
+    resource TEXT PRIMARY KEY,
+    etag TEXT,
+    fetched REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS bridges (
+    id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS things (
+    id TEXT PRIMARY KEY,
+    bridge_id TEXT,
+    payload TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS things_bridge_id ON things (bridge_id);
+
+CREATE TABLE IF NOT EXISTS thing_tags (
+    thing_id TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (thing_id, tag)
+);
+
+CREATE INDEX IF NOT EXISTS thing_tags_tag ON thing_tags (tag, thing_id);
+
+CREATE TABLE IF NOT EXISTS rules (
+    id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL
+);
+"""
+
+# resource -> (path, params) of the expanded listing it is revalidated against
+RESOURCES = {
+    "bridges": ("/bridges", {"expand": True}),
+    "things": ("/things", {"expand": True}),
+    "rules": ("/rules", {}),
+}
+
+
+class StateCache():
+    SCHEMA_VERSION = 1
+
+    def __init__(self, path):
+        self.path = path
+
+        # sqlite connections can't be shared between threads, revalidation runs on its own
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+        self._connection()
+
+    @staticmethod
+    def _daemon_path(url, directory=None):
+        # one database per daemon, named after its URL
+        return os.path.join(directory or default_cache_directory(), hashlib.sha1(url.encode("utf-8")).hexdigest()[:16] + ".sqlite")
+
+    @classmethod
+    def for_daemon(cls, url, directory=None):
+        path = cls._daemon_path(url, directory)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        return cls(path)
+
+    @classmethod
+    def existing(cls, url, directory=None):
+        # the daemon's cache if it was ever filled, writes have to invalidate it even when it isn't read
+        path = cls._daemon_path(url, directory)
+
+        return cls(path) if os.path.exists(path) else None
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+
+            # readers aren't blocked while a background revalidation writes
+            connection.execute("PRAGMA journal_mode=WAL")
+
+            if connection.execute("PRAGMA user_version").fetchone()[0] != self.SCHEMA_VERSION:
+                with connection:
+                    connection.executescript(SCHEMA)
+                    connection.execute("PRAGMA user_version={:d}".format(self.SCHEMA_VERSION))
+
+            self._local.connection = connection
+
+            with self._lock:
+                self._connections.append(connection)
+
+        return connection
+
+    def validator(self, resource):
+        # (etag, fetched timestamp) of the stored listing or None if it was never fetched
+        return self._connection().execute(
+            "SELECT etag, fetched FROM validators WHERE resource = ?", (resource,),
+        ).fetchone()
+
+    def age(self, resource):
+        validator = self.validator(resource)
+
+        return time.time() - validator[1] if validator is not None else None
+
+    def _touch(self, connection, resource, etag):
+        connection.execute(
+            "INSERT OR REPLACE INTO validators (resource, etag, fetched) VALUES (?, ?, ?)",
+            (resource, etag, time.time()),
+        )
+
+    def store(self, resource, payload, etag=None):
+        # the cached listing is replaced as a whole, readers see either the old or the new one
+        connection = self._connection()
+
+        with connection:
+            if resource == "things":
+                connection.execute("DELETE FROM things")
+                connection.execute("DELETE FROM thing_tags")
+                connection.executemany(
+                    "INSERT INTO things (id, bridge_id, payload) VALUES (?, ?, ?)",
+                    ((thing["id"], thing["bridge_id"], json.dumps(thing)) for thing in payload.values()),
+                )
+                connection.executemany(
+                    "INSERT OR IGNORE INTO thing_tags (thing_id, tag) VALUES (?, ?)",
+                    ((thing["id"], tag) for thing in payload.values() for tag in thing["tags"]),
+                )
+            elif resource in ("bridges", "rules"):
+                connection.execute("DELETE FROM {:s}".format(resource))
+                connection.executemany(
+                    "INSERT INTO {:s} (id, payload) VALUES (?, ?)".format(resource),
+                    ((item["id"], json.dumps(item)) for item in payload.values()),
+                )
+            else:
+                raise ValueError("Unknown cache resource \"{:s}\"".format(resource))
+
+            self._touch(connection, resource, etag)
+
+    def invalidate(self, resource, ids=None):
+        # drops the given rows, or all of the resource, and its validator, the next cached read fetches the
+        # listing before anything is rendered
+        if resource not in RESOURCES:
+            raise ValueError("Unknown cache resource \"{:s}\"".format(resource))
+
+        connection = self._connection()
+
+        with connection:
+            if ids is None:
+                connection.execute("DELETE FROM {:s}".format(resource))
+            else:
+                ids = [(id,) for id in ids]
+
+                connection.executemany("DELETE FROM {:s} WHERE id = ?".format(resource), ids)
+
+            if resource == "things":
+                if ids is None:
+                    connection.execute("DELETE FROM thing_tags")
+                else:
+                    connection.executemany("DELETE FROM thing_tags WHERE thing_id = ?", ids)
+
+            connection.execute("DELETE FROM validators WHERE resource = ?", (resource,))
+
+    def revalidate(self, client, resource):
+        # conditional fetch of the listing, returns whether the cached one was outdated
+        path, params = RESOURCES[resource]
+        validator = self.validator(resource)
+
+        payload, etag = client.get_if_none_match(path, params=params, etag=validator[0] if validator is not None else None)
+
+        if payload is None:
+            connection = self._connection()
+
+            with connection:
+                self._touch(connection, resource, etag)
+
+            return False
+
+        # without a validator the daemon always sends the listing, it is only outdated if it differs
+        outdated = etag is not None or validator is None or self._cached(resource) != payload
+
+        self.store(resource, payload, etag)
+
+        return outdated
+
+    def revalidate_async(self, client, *resources):
+        executor = ThreadPoolExecutor(max_workers=len(resources))
+
+        futures = [executor.submit(contextvars.copy_context().run, self.revalidate, client, resource) for resource in resources]
+        executor.shutdown(wait=False)
+
+        return futures
+
+    def _payloads(self, query, args=()):
+        return {
+            item["id"]: item
+            for item in (json.loads(payload) for payload, in self._connection().execute(query, args))
+        }
+
+    def _cached(self, resource):
+        if resource == "things":
+            return self.things()
+
+        return self._payloads("SELECT payload FROM {:s} ORDER BY rowid".format(resource))
+
+    def things(self, filter_tags=None):
+        filter_tags = sorted(set(filter_tags or ()))
+
+        if not filter_tags:
+            return self._payloads("SELECT payload FROM things ORDER BY rowid")
+
+        # things carrying all of the tags, like the daemon's tag filter
+        return self._payloads(
+            "SELECT payload FROM things WHERE id IN ("
+            "SELECT thing_id FROM thing_tags WHERE tag IN ({:s}) GROUP BY thing_id HAVING COUNT(*) = ?"
+            ") ORDER BY rowid".format(", ".join("?" * len(filter_tags))),
+            filter_tags + [len(filter_tags)],
+        )
+
+    def bridge_things(self, bridge_id):
+        return self._payloads("SELECT payload FROM things WHERE bridge_id = ? ORDER BY rowid", (bridge_id,))
+
+    def thing_counts(self):
+        # bridge id -> number of cached things
+        return dict(self._connection().execute("SELECT bridge_id, COUNT(*) FROM things GROUP BY bridge_id"))
+
+    def tags(self):
+        return [tag for tag, in self._connection().execute("SELECT DISTINCT tag FROM thing_tags ORDER BY tag")]
+
+    def bridges(self):
+        return self._payloads("SELECT payload FROM bridges ORDER BY rowid")
+
+    def rules(self):
+        return self._payloads("SELECT payload FROM rules ORDER BY rowid")
+
+    def load_things(self, client=None, filter_tags=None):
+        # without a client the things are detached, anything that needs the daemon fails on them
+        for thing in self.things(filter_tags).values():
+            if client is not None:
+                yield client._load_thing(thing)
+            else:
+                result_thing = Thing(None, thing["id"], thing["name"], thing["bridge_id"], thing["tags"])
+                result_thing._set_channels(thing["channels"])
+
+                yield result_thing
+
+    def load_bridges(self, client=None):
+        for bridge in self.bridges().values():
+            if client is not None:
+                yield client._load_bridge(bridge)
+            else:
+                yield Bridge(None, bridge["id"], bridge["vendorPrefix"], bridge["instanceId"], bridge["settingsSchema"], bridge["settings"])
+
+    def close(self):
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+
+            self._connections = []
@@ -3,10 +3,20 @@ import sys
 import os
 import argparse
 import json
+import time
+from collections import deque
 from tempfile import NamedTemporaryFile
-from qozy_client.client import Client, Channel
+from qozy_client.cache import StateCache
+from qozy_client.client import Client, Channel, DeadlineExceeded, RequestError, deadline
+from qozy_client.completion import SCRIPTS, index_key, write_index, write_spec
 from qozy_client.utils.cli import CliWriter, colorize, italic, Color, colored_bool
-from qozy_client.utils.jsonschema import JsonSchemaReader
+from qozy_client.utils.jsonschema import JsonSchemaReader, ValidationError
+from qozy_client.utils.screen import LiveTable, Screen
+from qozy_client.manifest import load_manifest, plan_manifest, plan_bridge_settings, ManifestError
+from qozy_client.multi import MultiClient, parse_target, read_hosts_file
+from qozy_client.online import OnlineMonitor
+from qozy_client.rule_index import RuleIndex
+from qozy_client.snapshot import export_snapshot, diff_snapshots, snapshot_manifest, SnapshotError
 
 
 writer = CliWriter(sys.stdout)
@@ -20,6 +30,62 @@ def pretty_print_json(object):
     print(pretty_json(object))
 
 
+def host_header(client, *header):
+    if isinstance(client, MultiClient):
+        return ("HOST",) + header
+
+    return header
+
+
+def host_row(client, item, *columns):
+    if isinstance(client, MultiClient):
+        return (item.client.label,) + columns
+
+    return columns
+
+
+def cached_state(client, cache, resource):
+    # revalidation runs in the background while the cached state is rendered, a cold cache is filled first
+    if client is None:
+        if cache.validator(resource) is None:
+            writer.alert("Nothing cached for \"{:s}\" yet, run once while connected".format(resource))
+
+        return []
+
+    if cache.validator(resource) is None:
+        cache.revalidate(client, resource)
+
+        return []
+
+    return cache.revalidate_async(client, resource)
+
+
+def invalidate_cached(client, resource, ids=None):
+    # writes drop the rows they outdate from the daemon's state cache, even if this run doesn't read it
+    cache = StateCache.existing(client.base_url)
+
+    if cache is not None:
+        try:
+            cache.invalidate(resource, ids)
+        finally:
+            cache.close()
+
+
+def write_revalidation(revalidation):
+    try:
+        if any([future.result() for future in revalidation]):
+            writer.writeline(italic("The cached state was outdated and has been refreshed."))
+    except Exception as e:
+        writer.alert("Couldn't refresh the cached state, reason: {:s}".format(str(e)))
+
+
+def online_column(thing):
+    if thing.client is None:
+        return italic("unknown")
+
+    return colored_bool(thing.online())
+
+
 class BridgeCLI():
     TYPE_NAME = "bridge"
 
@@ -37,7 +103,7 @@ class BridgeCLI():
             elif options.settings_command == "set":
                 if options.interactive:
                     jsonschema_reader = JsonSchemaReader(writer)
-                    settings = jsonschema_reader.read(bridge.settings_schema)
+                    settings = jsonschema_reader.read(bridge.settings_schema, current=bridge.settings, vendor_prefix=bridge.vendor_prefix)
                 else:
                     temporary_file = NamedTemporaryFile(delete=False, mode="w")
                     temporary_file.write(pretty_json(bridge.settings))
@@ -58,10 +124,15 @@ class BridgeCLI():
                         return
 
                 try:
-                    bridge.set_settings(settings)
-                    writer.success("Updated settings for bridge \"{:s}\"".format(options.id))
-                except:
-                    writer.alert("Couldn't update settings for bridge \"{:s}\"".format(options.id))
+                    if bridge.update_settings(settings, unconditional=options.force):
+                        invalidate_cached(self.client, "bridges", [bridge.id])
+                        writer.success("Updated settings for bridge \"{:s}\"".format(options.id))
+                    else:
+                        writer.success("Settings for bridge \"{:s}\" unchanged".format(options.id))
+                except ValidationError as e:
+                    writer.alert("Invalid settings for bridge \"{:s}\", {:s}".format(options.id, str(e)))
+                except Exception as e:
+                    writer.alert("Couldn't update settings for bridge \"{:s}\", reason: {:s}".format(options.id, str(e)))
             else:
                 pretty_print_json(
                     bridge.settings
@@ -69,6 +140,10 @@ class BridgeCLI():
         elif options.command == "remove":
             bridge.remove()
 
+            # the bridge's things go with it
+            invalidate_cached(self.client, "bridges", [bridge.id])
+            invalidate_cached(self.client, "things")
+
             writer.success("Bridge \"{:s}\" removed.".format(bridge.id))
         else:
             things = list(bridge.things())
@@ -106,20 +181,25 @@ class BridgeCLI():
 
         settings_parser_set = settings_parser_subparsers.add_parser("set")
         settings_parser_set.add_argument("--interactive", "-i", action="store_true")
+        settings_parser_set.add_argument("--force", action="store_true", help="overwrite the settings on daemons that can't update them conditionally")
 
         subparsers.add_parser("remove")
 
 
 class BridgesCLI():
     TYPE_NAME = "bridges"
+    MULTI_HOST_COMMANDS = (None,)
+    CACHED_COMMANDS = (None,)
 
-    def __init__(self, client):
+    def __init__(self, client, cache=None):
         self.client = client
+        self.cache = cache
 
     def execute(self, options):
         if options.command == "add":
             try:
                 bridge = self.client.add_bridge(options.type)
+                invalidate_cached(self.client, "bridges", [bridge.id])
                 writer.success("Added bridge, id \"{:s}\"".format(bridge.id))
             except:
                 writer.alert("Could not add bridge")
@@ -132,23 +212,85 @@ class BridgesCLI():
                 list_writer.add(bridge_type)
 
             list_writer.write()
+        elif options.command == "settings":
+            self._settings(options)
+        elif self.cache is not None:
+            revalidation = cached_state(self.client, self.cache, "bridges") + cached_state(self.client, self.cache, "things")
+
+            thing_counts = self.cache.thing_counts()
+
+            table = writer.table("ID", "ACTIVE", "VENDOR", "THINGS")
+
+            for bridge in self.cache.load_bridges(self.client):
+                table.row(
+                    bridge.id,
+                    colored_bool(bridge.active) if self.client is not None else italic("unknown"),
+                    bridge.vendor_prefix,
+                    str(thing_counts.get(bridge.id, 0))
+                )
+
+            table.write()
+
+            write_revalidation(revalidation)
         else:
             # list
 
             bridges = self.client.bridges()
 
-            table = writer.table("ID", "ACTIVE", "VENDOR", "THINGS")
+            table = writer.table(*host_header(self.client, "ID", "ACTIVE", "VENDOR", "THINGS"))
 
             for bridge in bridges:
-                table.row(
+                table.row(*host_row(
+                    self.client,
+                    bridge,
                     bridge.id,
                     colored_bool(bridge.active),
                     bridge.vendor_prefix,
                     str(len(list(bridge.things())))
-                )
+                ))
 
             table.write()
 
+    def _settings(self, options):
+        # the same settings for every bridge of a vendor, from a file or asked once
+        bridges = [bridge for bridge in self.client.bridges() if bridge.vendor_prefix == options.vendor]
+
+        if not bridges:
+            writer.alert("No bridges of vendor \"{:s}\"".format(options.vendor))
+            return
+
+        prefill = None
+
+        if options.file:
+            try:
+                with open(options.file) as f:
+                    answers = json.load(f)
+            except (OSError, ValueError) as e:
+                writer.alert("Couldn't read settings, reason: {:s}".format(str(e)))
+                return
+        else:
+            # prefilled from the first bridge, only the changed answers are applied to all of them
+            prefill = bridges[0].settings
+            jsonschema_reader = JsonSchemaReader(writer)
+            answers = jsonschema_reader.read(bridges[0].settings_schema, current=prefill, vendor_prefix=options.vendor)
+
+        try:
+            plan = plan_bridge_settings(bridges, answers, prefill=prefill)
+        except ManifestError as e:
+            writer.alert(str(e))
+            return
+
+        if len(plan) == 0:
+            writer.success("Nothing to change.")
+            return
+
+        if options.dry_run:
+            write_plan(plan)
+            return
+
+        write_plan_results(plan.execute(max_workers=options.jobs))
+        invalidate_cached(self.client, "bridges", [bridge.id for bridge in bridges])
+
     @staticmethod
     def create_argument_parser(parser):
         subparsers = parser.add_subparsers(dest="command")
@@ -158,6 +300,14 @@ class BridgesCLI():
 
         subparsers.add_parser("types")
 
+        settings_parser = subparsers.add_parser("settings")
+        settings_parser.add_argument("--vendor", required=True)
+        settings_source = settings_parser.add_mutually_exclusive_group(required=True)
+        settings_source.add_argument("--file", "-f", dest="file")
+        settings_source.add_argument("--interactive", "-i", action="store_true")
+        settings_parser.add_argument("--dry-run", "-n", action="store_true", dest="dry_run")
+        settings_parser.add_argument("--jobs", "-j", type=int, default=8)
+
 
 class ThingCLI():
     TYPE_NAME = "thing"
@@ -178,15 +328,18 @@ class ThingCLI():
                     value = json.loads(options.value)
 
                 thing.channel(options.channel).apply(value)
+                invalidate_cached(self.client, "things", [thing.id])
 
                 writer.success("Applied value \"{:s}\" to \"{:s}\", channel \"{:s}\"".format(options.value, options.id, options.channel))
             except Exception as e:
                 writer.alert("Couldn't set value, reason: {:s}".format(str(e)))
         elif options.command == "remove":
             thing.remove()
+            invalidate_cached(self.client, "things", [thing.id])
             writer.success("Thing \"{:s}\" removed.".format(thing.id))
         elif options.command == "name":
             thing.set_name(options.name)
+            invalidate_cached(self.client, "things", [thing.id])
             writer.success("Thing \"{:s}\" renamed to \"{:s}\".".format(thing.id, thing.name))
         elif options.command == "tags":
             for tag in options.add:
@@ -195,6 +348,9 @@ class ThingCLI():
             for tag in options.remove:
                 thing.remove_tag(tag)
 
+            if options.add or options.remove:
+                invalidate_cached(self.client, "things", [thing.id])
+
             writer.headline("Tags")
             tag_writer = writer.list(thing.tags)
             tag_writer.write()
@@ -242,66 +398,178 @@ class ThingCLI():
 
 class ThingsCLI():
     TYPE_NAME = "things"
+    MULTI_HOST_COMMANDS = (None, "tags")
+    CACHED_COMMANDS = (None, "tags")
 
-    def __init__(self, client):
+    def __init__(self, client, cache=None):
         self.client = client
+        self.cache = cache
 
-    def execute(self, options):
-        things = self.client.things(filter_tags=options.tags)
+    def _things(self, options):
+        if self.cache is None:
+            return self.client.things(filter_tags=options.tags), []
+
+        revalidation = cached_state(self.client, self.cache, "things")
+
+        return self.cache.load_things(self.client, filter_tags=[tag for tag in options.tags if tag]), revalidation
+
+    def _retag(self, options):
+        if self.client is None:
+            writer.alert("Retagging needs a connection to the daemon")
+            return
+
+        results = self.client.retag(
+            filter_tags=options.tags,
+            add=[tag for tag in options.add if tag],
+            remove=[tag for tag in options.remove if tag],
+            max_workers=options.jobs,
+        )
+
+        table = writer.table(*host_header(self.client, "ID", "ADDED", "REMOVED", "RESULT"))
+        failed = 0
+
+        for result in results:
+            if not result.success:
+                failed += 1
+
+            if result.changed:
+                table.row(*host_row(
+                    self.client,
+                    result,
+                    result.thing.id,
+                    ", ".join(result.added),
+                    ", ".join(result.removed),
+                    colored_bool(result.success) if result.success else colorize(str(result.error), color=Color.RED),
+                ))
+
+        table.write()
+
+        changed = sum(1 for result in results if result.changed)
+
+        for client in self.client.clients if isinstance(self.client, MultiClient) else [self.client]:
+            thing_ids = [result.thing.id for result in results if result.changed and result.thing.client is client]
 
-        if options.command == "tags":
+            if thing_ids:
+                invalidate_cached(client, "things", thing_ids)
+
+        if failed:
+            writer.alert("Retagging failed for {:d} of {:d} thing(s)".format(failed, changed))
+        else:
+            writer.success("Retagged {:d} thing(s), {:d} already matched".format(changed, len(results) - changed))
+
+    def execute(self, options):
+        if options.command == "tags" and (options.add or options.remove):
+            self._retag(options)
+        elif options.command == "tags":
+            things, revalidation = self._things(options)
             tags = set()
 
             for thing in things:
                 tags = tags.union(thing.tags)
 
             writer.list(tags).write()
+
+            write_revalidation(revalidation)
         elif options.command == "scan":
-            self.client.scan()
+            job = self.client.scan_async(poll_interval=options.poll_interval)
+
+            writer.writeline("Scanning for new things, {:d} known ...".format(job.progress().known))
+
+            try:
+                for thing in job:
+                    progress = job.progress()
+
+                    writer.writeline("[{:6.1f}s] Found {:s} ({:d} channels)".format(progress.elapsed, thing.id, len(thing.channels())))
+            except KeyboardInterrupt:
+                job.cancel()
+
+            if job.discovered:
+                invalidate_cached(self.client, "things", [thing.id for thing in job.discovered])
+
+            progress = job.progress()
+
+            if job.error:
+                writer.alert("Scan failed, reason: {:s}".format(str(job.error)))
+            elif progress.cancelled:
+                writer.alert("Scan cancelled after {:.1f}s, {:d} new thing(s) found".format(progress.elapsed, progress.discovered))
+            else:
+                writer.success("Scan finished after {:.1f}s, {:d} new thing(s) found".format(progress.elapsed, progress.discovered))
         else:
-            table = writer.table("ID", "NAME", "ONLINE", "CHANNELS")
+            things, revalidation = self._things(options)
+
+            table = writer.table(*host_header(self.client, "ID", "NAME", "ONLINE", "CHANNELS"))
             for thing in things:
-                table.row(
+                table.row(*host_row(
+                    self.client,
+                    thing,
                     thing.id,
                     italic("<not set>") if not thing.has_name() else thing.name,
-                    colored_bool(thing.online()),
+                    online_column(thing),
                     str(len(thing.channels()))
-                )
+                ))
 
             table.write()
 
+            write_revalidation(revalidation)
+
     @staticmethod
     def create_argument_parser(parser):
         subparsers = parser.add_subparsers(dest="command")
-        subparsers.add_parser("tags")
 
-        subparsers.add_parser("scan")
+        tags_parser = subparsers.add_parser("tags")
+        tags_parser.add_argument("--add", "-a", dest="add", action="append", default=[])
+        tags_parser.add_argument("--remove", "-r", dest="remove", action="append", default=[])
+        tags_parser.add_argument("--jobs", "-j", type=int, default=8, help="things retagged concurrently")
+
+        scan_parser = subparsers.add_parser("scan")
+        scan_parser.add_argument("--poll-interval", type=float, default=1.0, dest="poll_interval")
 
         parser.add_argument("--tag", "-t", dest="tags", nargs="?", action="append", default=[])
 
 
 class NotificationsCLI():
     TYPE_NAME = "notifications"
+    MULTI_HOST_COMMANDS = (None,)
 
     def __init__(self, client):
         self.client = client
 
     def execute(self, options):
-        table = writer.table("CREATED", "TITLE", "SUMMARY", "DISMISSABLE")
+        if options.command == "dismiss":
+            notifications = [
+                notification
+                for notification in self.client.notifications()
+                if options.all or notification.context_id in options.ids
+            ]
 
-        for notification in self.client.notifications():
-            table.row(
-                notification.created,
-                notification.title,
-                notification.summary,
-                colored_bool(notification.dismissable),
-            )
+            dismissed = self.client.dismiss_notifications(notifications)
 
-        table.write()
+            writer.success("Dismissed {:d} notification(s).".format(len(dismissed)))
+        else:
+            table = writer.table(*host_header(self.client, "CONTEXT", "CREATED", "TITLE", "SUMMARY", "DISMISSABLE"))
+
+            for notification in self.client.notifications(since=options.since):
+                table.row(*host_row(
+                    self.client,
+                    notification,
+                    notification.context_id,
+                    notification.created,
+                    notification.title,
+                    notification.summary,
+                    colored_bool(notification.dismissable),
+                ))
+
+            table.write()
 
     @staticmethod
     def create_argument_parser(parser):
-        pass
+        parser.add_argument("--since", dest="since")
+
+        subparsers = parser.add_subparsers(dest="command")
+
+        dismiss_parser = subparsers.add_parser("dismiss")
+        dismiss_parser.add_argument("ids", nargs="*")
+        dismiss_parser.add_argument("--all", "-a", action="store_true")
 
 
 class TriggersCLI():
@@ -328,6 +596,7 @@ class TriggersCLI():
 
 class RulesCLI():
     TYPE_NAME = "rules"
+    MULTI_HOST_COMMANDS = (None,)
 
     def __init__(self, client):
         self.client = client
@@ -340,15 +609,32 @@ class RulesCLI():
             except:
                 raise  # todo
         else:
-            table = writer.table("ID", "NAME", "TRIGGERS", "ACTIONS")
+            if (options.trigger or options.event or options.thing) and isinstance(self.client, MultiClient):
+                writer.alert("Rule filters are only supported for a single host")
+                return
+            elif options.trigger or options.event or options.thing:
+                index = RuleIndex(self.client)
+
+                if options.trigger:
+                    rules = index.by_trigger(options.trigger)
+                elif options.event:
+                    rules = index.by_event(options.event)
+                else:
+                    rules = index.by_thing(options.thing)
+            else:
+                rules = self.client.rules()
 
-            for rule in self.client.rules():
-                table.row(
+            table = writer.table(*host_header(self.client, "ID", "NAME", "TRIGGERS", "ACTIONS"))
+
+            for rule in rules:
+                table.row(*host_row(
+                    self.client,
+                    rule,
                     rule.id,
                     rule.name,
                     str(len(rule.triggers())),
                     str(len(rule.actions)),
-                )
+                ))
 
             table.write()
 
@@ -358,6 +644,11 @@ class RulesCLI():
 
         subparsers.add_parser("add")
 
+        filter_group = parser.add_mutually_exclusive_group()
+        filter_group.add_argument("--trigger", dest="trigger")
+        filter_group.add_argument("--event", dest="event")
+        filter_group.add_argument("--thing", dest="thing")
+
 
 class RuleCLI():
     TYPE_NAME = "rule"
@@ -371,11 +662,9 @@ class RuleCLI():
         if options.command == "add-trigger":
             trigger_id = options.trigger_id
 
-            trigger = self.client.trigger(trigger_id)
-
             try:
-                rule.add_trigger(trigger)
-                writer.success("Successfully added trigger \"{:s}\" to rule \"{:s}\".".format(trigger.id, rule.id))
+                rule.add_trigger(trigger_id)
+                writer.success("Successfully added trigger \"{:s}\" to rule \"{:s}\".".format(trigger_id, rule.id))
             except:
                 raise  # todo
         else:
@@ -407,6 +696,136 @@ class RuleCLI():
         add_trigger_parser.add_argument("trigger_id")
 
 
+class TopCLI():
+    TYPE_NAME = "top"
+
+    # offline things first, then those not polled yet
+    ONLINE_ORDER = {False: 0, None: 1, True: 2}
+
+    def __init__(self, client):
+        self.client = client
+
+    def execute(self, options):
+        monitor = OnlineMonitor(self.client, min_interval=options.min_interval, max_interval=options.max_interval, max_rps=options.max_rps)
+
+        # thing id -> online state its row shows, rows are sorted by it as they are updated
+        states = {}
+
+        table = LiveTable(
+            "ID", "NAME", "ONLINE", "CHANNELS", "LAST CHANGE",
+            sort_key=lambda thing_id, columns: (self.ONLINE_ORDER[states[thing_id]], thing_id),
+        )
+
+        # ids of things that changed state, appended by the monitor thread
+        transitions = deque()
+        monitor.listeners.append(lambda thing, online: transitions.append(thing.id))
+
+        things = {}
+        listing = {}
+        # things not polled successfully yet, their first state isn't a transition
+        pending = set()
+        offline = 0
+        etag = None
+        listed = None
+        next_listing = 0
+        error = None
+        written = 0
+
+        with Screen(writer) as screen:
+            monitor.start()
+
+            try:
+                while True:
+                    # only the rows of things that changed are updated
+                    changed = set()
+
+                    if time.monotonic() >= next_listing:
+                        # the listing is only transferred again if it changed
+                        try:
+                            payload, etag = self.client.get_if_none_match("/things", params={"expand": True, "tag": options.tags}, etag=etag)
+
+                            if payload is not None:
+                                payload = {thing["id"]: thing for thing in payload.values()}
+
+                                for thing_id in set(listing) - set(payload):
+                                    monitor.remove(thing_id)
+                                    table.remove(thing_id)
+                                    pending.discard(thing_id)
+                                    offline -= states.pop(thing_id) is False
+                                    del things[thing_id]
+
+                                for thing_id, thing in payload.items():
+                                    if listing.get(thing_id) != thing:
+                                        things[thing_id] = self.client._load_thing(thing)
+                                        changed.add(thing_id)
+
+                                        if thing_id not in listing:
+                                            pending.add(thing_id)
+
+                                monitor.add_all(things[thing_id] for thing_id in changed)
+                                listing = payload
+
+                            listed = time.strftime("%H:%M:%S")
+                            error = None
+                        except Exception as e:
+                            error = e
+
+                        next_listing = time.monotonic() + options.interval
+
+                    while transitions:
+                        changed.add(transitions.popleft())
+
+                    polled = {thing_id for thing_id in pending if monitor.online(thing_id) is not None}
+                    pending -= polled
+                    changed |= polled
+
+                    for thing_id in changed:
+                        thing = things.get(thing_id)
+
+                        if thing is None:
+                            continue
+
+                        entry = monitor.entry(thing_id)
+                        online = entry.online if entry is not None else None
+
+                        offline += (online is False) - (states.get(thing_id) is False)
+                        states[thing_id] = online
+
+                        table.update(
+                            thing_id,
+                            thing_id,
+                            italic("<not set>") if not thing.has_name() else thing.name,
+                            colored_bool(online) if online is not None else italic("unknown"),
+                            str(len(thing.channels())),
+                            time.strftime("%H:%M:%S", time.localtime(entry.last_change)) if entry is not None and entry.last_change else "",
+                        )
+
+                    status = "{:d} things, {:d} offline, {:d} polls, {:d} transitions, listing {:s}, {:d} cells redrawn".format(
+                        len(things), offline, monitor.polls, monitor.transitions, listed or "pending", written,
+                    )
+
+                    if error is not None:
+                        status = colorize("{:s}, {:s}".format(status, str(error)), color=Color.RED)
+
+                    size = screen.size()
+                    written = screen.draw([[(0, size.columns, status)], []] + table.lines(limit=max(0, size.lines - 4)))
+
+                    time.sleep(options.refresh)
+            except KeyboardInterrupt:
+                pass
+            finally:
+                monitor.stop()
+
+    @staticmethod
+    def create_argument_parser(parser):
+        parser.add_argument("--tag", "-t", dest="tags", action="append", default=[])
+        parser.add_argument("--interval", type=float, default=5, help="seconds between checks of the thing listing")
+        parser.add_argument("--refresh", type=float, default=0.25, help="seconds between screen updates")
+        parser.add_argument("--min-interval", type=float, default=5, dest="min_interval", help="online poll interval after a change")
+        parser.add_argument("--max-interval", type=float, default=120, dest="max_interval", help="online poll interval of stable things")
+        parser.add_argument("--max-rps", type=float, default=20, dest="max_rps", help="online polls per second")
+
+
 class PluginsCLI():
     TYPE_NAME = "plugins"
 
@@ -423,45 +842,426 @@ class PluginsCLI():
         pass
 
 
-def main():
-    cli_classes = {
-        BridgeCLI.TYPE_NAME: BridgeCLI,
-        BridgesCLI.TYPE_NAME: BridgesCLI,
-        ThingCLI.TYPE_NAME: ThingCLI,
-        ThingsCLI.TYPE_NAME: ThingsCLI,
-        NotificationsCLI.TYPE_NAME: NotificationsCLI,
-        TriggersCLI.TYPE_NAME: TriggersCLI,
-        RuleCLI.TYPE_NAME: RuleCLI,
-        RulesCLI.TYPE_NAME: RulesCLI,
-        PluginsCLI.TYPE_NAME: PluginsCLI,
-    }
+def write_plan(plan):
+    for target, changes in plan.targets.items():
+        writer.headline(target)
+        writer.list([str(change) for change in changes]).write()
+
+    writer.writeline()
+    writer.writeline("{:d} change(s) planned.".format(len(plan)))
+
+
+def write_plan_results(results):
+    table = writer.table("TARGET", "CHANGE", "RESULT")
+    failed = 0
+
+    for result in results:
+        if not result.success:
+            failed += 1
+
+        table.row(
+            result.change.target,
+            result.change.description,
+            colored_bool(result.success) if result.success else colorize(str(result.error), color=Color.RED),
+        )
+
+    table.write()
+
+    if failed:
+        writer.alert("{:d} of {:d} change(s) failed".format(failed, len(results)))
+    else:
+        writer.success("Applied {:d} change(s).".format(len(results)))
+
+
+def write_transfer_stats(clients):
+    multiple = len(clients) > 1
+    table = writer.table(*(("HOST",) if multiple else ()), "ENDPOINT", "REQUESTS", "SENT", "WIRE", "DECODED", "RATIO")
+
+    for client in clients:
+        for endpoint, transfer in sorted(client.transfer_stats.endpoints().items()):
+            table.row(
+                *((client.label,) if multiple else ()),
+                endpoint,
+                str(transfer.requests),
+                str(transfer.sent_bytes),
+                str(transfer.wire_bytes),
+                str(transfer.decoded_bytes),
+                "{:.2f}".format(transfer.ratio),
+            )
+
+    table.write()
+
+    for client in clients:
+        if client.hedge_policy is not None:
+            stats = client.hedge_policy.stats()
+
+            writer.writeline("{:s}hedged {:d} of {:d} GET(s), the duplicate answered first {:d} time(s)".format(
+                client.label + ": " if multiple else "",
+                stats.hedged,
+                stats.requests,
+                stats.hedge_won,
+            ))
+
+
+class ApplyCLI():
+    TYPE_NAME = "apply"
+
+    def __init__(self, client):
+        self.client = client
+
+    def execute(self, options):
+        try:
+            manifest = load_manifest(options.file)
+            plan = plan_manifest(self.client, manifest)
+        except (OSError, ValueError, ManifestError) as e:
+            writer.alert("Couldn't read manifest, reason: {:s}".format(str(e)))
+            return
+
+        if len(plan) == 0:
+            writer.success("Nothing to change.")
+            return
+
+        if options.dry_run:
+            write_plan(plan)
+            return
+
+        write_plan_results(plan.execute(max_workers=options.jobs))
+        invalidate_cached(self.client, "bridges")
+        invalidate_cached(self.client, "things")
+
+    @staticmethod
+    def create_argument_parser(parser):
+        parser.add_argument("--file", "-f", dest="file", required=True)
+        parser.add_argument("--dry-run", "-n", action="store_true", dest="dry_run")
+        parser.add_argument("--jobs", "-j", type=int, default=8)
+
+
+class SnapshotCLI():
+    TYPE_NAME = "snapshot"
+    OFFLINE_COMMANDS = ("diff",)
+
+    def __init__(self, client):
+        self.client = client
+
+    def execute(self, options):
+        if options.command == "export":
+            try:
+                count = export_snapshot(self.client, options.file, compress=True if options.compress else None)
+            except (OSError, RequestError) as e:
+                writer.alert("Couldn't export snapshot, reason: {:s}".format(str(e)))
+                exit(1)
+
+            writer.success("Exported {:d} record(s) to \"{:s}\"".format(count, options.file))
+        elif options.command == "import":
+            try:
+                plan = plan_manifest(self.client, snapshot_manifest(options.file, channels=options.channels), ignore_missing=True)
+            except (OSError, ValueError, SnapshotError, ManifestError, RequestError) as e:
+                writer.alert("Couldn't read snapshot, reason: {:s}".format(str(e)))
+                exit(1)
+
+            if len(plan) == 0:
+                writer.success("Nothing to change.")
+            elif options.dry_run:
+                write_plan(plan)
+            else:
+                write_plan_results(plan.execute(max_workers=options.jobs))
+                invalidate_cached(self.client, "bridges")
+                invalidate_cached(self.client, "things")
+        elif options.command == "diff":
+            try:
+                changes = diff_snapshots(options.old, options.new)
+            except (OSError, ValueError, SnapshotError) as e:
+                writer.alert("Couldn't read snapshot, reason: {:s}".format(str(e)))
+                exit(1)
+
+            status_colors = {"added": Color.GREEN, "removed": Color.RED, "changed": Color.BROWN}
+
+            table = writer.table("KIND", "ID", "STATUS", "FIELDS")
+
+            for change in changes:
+                table.row(
+                    change.kind,
+                    change.id,
+                    colorize(change.status, color=status_colors[change.status]),
+                    ", ".join(change.fields),
+                )
+
+            table.write()
+
+    @staticmethod
+    def create_argument_parser(parser):
+        subparsers = parser.add_subparsers(dest="command")
+        subparsers.required = True
+
+        export_parser = subparsers.add_parser("export")
+        export_parser.add_argument("file")
+        export_parser.add_argument("--compress", "-z", action="store_true")
+
+        import_parser = subparsers.add_parser("import")
+        import_parser.add_argument("file")
+        import_parser.add_argument("--dry-run", "-n", action="store_true", dest="dry_run")
+        import_parser.add_argument("--channels", action="store_true", help="restore actuator channel values too, this switches the devices")
+        import_parser.add_argument("--jobs", "-j", type=int, default=8)
+
+        diff_parser = subparsers.add_parser("diff")
+        diff_parser.add_argument("old")
+        diff_parser.add_argument("new")
+
 
+class CompletionCLI():
+    TYPE_NAME = "completion"
+    OFFLINE_COMMANDS = tuple(SCRIPTS)
+
+    def __init__(self, client):
+        self.client = client
+
+    def execute(self, options):
+        # the completer can't afford to build the argument parser itself, it reads this spec of it
+        write_spec(build_argument_parser())
+
+        if options.command == "refresh":
+            write_index(self.client, index_key(options.hosts, options.port, options.hosts_file))
+        else:
+            writer.write(SCRIPTS[options.command])
+
+    @staticmethod
+    def create_argument_parser(parser):
+        subparsers = parser.add_subparsers(dest="command")
+        subparsers.required = True
+
+        for shell in SCRIPTS:
+            subparsers.add_parser(shell)
+
+        # candidates come from one daemon, --host and --hosts-file have to resolve to a single target
+        subparsers.add_parser("refresh", help="rebuild the completion index of a single daemon")
+
+
+def milliseconds(seconds):
+    return "{:.2f}".format(seconds * 1000) if seconds is not None else "-"
+
+
+class BenchCLI():
+    TYPE_NAME = "bench"
+    # no daemon is contacted with --stub
+    OFFLINE_OPTIONS = ("stub",)
+
+    PERCENTILES = (50, 90, 99, 99.9)
+
+    def __init__(self, client):
+        self.client = client
+
+    def _write_interval(self, stats):
+        writer.writeline("{:7.1f}s  target {:7.1f}/s  done {:7.1f}/s  errors {:5d}  p50 {:>8s} ms  p99 {:>8s} ms".format(
+            stats.elapsed,
+            stats.target_rate,
+            stats.throughput,
+            stats.errors,
+            milliseconds(stats.histogram.percentile(50)),
+            milliseconds(stats.histogram.percentile(99)),
+        ))
+
+    def _write_results(self, generator, results):
+        table = writer.table("OPERATION", "REQUESTS", "ERRORS", "REQ/s", *("P{:g} (ms)".format(p) for p in self.PERCENTILES), "MAX (ms)")
+
+        for stats in results:
+            table.row(
+                stats.operation,
+                str(stats.requests),
+                colorize("{:d} ({:.1%})".format(stats.errors, stats.errors / stats.requests), Color.RED) if stats.errors else "0",
+                "{:.1f}".format(stats.throughput),
+                *(milliseconds(stats.histogram.percentile(p)) for p in self.PERCENTILES),
+                milliseconds(stats.histogram.max / 1000000),
+            )
+
+        table.write()
+
+        requests = sum(stats.requests for stats in results)
+        errors = sum(stats.errors for stats in results)
+
+        writer.writeline()
+        writer.writeline("{:d} request(s) in {:.1f}s, {:.1f}/s, {:d} error(s)".format(requests, generator.elapsed, requests / generator.elapsed, errors))
+
+        for error_type, count in sorted(generator.error_types.items()):
+            writer.alert("{:s}: {:d}".format(error_type, count))
+
+    def _run(self, client, options):
+        from qozy_client.loadgen import LoadGenerator, parse_mix
+
+        try:
+            generator = LoadGenerator(
+                client,
+                rate=options.rate,
+                duration=options.duration,
+                ramp_up=options.ramp_up,
+                mix=parse_mix(options.mix) if options.mix else None,
+                max_workers=options.jobs,
+                seed=options.seed,
+            )
+
+            results = generator.run(report_interval=options.report_interval, on_interval=self._write_interval)
+        except ValueError as e:
+            writer.alert(str(e))
+            return
+
+        self._write_results(generator, results)
+
+    def execute(self, options):
+        if not options.stub:
+            self._run(self.client, options)
+            return
+
+        # the stub pulls in http.server, only bench needs it
+        from qozy_client.stub import StubServer, SyntheticInstall
+
+        install = SyntheticInstall(bridges=options.stub_bridges, things=options.stub_things)
+
+        with StubServer(install, latency=options.stub_latency) as server:
+            client = Client(url=server.url)
+
+            try:
+                self._run(client, options)
+            finally:
+                client.close()
+
+    @staticmethod
+    def create_argument_parser(parser):
+        parser.add_argument("--rate", type=float, default=50, help="requests started per second")
+        parser.add_argument("--duration", type=float, default=30, help="seconds to generate load for")
+        parser.add_argument("--ramp-up", type=float, default=0, dest="ramp_up", help="seconds to climb to the rate")
+        parser.add_argument("--mix", help="weights of things, online, apply and rules, e.g. things=1,online=8, reads only by default")
+        parser.add_argument("--jobs", "-j", type=int, default=64, help="requests in flight at most")
+        parser.add_argument("--report-interval", type=float, default=5, dest="report_interval", help="seconds between progress lines, 0 disables them")
+        parser.add_argument("--seed", type=int)
+        parser.add_argument("--stub", action="store_true", help="run against a local stub daemon")
+        parser.add_argument("--stub-bridges", type=int, default=5, dest="stub_bridges")
+        parser.add_argument("--stub-things", type=int, default=200, dest="stub_things")
+        parser.add_argument("--stub-latency", type=float, default=0, dest="stub_latency", help="seconds the stub delays each answer")
+
+
+CLI_CLASSES = {
+    BridgeCLI.TYPE_NAME: BridgeCLI,
+    BridgesCLI.TYPE_NAME: BridgesCLI,
+    ThingCLI.TYPE_NAME: ThingCLI,
+    ThingsCLI.TYPE_NAME: ThingsCLI,
+    NotificationsCLI.TYPE_NAME: NotificationsCLI,
+    TriggersCLI.TYPE_NAME: TriggersCLI,
+    RuleCLI.TYPE_NAME: RuleCLI,
+    RulesCLI.TYPE_NAME: RulesCLI,
+    PluginsCLI.TYPE_NAME: PluginsCLI,
+    TopCLI.TYPE_NAME: TopCLI,
+    ApplyCLI.TYPE_NAME: ApplyCLI,
+    SnapshotCLI.TYPE_NAME: SnapshotCLI,
+    CompletionCLI.TYPE_NAME: CompletionCLI,
+    BenchCLI.TYPE_NAME: BenchCLI,
+}
+
+
+def build_argument_parser():
     parser = argparse.ArgumentParser(description="Qozy command line interface")
-    parser.add_argument("--host", type=str, default=os.getenv("QOZY_REMOTE_HOST", "localhost"))
+    parser.add_argument("--host", type=str, action="append", dest="hosts", help="host, host:port or daemon URL, may be given several times")
+    parser.add_argument("--hosts-file", type=str, dest="hosts_file", help="file with one host, host:port or daemon URL per line")
     parser.add_argument("--port", type=int, default=os.getenv("QOZY_REMOTE_PORT", 9876))
     parser.add_argument("--no-colors", action="store_true", dest="no_colors")
+    parser.add_argument("--no-compression", action="store_false", dest="compression", help="don't ask the daemon for compressed responses")
+    parser.add_argument("--transfer-stats", action="store_true", dest="transfer_stats", help="print bytes sent and received per endpoint")
+    parser.add_argument("--offline", action="store_true", help="answer from the local state cache without contacting the daemon")
+    parser.add_argument("--timeout", type=float, default=os.getenv("QOZY_TIMEOUT"), help="seconds the whole command may take")
+    parser.add_argument("--hedge", action="store_true", help="race slow reads against a duplicate request")
+    parser.add_argument("--cache", action="store_true", help="render listings from the local state cache right away, it is refreshed in the background")
 
     subparsers = parser.add_subparsers(dest="group")
     subparsers.required = True
 
-    for group_name, group_cls in cli_classes.items():
+    for group_name, group_cls in CLI_CLASSES.items():
         subparser = subparsers.add_parser(group_name)
         group_cls.create_argument_parser(subparser)
 
+    return parser
+
+
+def main():
+    parser = build_argument_parser()
     opts = parser.parse_args()
 
+    cli_class = CLI_CLASSES[opts.group]
+
     try:
-        client = Client(opts.host, opts.port)
-    except ConnectionRefusedError:
-        writer.alert("Could not connect to Qozy daemon at {}:{}".format(opts.host, opts.port))
+        targets = [parse_target(host, int(opts.port)) for host in opts.hosts or ()]
+
+        if opts.hosts_file:
+            targets.extend(read_hosts_file(opts.hosts_file, int(opts.port)))
+
+        if not targets:
+            targets = [os.getenv("QOZY_REMOTE_URL") or parse_target(os.getenv("QOZY_REMOTE_HOST", "localhost"), int(opts.port))]
+    except ValueError as e:
+        writer.alert(str(e))
         exit(1)
 
+    # a daemon given both with --host and in the hosts file is only contacted once
+    targets = list(dict.fromkeys(targets))
+
     if opts.no_colors:
         writer.disable_colors()
 
-    cli_class = cli_classes[opts.group]
-    cli = cli_class(client)
-    cli.execute(opts)
+    command = getattr(opts, "command", None)
+    cached = command in getattr(cli_class, "CACHED_COMMANDS", ())
+
+    # --offline answers from the cache alone
+    use_cache = cached and (opts.cache or opts.offline) and len(targets) == 1
+
+    if opts.offline and not use_cache:
+        writer.alert("\"{:s}\" can't be answered offline".format(" ".join(filter(None, (opts.group, command)))))
+        exit(1)
+
+    timeout = float(opts.timeout) if opts.timeout is not None else None
+
+    # commands and options that need no daemon
+    offline = command in getattr(cli_class, "OFFLINE_COMMANDS", ()) or any(getattr(opts, option) for option in getattr(cli_class, "OFFLINE_OPTIONS", ()))
+
+    if offline or opts.offline:
+        client = None
+    elif len(targets) > 1:
+        if command not in getattr(cli_class, "MULTI_HOST_COMMANDS", ()):
+            writer.alert("\"{:s}\" only supports a single host".format(" ".join(filter(None, (opts.group, command)))))
+            exit(1)
+
+        client = MultiClient.connect(targets, compress_responses=opts.compression, timeout=timeout)
+    else:
+        try:
+            client = Client(url=targets[0], compress_responses=opts.compression, timeout=timeout)
+        except DeadlineExceeded as e:
+            # a TimeoutError and so an OSError too, it has to be told apart from a refused connection
+            writer.alert("Timed out connecting to Qozy daemon at {}, {:s}".format(targets[0], str(e)))
+            exit(1)
+        except OSError:
+            writer.alert("Could not connect to Qozy daemon at {}".format(targets[0]))
+            exit(1)
+
+    if opts.hedge and client is not None:
+        for single_client in client.clients if isinstance(client, MultiClient) else [client]:
+            single_client.enable_hedging()
+
+    if use_cache:
+        cli = cli_class(client, cache=StateCache.for_daemon(targets[0]))
+    else:
+        cli = cli_class(client)
+
+    try:
+        if timeout is not None:
+            with deadline(timeout):
+                cli.execute(opts)
+        else:
+            cli.execute(opts)
+    except DeadlineExceeded as e:
+        writer.alert("Timed out, {:s}".format(str(e)))
+        exit(1)
+
+    if isinstance(client, MultiClient):
+        for label, error in client.errors.items():
+            writer.alert("{:s}: {:s}".format(label, str(error)))
+
+    if opts.transfer_stats and client is not None:
+        write_transfer_stats(client.clients if isinstance(client, MultiClient) else [client])
 
 
 if __name__ == "__main__":
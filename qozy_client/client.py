@@ -1,86 +1,305 @@
+import contextvars
 import json
-import requests
+import threading
+import time
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlsplit, unquote
+from weakref import WeakValueDictionary
+from qozy_client.decoding import DecodePool
+from qozy_client.frame import ChannelFrame
+from qozy_client.hedging import HedgePolicy
+from qozy_client.online import OnlineMonitor
+from qozy_client.scan import ScanJob
+from qozy_client.stats import TransferStats
+from qozy_client.transport import create_transport
+from qozy_client.utils import compression
+from qozy_client.utils.jsonschema import JsonSchemaValidator
+from qozy_client.utils.mergepatch import create_merge_patch, has_null_members
+from qozy_client.writes import WriteBehindQueue
+
+
+class RequestError(Exception):
+    def __init__(self, status_code, message):
+        super().__init__(message)
+
+        self.status_code = status_code
+
+
+class PreconditionFailed(RequestError):
+    pass
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+# monotonic time by which every request of the current context has to be answered
+_deadline = contextvars.ContextVar("qozy_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds):
+    # budget for all requests made in the block, including those of model methods, nested deadlines can only shorten it
+    expires = time.monotonic() + seconds
+    current = _deadline.get()
+
+    token = _deadline.set(min(expires, current) if current is not None else expires)
+
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
 
 
 class Client():
     VERSION = "0.1"
     URL_SCHEME = "http://{host:s}:{port:d}/api"
 
-    def __init__(self, host, port):
-        self.base_url = self.URL_SCHEME.format(host=host, port=port)
+    def __init__(self, host=None, port=None, url=None, transport=None, compress_responses=True, compress_requests_over=None, timeout=None):
+        # url selects the transport by scheme: http(s)://, http+unix://, h2:// or h2c://
+        if url is None:
+            url = self.URL_SCHEME.format(host=host, port=port)
+
+        self.base_url = url
+        self.transport = transport or create_transport(url)
+        self.identity_map = IdentityMap(self)
+
+        # request bodies of at least compress_requests_over bytes are sent gzip-encoded, None disables it
+        self.accept_encoding = compression.accept_encoding() if compress_responses else "identity"
+        self.compress_requests_over = compress_requests_over
+        self.transfer_stats = TransferStats()
+
+        # Channel.apply goes through this queue once write-behind is enabled
+        self.write_queue = None
+
+        # seconds a single request may take, None waits forever unless a deadline is set
+        self.timeout = timeout
+        self.hedge_policy = None
+
+        # things are fetched and decoded per bridge in worker processes once process decoding is enabled
+        self.decode_pool = None
+
+        # cleared once the daemon turns out not to support dismissing notifications in bulk
+        self._bulk_dismiss = True
 
         info = self.get("")
 
         if info["version"] != self.VERSION:
             raise Exception("Incompatible Versions {server_version:s} (client version {client_version:s}".format(str(info["version"]), client_version=self.VERSION))
 
-    def get(self, path, params={}):
-        response = requests.get(self.base_url + path, params=params)
+    def _timeout(self, method, path, timeout=None):
+        timeouts = [value for value in (timeout, self.timeout) if value is not None]
+        deadline = _deadline.get()
 
-        if response.status_code != 200:
-            raise Exception(response.text)
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
 
-        data = json.loads(response.text)
+            if remaining <= 0:
+                raise DeadlineExceeded("Deadline exceeded before {:s} {:s}".format(method, path))
 
-        return data
+            timeouts.append(remaining)
 
-    def post(self, path, params={}, payload=None):
-        response = requests.post(self.base_url + path, params=params, json=payload)
+        return min(timeouts, default=None)
+
+    def _exchange(self, method, path, params, payload, headers, timeout=None):
+        headers = dict(headers or {})
+        headers["Accept-Encoding"] = self.accept_encoding
+        body = None
+        body_bytes = 0
+
+        if payload is not None:
+            body = json.dumps(payload).encode("utf-8")
+            body_bytes = len(body)
+            headers.setdefault("Content-Type", "application/json")
+
+            if self.compress_requests_over is not None and body_bytes >= self.compress_requests_over:
+                body = compression.encode(body, "gzip")
+                headers["Content-Encoding"] = "gzip"
+
+        started = time.monotonic()
+
+        try:
+            response = self.transport.request(method, path, params=params, body=body, headers=headers, timeout=timeout)
+        except TimeoutError as e:
+            raise DeadlineExceeded("{:s} {:s} timed out".format(method, path)) from e
+
+        if self.hedge_policy is not None and method == "GET":
+            self.hedge_policy.record(method, path, time.monotonic() - started)
+
+        content = compression.decode(response.content, response.headers.get("Content-Encoding"))
+
+        self.transfer_stats.record(method, path, body_bytes, len(body or b""), len(response.content), len(content))
+
+        return response, content
+
+    def _request(self, method, path, params={}, payload=None, headers=None, timeout=None):
+        # (decoded data, response), for callers that need the response headers as well
+        timeout = self._timeout(method, path, timeout)
+
+        if self.hedge_policy is not None and method == "GET":
+            response, content = self.hedge_policy.run(
+                method,
+                path,
+                lambda: self._exchange(method, path, params, payload, headers, timeout),
+            )
+        else:
+            response, content = self._exchange(method, path, params, payload, headers, timeout)
 
         if response.status_code != 200:
-            raise Exception(response.text)
+            raise RequestError(response.status_code, content.decode("utf-8", errors="replace"))
 
-        data = json.loads(response.text)
+        return json.loads(content), response
 
-        return data
+    def request(self, method, path, params={}, payload=None, headers=None, timeout=None):
+        return self._request(method, path, params=params, payload=payload, headers=headers, timeout=timeout)[0]
 
-    def put(self, path, params={}, payload=None):
-        response = requests.put(self.base_url + path, params=params, json=payload)
+    def get_if_none_match(self, path, params={}, etag=None):
+        # conditional GET, returns (None, etag) if the daemon reports the representation behind etag unchanged
+        headers = {"If-None-Match": etag} if etag is not None else None
+
+        response, content = self._exchange("GET", path, params, None, headers, self._timeout("GET", path))
+
+        if response.status_code == 304:
+            return None, etag
 
         if response.status_code != 200:
-            raise Exception(response.text)
+            raise RequestError(response.status_code, content.decode("utf-8", errors="replace"))
 
-        data = json.loads(response.text)
+        data = json.loads(content)
 
-        return data
+        # the etag is None if the daemon has no validator for the resource, it then always answers with the full payload
+        return data, response.headers.get("ETag")
+
+    def get(self, path, params={}):
+        return self.request("GET", path, params=params)
+
+    def post(self, path, params={}, payload=None):
+        return self.request("POST", path, params=params, payload=payload)
+
+    def put(self, path, params={}, payload=None):
+        return self.request("PUT", path, params=params, payload=payload)
+
+    def patch(self, path, params={}, payload=None, headers=None):
+        return self.request("PATCH", path, params=params, payload=payload, headers=headers)
 
     def delete(self, path, params={}, payload=None):
-        response = requests.delete(self.base_url + path, params=params, json=payload)
+        return self.request("DELETE", path, params=params, payload=payload)
 
-        if response.status_code != 200:
-            raise Exception(response.text)
+    def enable_hedging(self, **options):
+        # GETs are idempotent, a slow one is raced against a duplicate, see HedgePolicy for the options
+        if self.hedge_policy is None:
+            self.hedge_policy = HedgePolicy(**options)
 
-        data = json.loads(response.text)
+        return self.hedge_policy
 
-        return data
+    def enable_write_behind(self, interval=0.1, idle=0.02):
+        # rapid applies to the same channel are collapsed to the latest value, they are sent asynchronously
+        if self.write_queue is None:
+            self.write_queue = WriteBehindQueue(self, interval=interval, idle=idle).start()
+
+        return self.write_queue
+
+    def enable_process_decoding(self, processes=None, min_things=DecodePool.MIN_THINGS):
+        # for very large installs, where decoding the things takes seconds of CPU time, processes defaults to the CPU count,
+        # listings of fewer than min_things are still decoded in process, returns None on a single CPU, where the
+        # workers would only slow decoding down
+        if self.decode_pool is None and DecodePool.worthwhile():
+            self.decode_pool = DecodePool(self.base_url, processes=processes, min_things=min_things)
+
+        return self.decode_pool
+
+    def flush(self):
+        if self.write_queue is not None:
+            self.write_queue.flush()
 
     def close(self):
-        pass
+        if self.write_queue is not None:
+            self.write_queue.stop()
+            self.write_queue = None
 
-    def bridge(self, id):
-        bridge = self.get("/bridges/{:s}".format(id))
+        if self.hedge_policy is not None:
+            self.hedge_policy.close()
+
+        if self.decode_pool is not None:
+            self.decode_pool.close()
+            self.decode_pool = None
+
+        self.transport.close()
 
-        return Bridge(
-            self,
+    @property
+    def label(self):
+        return self.url_label(self.base_url)
+
+    @staticmethod
+    def url_label(url):
+        return unquote(urlsplit(url).netloc)
+
+    def _load_bridge(self, bridge, etag=None):
+        return self.identity_map.load(
+            Bridge,
             bridge["id"],
             bridge["vendorPrefix"],
             bridge["instanceId"],
             bridge["settingsSchema"],
             bridge["settings"],
+            etag,
         )
 
+    def _load_thing(self, thing):
+        result_thing = self.identity_map.load(
+            Thing,
+            thing["id"],
+            thing["name"],
+            thing["bridge_id"],
+            thing["tags"],
+        )
+
+        result_thing._set_channels(thing["channels"])
+
+        return result_thing
+
+    def _load_thing_record(self, record):
+        id, name, bridge_id, tags, channels = record
+
+        result_thing = self.identity_map.load(Thing, id, name, bridge_id, tags)
+        result_thing._set_channels(channels)
+
+        return result_thing
+
+    def _load_trigger(self, trigger):
+        return self.identity_map.load(
+            Trigger,
+            trigger["id"],
+            trigger["eventName"],
+        )
+
+    def _load_rule(self, rule):
+        result_rule = self.identity_map.load(
+            Rule,
+            rule["id"],
+            rule["name"],
+            rule["actions"],
+        )
+
+        result_rule._triggers = {
+            trigger["id"]: self._load_trigger(trigger)
+            for trigger in rule["triggers"]
+        }
+
+        return result_rule
+
+    def bridge(self, id):
+        bridge, response = self._request("GET", "/bridges/{:s}".format(id))
+
+        return self._load_bridge(bridge, response.headers.get("ETag"))
+
     def bridges(self):
         bridges = self.get("/bridges", params={"expand": True})
 
         for bridge in bridges.values():
-            yield Bridge(
-                self,
-                bridge["id"],
-                bridge["vendorPrefix"],
-                bridge["instanceId"],
-                bridge["settingsSchema"],
-                bridge["settings"],
-            )
+            yield self._load_bridge(bridge)
 
     def bridge_types(self):
         return self.get("/bridges/types")
@@ -93,29 +312,7 @@ class Client():
     def thing(self, id):
         thing = self.get("/things/{thing_id:s}".format(thing_id=id))
 
-        result_thing = Thing(
-            self,
-            thing["id"],
-            thing["name"],
-            thing["bridge_id"],
-            thing["tags"],
-        )
-
-        result_thing._channels = {
-            channel_name:
-            Channel(
-                self,
-                result_thing,
-                channel["id"],
-                channel["name"],
-                channel["sensor"],
-                channel["type"],
-                channel["value"],
-            )
-            for channel_name, channel in thing["channels"].items()
-        }
-
-        return result_thing
+        return self._load_thing(thing)
 
     def tags(self):
         return self.get("/things/tags")
@@ -123,38 +320,142 @@ class Client():
     def scan(self):
         return self.get("/things/scan")
 
+    def scan_async(self, registry=None, poll_interval=1.0):
+        return ScanJob(self, registry=registry, poll_interval=poll_interval).start()
+
+    def online_monitor(self, filter_tags=None, **options):
+        monitor = OnlineMonitor(self, **options)
+        monitor.add_all(self.things(filter_tags=filter_tags))
+
+        return monitor.start()
+
     def things(self, filter_tags=None):
+        if self.decode_pool is not None:
+            yield from self._things_in_processes(filter_tags)
+            return
+
         things = self.get("/things", params={"expand": True, "tag": filter_tags})
         
         for thing in things.values():
-            result_thing = Thing(
-                self,
-                thing["id"],
-                thing["name"],
-                thing["bridge_id"],
-                thing["tags"],
+            yield self._load_thing(thing)
+
+    def _things_in_processes(self, filter_tags=None):
+        # things come grouped by bridge, followed by those the plain listing has but no bridge listed
+        thing_ids = self.get("/things", params={"tag": filter_tags})
+
+        if len(thing_ids) < self.decode_pool.min_things:
+            things = self.get("/things", params={"expand": True, "tag": filter_tags})
+
+            for thing in things.values():
+                yield self._load_thing(thing)
+
+            return
+
+        bridge_ids = list(self.get("/bridges"))
+
+        # the deadline is handed to the workers as well, their requests and the wait for them stop when it expires
+        expires = _deadline.get()
+        listed = set()
+
+        def fetch(futures):
+            try:
+                for future in futures:
+                    timeout = expires - time.monotonic() if expires is not None else None
+
+                    try:
+                        fetched = future.result(timeout=max(0, timeout) if timeout is not None else None)
+                    except TimeoutError:
+                        raise DeadlineExceeded("Deadline exceeded while decoding things")
+
+                    for path, wire_bytes, decoded_bytes in fetched.transfers:
+                        self.transfer_stats.record("GET", path, 0, 0, wire_bytes, decoded_bytes)
+
+                    if fetched.status_code is None:
+                        raise DeadlineExceeded(fetched.message)
+
+                    if fetched.status_code != 200:
+                        raise RequestError(fetched.status_code, fetched.message)
+
+                    for record in fetched.records:
+                        listed.add(record[0])
+
+                        yield self._load_thing_record(record)
+            finally:
+                for future in futures:
+                    future.cancel()
+
+        yield from fetch([
+            self.decode_pool.fetch(["/bridges/{:s}/things".format(bridge_id)], filter_tags, self.accept_encoding, self.timeout, expires)
+            for bridge_id in bridge_ids
+        ])
+
+        # things of bridges that are gone or not listed yet, fetched one by one, spread over the workers
+        leftover = ["/things/{:s}".format(thing_id) for thing_id in thing_ids if thing_id not in listed]
+        chunk_size = -(-len(leftover) // self.decode_pool.processes)
+
+        yield from fetch([
+            self.decode_pool.fetch(leftover[start:start + chunk_size], None, self.accept_encoding, self.timeout, expires)
+            for start in range(0, len(leftover), chunk_size or 1)
+        ])
+
+    def retag(self, filter_tags=None, add=(), remove=(), max_workers=8):
+        # the daemon only edits one tag of one thing per request, so only tags a thing actually lacks or carries are
+        # sent, things are retagged concurrently and their requests in order
+        add = list(dict.fromkeys(add))
+        remove = [tag for tag in dict.fromkeys(remove) if tag not in add]
+
+        def retag_thing(thing):
+            result = RetagResult(
+                thing,
+                [tag for tag in add if tag not in thing.tags],
+                [tag for tag in remove if tag in thing.tags],
             )
 
-            result_thing._channels = {
-                channel_name:
-                Channel(
-                    self,
-                    result_thing,
-                    channel["id"],
-                    channel["name"],
-                    channel["sensor"],
-                    channel["type"],
-                    channel["value"],
-                )
-                for channel_name, channel in thing["channels"].items()
-            }
-
-            yield result_thing
-
-    def notifications(self):
-        notifications = self.get("/notifications")
+            try:
+                for tag in result.added:
+                    thing.add_tag(tag)
+
+                for tag in result.removed:
+                    thing.remove_tag(tag)
+            except Exception as e:
+                result.error = e
+
+            return result
+
+        things = list(self.things(filter_tags=filter_tags))
+
+        if not things:
+            return []
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # in copies of the caller's context, so a deadline around retag() bounds every request
+            futures = [executor.submit(contextvars.copy_context().run, retag_thing, thing) for thing in things]
+
+            return [future.result() for future in futures]
+
+    def channel_frame(self, filter_tags=None, numpy=False):
+        frame = ChannelFrame.from_payload(self.get("/things", params={"expand": True, "tag": filter_tags}))
+
+        if numpy:
+            return frame.to_numpy()
+
+        return frame
+
+    def notifications(self, since=None):
+        # since is a created timestamp, notifications created at it are included again, daemons that don't know the
+        # parameter either ignore it or reject it, both get filtered here
+        try:
+            notifications = self.get("/notifications", params={"since": since} if since is not None else {})
+        except RequestError as e:
+            if since is None or e.status_code not in (400, 404, 405):
+                raise
+
+            notifications = self.get("/notifications")
 
         for notification in notifications:
+            if since is not None and notification["created"] < since:
+                continue
+
             yield Notification(
                 self,
                 notification["contextId"],
@@ -165,61 +466,51 @@ class Client():
                 notification["summary"],
             )
 
+    def dismiss_notifications(self, notifications):
+        # one request for all dismissable notifications, returns the dismissed context ids, daemons without the bulk
+        # endpoint get one request per notification
+        notifications = [notification for notification in notifications if notification.dismissable]
+
+        if not notifications:
+            return []
+
+        if self._bulk_dismiss:
+            try:
+                self.delete("/notifications", payload=[notification.context_id for notification in notifications])
+
+                return [notification.context_id for notification in notifications]
+            except RequestError as e:
+                if e.status_code not in (404, 405):
+                    raise
+
+                self._bulk_dismiss = False
+
+        for notification in notifications:
+            notification.dismiss()
+
+        return [notification.context_id for notification in notifications]
+
     def triggers(self):
         triggers = self.get("/triggers")
 
         for trigger in triggers.values():
-            yield Trigger(
-                self,
-                trigger["id"],
-                trigger["eventName"],
-            )
+            yield self._load_trigger(trigger)
 
     def trigger(self, id):
         trigger = self.get("/triggers/{trigger_id:s}".format(trigger_id=id))
 
-        return Trigger(
-            self,
-            trigger["id"],
-            trigger["eventName"],
-        )
+        return self._load_trigger(trigger)
 
     def rules(self):
         rules = self.get("/rules")
         
         for rule in rules.values():
-            result_rule = Rule(
-                self,
-                rule["id"],
-                rule["name"],
-                rule["actions"],
-            )
-
-            result_rule._triggers = {
-                trigger["id"]:
-                Trigger(self, trigger["id"], trigger["eventName"])
-                for trigger in rule["triggers"]
-            }
-
-            yield result_rule
+            yield self._load_rule(rule)
 
     def rule(self, id):
         rule = self.get("/rules/{rule_id:s}".format(rule_id=id))
 
-        result_rule = Rule(
-            self,
-            rule["id"],
-            rule["name"],
-            rule["actions"],
-        )
-
-        result_rule._triggers = {
-            trigger["id"]:
-            Trigger(self, trigger["id"], trigger["eventName"])
-            for trigger in rule["triggers"]
-        }
-
-        return result_rule
+        return self._load_rule(rule)
 
     def add_rule(self):
         rule_id = self.post("/rules")
@@ -230,6 +521,36 @@ class Client():
         return self.get("/plugins")
 
 
+class IdentityMap():
+    def __init__(self, client):
+        self.client = client
+
+        # model class -> id -> live instance, entries vanish once nobody references the instance
+        self._instances = {}
+        self._lock = threading.Lock()
+
+    def load(self, cls, id, *args):
+        with self._lock:
+            instances = self._instances.setdefault(cls, WeakValueDictionary())
+            instance = instances.get(id)
+
+            if instance is None:
+                instance = cls(self.client, id, *args)
+                instances[id] = instance
+            else:
+                instance._refresh(*args)
+
+            return instance
+
+    def get(self, cls, id):
+        with self._lock:
+            return self._instances.get(cls, {}).get(id)
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(instances) for instances in self._instances.values())
+
+
 class TriggerList(list):
     def __init__(self, rule, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -246,11 +567,17 @@ class Rule():
         self.actions = actions
         self._triggers = {}
 
+    def _refresh(self, name, actions):
+        self.name = name
+        self.actions = actions
+
     def triggers(self):
         return TriggerList(self, self._triggers.values())
 
     def add_trigger(self, trigger):
-        return self.client.post("/rules/{rule_id:s}/triggers".format(rule_id=self.id), payload=trigger.id)
+        trigger_id = trigger if isinstance(trigger, str) else trigger.id
+
+        return self.client.post("/rules/{rule_id:s}/triggers".format(rule_id=self.id), payload=trigger_id)
 
 
 class Trigger():
@@ -260,6 +587,9 @@ class Trigger():
         self.id = id
         self.event_name = event_name
 
+    def _refresh(self, event_name):
+        self.event_name = event_name
+
 
 class Notification():
     def __init__(self, client, context_id, type, dismissable, created, title, summary):
@@ -273,8 +603,12 @@ class Notification():
         self.summary = summary
 
     def dismiss(self):
-        if self.dismissable:
-            pass
+        if not self.dismissable:
+            return False
+
+        self.client.delete("/notifications/{context_id:s}".format(context_id=self.context_id))
+
+        return True
 
 
 class Thing():
@@ -285,7 +619,15 @@ class Thing():
         self.name = name
         self.bridge_id = bridge_id
         self.tags = tags
-        self._channels = {}
+        self._channels = ChannelMap(self, {})
+
+    def _refresh(self, name, bridge_id, tags):
+        self.name = name
+        self.bridge_id = bridge_id
+        self.tags = tags
+
+    def _set_channels(self, channels):
+        self._channels._update(channels)
 
     def online(self):
         return self.client.get("/things/{thing_id:s}/online".format(thing_id=self.id))
@@ -304,16 +646,7 @@ class Thing():
         return self.name != None
 
     def bridge(self):
-        bridge = self.client.get("/bridges/{:s}".format(self.bridge_id))
-
-        return Bridge(
-            self.client,
-            bridge["id"],
-            bridge["vendorPrefix"],
-            bridge["instanceId"],
-            bridge["settingsSchema"],
-            bridge["settings"],
-        )
+        return self.client.bridge(self.bridge_id)
 
     def add_tag(self, tag):
         self.tags = self.client.post("/things/{thing_id:s}/tags".format(thing_id=self.id), payload=tag)
@@ -331,6 +664,71 @@ class Thing():
         self.client.delete("/things/{thing_id:s}".format(thing_id=self.id))
 
 
+class RetagResult():
+    def __init__(self, thing, added, removed, error=None):
+        self.thing = thing
+        self.added = added
+        self.removed = removed
+        self.error = error
+
+    @property
+    def client(self):
+        return self.thing.client
+
+    @property
+    def changed(self):
+        return bool(self.added or self.removed)
+
+    @property
+    def success(self):
+        return self.error is None
+
+
+def _channel_fields(data):
+    # channel payloads are dicts, or channel records if the thing was decoded in a worker process
+    if isinstance(data, tuple):
+        return data
+
+    return data["id"], data["name"], data["sensor"], data["type"], data["value"]
+
+
+class ChannelMap(Mapping):
+    def __init__(self, thing, payload):
+        self.thing = thing
+
+        # Channel objects are only built from the decoded payload when first accessed
+        self._payload = payload
+        self._channels = {}
+
+    def __getitem__(self, name):
+        channel = self._channels.get(name)
+
+        if channel is None:
+            channel = Channel(self.thing.client, self.thing, *_channel_fields(self._payload[name]))
+
+            self._channels[name] = channel
+
+        return channel
+
+    def __iter__(self):
+        return iter(self._payload)
+
+    def __len__(self):
+        return len(self._payload)
+
+    def __contains__(self, name):
+        return name in self._payload
+
+    def _update(self, payload):
+        self._payload = payload
+
+        for name, channel in list(self._channels.items()):
+            if name in payload:
+                channel._refresh(*_channel_fields(payload[name]))
+            else:
+                del self._channels[name]
+
+
 class Channel():
     def __init__(self, client, thing, id, channel, sensor, type, value):
         self.client = client
@@ -342,7 +740,18 @@ class Channel():
         self.type = type
         self.value = value
 
+    def _refresh(self, id, channel, sensor, type, value):
+        self.id = id
+        self.channel = channel
+        self.sensor = sensor
+        self.type = type
+        self.value = value
+
     def apply(self, value):
+        if self.client.write_queue is not None:
+            self.client.write_queue.put(self.thing.id, self.channel, value)
+            return
+
         self.client.put("/things/{thing_id:s}/channels/{channel:s}".format(thing_id=self.thing.id, channel=self.channel), payload=value)
 
 
@@ -354,7 +763,7 @@ class ThingList(list):
 
 
 class Bridge():
-    def __init__(self, client, id, vendor_prefix, instance_id, settings_schema, settings):
+    def __init__(self, client, id, vendor_prefix, instance_id, settings_schema, settings, etag=None):
         self.client = client
 
         self.id = id
@@ -362,6 +771,35 @@ class Bridge():
         self.instance_id = instance_id
         self.settings_schema = settings_schema
         self.settings = settings
+        self._settings_validator = None
+
+        # the daemon's validator of the bridge as received with it or the last settings write, listings have none
+        self.etag = etag
+
+    def _refresh(self, vendor_prefix, instance_id, settings_schema, settings, etag=None):
+        if settings_schema != self.settings_schema:
+            self._settings_validator = None
+
+        # a validator is only kept for the settings it was received with
+        if etag is not None:
+            self.etag = etag
+        elif settings != self.settings:
+            self.etag = None
+
+        self.vendor_prefix = vendor_prefix
+        self.instance_id = instance_id
+        self.settings_schema = settings_schema
+        self.settings = settings
+
+    @property
+    def settings_validator(self):
+        if self._settings_validator is None:
+            self._settings_validator = JsonSchemaValidator.compile(self.settings_schema, vendor_prefix=self.vendor_prefix)
+
+        return self._settings_validator
+
+    def validate_settings(self, settings):
+        self.settings_validator.validate(settings)
 
     def things(self):
         things = self.client.get("/bridges/{bridge_id:s}/things".format(bridge_id=self.id))
@@ -369,29 +807,7 @@ class Bridge():
         result = ThingList(self)
 
         for thing in things.values():
-            result_thing = Thing(
-                self.client,
-                thing["id"],
-                thing["name"],
-                thing["bridge_id"],
-                thing["tags"],
-            )
-
-            result_thing._channels = {
-                channel_name:
-                Channel(
-                    self.client,
-                    result_thing,
-                    channel["id"],
-                    channel["name"],
-                    channel["sensor"],
-                    channel["type"],
-                    channel["value"],
-                )
-                for channel_name, channel in thing["channels"].items()
-            }
-
-            result.append(result_thing)
+            result.append(self.client._load_thing(thing))
         
         return result
 
@@ -399,11 +815,61 @@ class Bridge():
     def active(self):
         return self.client.get("/bridges/{bridge_id:s}/running".format(bridge_id=self.id))
 
-    def set_settings(self, settings):
+    def set_settings(self, settings, validate=True):
+        if validate:
+            self.validate_settings(settings)
+
+        _, response = self.client._request("PUT", "/bridges/{bridge_id:s}/settings".format(bridge_id=self.id), payload=settings)
+
+        self.settings = settings
+        self.etag = response.headers.get("ETag")
+
+    def _put_settings(self, path, settings, headers, unconditional):
+        # the whole document, only sent without a validator if that was asked for
+        if "If-Match" not in headers and not unconditional:
+            raise RequestError(428, "No validator for the settings of bridge \"{:s}\", they can only be overwritten unconditionally".format(self.id))
+
+        return self.client._request("PUT", path, payload=settings, headers=headers)[1]
+
+    def update_settings(self, settings, validate=True, unconditional=False):
+        # sends only the merge patch against the cached settings, with If-Match set to the bridge's validator if it
+        # has one, a merge patch can't set a member to null, such settings and daemons without merge patch support
+        # get the whole document by PUT, which needs a validator or unconditional=True
+        if settings == self.settings:
+            return False
+
+        if validate:
+            self.validate_settings(settings)
+
+        path = "/bridges/{bridge_id:s}/settings".format(bridge_id=self.id)
+        headers = {"If-Match": self.etag} if self.etag is not None else {}
+
         try:
-            self.client.put("/bridges/{bridge_id:s}/settings".format(bridge_id=self.id), payload=settings)
-        except:
+            if settings is None or has_null_members(settings):
+                response = self._put_settings(path, settings, headers, unconditional)
+            else:
+                try:
+                    _, response = self.client._request(
+                        "PATCH",
+                        path,
+                        payload=create_merge_patch(self.settings, settings),
+                        headers=dict(headers, **{"Content-Type": "application/merge-patch+json"}),
+                    )
+                except RequestError as e:
+                    if e.status_code != 405:
+                        raise
+
+                    response = self._put_settings(path, settings, headers, unconditional)
+        except RequestError as e:
+            if e.status_code == 412:
+                raise PreconditionFailed(e.status_code, "Settings of bridge \"{:s}\" were changed concurrently".format(self.id))
+
             raise
 
+        self.settings = settings
+        self.etag = response.headers.get("ETag")
+
+        return True
+
     def remove(self):
         self.client.delete("/bridges/{bridge_id:s}".format(bridge_id=self.id))
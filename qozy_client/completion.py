@@ -0,0 +1,306 @@
+# Shell completion for the qozy command. The completer runs on every keystroke, so this module only uses the
+# standard library and never imports the client: candidates come from a JSON index that "qozy completion refresh"
+# rebuilds in the background once it is older than its TTL, the command line structure from a spec of the
+# argument parser written at the same time.
+
+import json
+import os
+import sys
+import time
+import zlib
+from qozy_client.utils.paths import default_cache_directory
+
+
+INDEX_VERSION = 1
+DEFAULT_TTL = 300
+
+# channel names are spread over this many files by thing id, so a completion only loads a small part of them
+CHANNEL_SHARDS = 64
+
+# (command group, argument dest) -> index kind, dests alone are looked up if the pair isn't listed
+GROUP_KINDS = {
+    ("bridge", "id"): "bridges",
+    ("thing", "id"): "things",
+    ("thing", "channel"): "channels",
+    ("rule", "id"): "rules",
+}
+
+DEST_KINDS = {
+    "tags": "tags",
+    "add": "tags",
+    "remove": "tags",
+    "thing": "things",
+    "trigger": "triggers",
+    "trigger_id": "triggers",
+    "event": "events",
+}
+
+SCRIPTS = {
+    "bash": """_qozy_complete() {
+    local IFS=$'\\n'
+    COMPREPLY=($(qozy-complete "${COMP_WORDS[@]:1:$COMP_CWORD}" 2>/dev/null))
+}
+complete -o default -F _qozy_complete qozy
+""",
+    "zsh": """#compdef qozy
+_qozy() {
+    local -a candidates
+    candidates=("${(@f)$(qozy-complete "${(@)words[2,CURRENT]}" 2>/dev/null)}")
+
+    if [[ -n "${candidates[1]}" ]]; then
+        compadd -a candidates
+    else
+        _files
+    fi
+}
+compdef _qozy qozy
+""",
+    "fish": """complete -c qozy -f -a '(qozy-complete (commandline -opc)[2..-1] (commandline -ct) 2>/dev/null)'
+""",
+}
+
+
+def completion_directory():
+    return os.path.join(default_cache_directory(), "completion")
+
+
+def index_key(hosts=None, port=None, hosts_file=None):
+    # same defaults as the CLI, the key only has to be stable between the completer and the refresh
+    if hosts_file:
+        hosts = list(hosts or ()) + ["@" + os.path.abspath(hosts_file)]
+
+    hosts = hosts or [os.getenv("QOZY_REMOTE_URL") or os.getenv("QOZY_REMOTE_HOST", "localhost")]
+    port = port or os.getenv("QOZY_REMOTE_PORT", 9876)
+
+    return "{:08x}".format(zlib.crc32(json.dumps([list(hosts), str(port)]).encode("utf-8")))
+
+
+def _channel_shard(thing_id):
+    return zlib.crc32(thing_id.encode("utf-8")) % CHANNEL_SHARDS
+
+
+def _write_json(path, data):
+    # readers never see a partially written file
+    temporary_path = "{:s}.{:d}.tmp".format(path, os.getpid())
+
+    with open(temporary_path, "w") as f:
+        json.dump(data, f, separators=(",", ":"))
+
+    os.replace(temporary_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def build_spec(parser):
+    # positionals in order, a subcommand slot holds the spec of every subcommand
+    import argparse
+
+    spec = {"options": {}, "positionals": []}
+
+    for action in parser._actions:
+        if action.option_strings:
+            for option_string in action.option_strings:
+                spec["options"][option_string] = {"dest": action.dest, "value": action.nargs != 0}
+        elif isinstance(action, argparse._SubParsersAction):
+            spec["positionals"].append({
+                "commands": {name: build_spec(subparser) for name, subparser in action.choices.items()},
+            })
+        else:
+            spec["positionals"].append({"dest": action.dest, "many": action.nargs in ("*", "+")})
+
+    return spec
+
+
+def write_spec(parser, directory=None):
+    directory = directory or completion_directory()
+    os.makedirs(directory, exist_ok=True)
+
+    _write_json(os.path.join(directory, "spec.json"), build_spec(parser))
+
+
+def write_index(client, key, directory=None):
+    directory = directory or completion_directory()
+    os.makedirs(directory, exist_ok=True)
+
+    things = client.get("/things", params={"expand": True})
+    triggers = client.get("/triggers")
+
+    _write_json(os.path.join(directory, key + ".json"), {
+        "version": INDEX_VERSION,
+        "created": time.time(),
+        "things": list(things),
+        "bridges": list(client.get("/bridges")),
+        "rules": list(client.get("/rules")),
+        "triggers": list(triggers),
+        "events": sorted({trigger["eventName"] for trigger in triggers.values()}),
+        "tags": sorted({tag for thing in things.values() for tag in thing["tags"]}),
+    })
+
+    # channel names are only needed for "qozy thing ID set", they live apart to keep the index small
+    shards = [{} for _ in range(CHANNEL_SHARDS)]
+
+    for thing_id, thing in things.items():
+        shards[_channel_shard(thing_id)][thing_id] = list(thing["channels"])
+
+    for shard, channels in enumerate(shards):
+        _write_json(os.path.join(directory, "{:s}.channels.{:02x}.json".format(key, shard)), channels)
+
+    try:
+        os.unlink(os.path.join(directory, key + ".refreshing"))
+    except FileNotFoundError:
+        pass
+
+
+def _refresh_in_background(directory, key, hosts, port, hosts_file=None):
+    # one refresh at a time, a marker older than a minute belongs to a refresh that died
+    marker = os.path.join(directory, key + ".refreshing")
+
+    try:
+        if time.time() - os.path.getmtime(marker) < 60:
+            return
+    except OSError:
+        pass
+
+    import subprocess
+
+    os.makedirs(directory, exist_ok=True)
+
+    with open(marker, "w"):
+        pass
+
+    arguments = [sys.executable, "-c", "from qozy_client.cli import main; main()"]
+
+    for host in hosts or ():
+        arguments.extend(("--host", host))
+
+    if hosts_file:
+        arguments.extend(("--hosts-file", os.path.abspath(hosts_file)))
+
+    if port:
+        arguments.extend(("--port", str(port)))
+
+    subprocess.Popen(
+        arguments + ["completion", "refresh"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def _parse(spec, words):
+    # walks the completed words like argparse would, returns the innermost spec, the subcommand path,
+    # the values per dest, the next positional slot and the option still waiting for its value
+    path = []
+    values = {}
+    slot = 0
+    pending = None
+
+    for word in words:
+        if pending is not None:
+            values.setdefault(pending, []).append(word)
+            pending = None
+            continue
+
+        if word.startswith("-") and len(word) > 1:
+            option = spec["options"].get(word.split("=", 1)[0])
+
+            if option is not None and option["value"] and "=" not in word:
+                pending = option["dest"]
+
+            continue
+
+        if slot >= len(spec["positionals"]):
+            continue
+
+        positional = spec["positionals"][slot]
+
+        if "commands" in positional:
+            if word in positional["commands"]:
+                spec = positional["commands"][word]
+                path.append(word)
+                slot = 0
+
+            continue
+
+        values.setdefault(positional["dest"], []).append(word)
+
+        if not positional["many"]:
+            slot += 1
+
+    return spec, path, values, slot, pending
+
+
+def _kind(path, dest):
+    return GROUP_KINDS.get((path[0] if path else None, dest)) or DEST_KINDS.get(dest)
+
+
+def complete(words, directory=None, ttl=None):
+    # words after the program name, the last one is the word being completed
+    directory = directory or completion_directory()
+    ttl = ttl if ttl is not None else float(os.getenv("QOZY_COMPLETION_TTL", DEFAULT_TTL))
+
+    root = _read_json(os.path.join(directory, "spec.json"))
+
+    if root is None:
+        return []
+
+    words = list(words) or [""]
+    current = words[-1]
+
+    spec, path, values, slot, pending = _parse(root, words[:-1])
+
+    if pending is not None:
+        kind = _kind(path, pending)
+    elif current.startswith("-"):
+        return sorted(option for option in spec["options"] if option.startswith(current))
+    elif slot < len(spec["positionals"]):
+        positional = spec["positionals"][slot]
+
+        if "commands" in positional:
+            return sorted(command for command in positional["commands"] if command.startswith(current))
+
+        kind = _kind(path, positional["dest"])
+    else:
+        kind = None
+
+    if kind is None:
+        return []
+
+    hosts = values.get("hosts")
+    port = values.get("port", [None])[-1]
+    hosts_file = values.get("hosts_file", [None])[-1]
+    key = index_key(hosts, port, hosts_file)
+
+    index = _read_json(os.path.join(directory, key + ".json"))
+
+    if index is None or index.get("version") != INDEX_VERSION or time.time() - index["created"] > ttl:
+        _refresh_in_background(directory, key, hosts, port, hosts_file)
+
+    if index is None:
+        return []
+
+    if kind == "channels":
+        thing_id = values.get("id", [""])[-1]
+        channels = _read_json(os.path.join(directory, "{:s}.channels.{:02x}.json".format(key, _channel_shard(thing_id)))) or {}
+        candidates = channels.get(thing_id, [])
+    else:
+        candidates = index.get(kind, [])
+
+    return sorted(candidate for candidate in candidates if candidate.startswith(current))
+
+
+def main():
+    try:
+        candidates = complete(sys.argv[1:])
+    except Exception:
+        # a broken completion must never break the shell
+        candidates = []
+
+    sys.stdout.write("".join(candidate + "\n" for candidate in candidates))
@@ -0,0 +1,110 @@
+import json
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from qozy_client.transport import create_transport
+from qozy_client.utils import compression
+
+
+# what a worker process sends back instead of the decoded payload are plain tuples, they pickle a lot smaller and
+# unpickle faster than the nested dicts of the payload or namedtuples:
+#
+#   thing record:   (id, name, bridge_id, tags, {channel name: channel record})
+#   channel record: (id, name, sensor, type, value)
+
+# what a worker fetched: transfers holds (path, wire bytes, decoded bytes) per request, records is None if a request
+# failed, status_code is None if it timed out
+FetchedThings = namedtuple("FetchedThings", ("transfers", "status_code", "records", "message"))
+
+
+# transport of the worker process, each worker keeps its own connection to the daemon
+_transport = None
+
+
+def _init_worker(url):
+    global _transport
+
+    _transport = create_transport(url)
+
+
+def thing_records(things, filter_tags=None):
+    filter_tags = set(filter_tags or ())
+    records = []
+
+    for thing in things:
+        if filter_tags and not filter_tags.issubset(thing["tags"]):
+            continue
+
+        # the channel name is the key object itself, pickle then stores it once
+        channels = {
+            name: (channel["id"], name, channel["sensor"], channel["type"], channel["value"])
+            for name, channel in thing["channels"].items()
+        }
+
+        records.append((thing["id"], thing["name"], thing["bridge_id"], thing["tags"], channels))
+
+    return records
+
+
+def _get(path, accept_encoding, timeout, expires):
+    # returns (status code, wire bytes, decoded content), status code None if the request timed out, expires is a
+    # time.monotonic() value, that clock is the same for all processes of a machine
+    if expires is not None:
+        remaining = expires - time.monotonic()
+
+        if remaining <= 0:
+            return None, 0, b"deadline exceeded before GET " + path.encode("utf-8")
+
+        timeout = min(timeout, remaining) if timeout is not None else remaining
+
+    try:
+        response = _transport.request("GET", path, params={}, body=None, headers={"Accept-Encoding": accept_encoding}, timeout=timeout)
+    except TimeoutError:
+        return None, 0, b"GET " + path.encode("utf-8") + b" timed out"
+
+    return response.status_code, len(response.content), compression.decode(response.content, response.headers.get("Content-Encoding"))
+
+
+def _fetch(paths, filter_tags, accept_encoding, timeout, expires):
+    # runs in a worker, the responses are fetched, decompressed and decoded there, /things/ID answers with a single
+    # thing, other paths with a mapping of things
+    transfers = []
+    records = []
+
+    for path in paths:
+        status_code, wire_bytes, content = _get(path, accept_encoding, timeout, expires)
+        transfers.append((path, wire_bytes, len(content)))
+
+        if status_code != 200:
+            return FetchedThings(transfers, status_code, None, content.decode("utf-8", errors="replace"))
+
+        things = json.loads(content)
+        records.extend(thing_records([things] if path.startswith("/things/") else things.values(), filter_tags))
+
+    return FetchedThings(transfers, 200, records, None)
+
+
+class DecodePool():
+    # listings of fewer things are decoded faster in process than they are handed to the workers and back
+    MIN_THINGS = 2000
+
+    @staticmethod
+    def worthwhile():
+        # on a single CPU the workers decode on the same CPU as this process, pickling and IPC only add to it
+        return (os.cpu_count() or 1) > 1
+
+    def __init__(self, url, processes=None, min_things=MIN_THINGS):
+        # the payload is split per bridge, every worker fetches and decodes the things of one bridge at a time
+        self.url = url
+        self.processes = processes or os.cpu_count() or 1
+        self.min_things = min_things
+
+        self._executor = ProcessPoolExecutor(max_workers=self.processes, initializer=_init_worker, initargs=(url,))
+
+    def fetch(self, paths, filter_tags=None, accept_encoding="identity", timeout=None, expires=None):
+        # future of the FetchedThings of the given paths, timeout limits every single request, expires all of them
+        return self._executor.submit(_fetch, list(paths), list(filter_tags or ()), accept_encoding, timeout, expires)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,193 @@
+from qozy_client.utils.jsonschema import json_equal
+
+
+def _numpy():
+    # imported on first use, it takes longer to import than the rest of the client and most commands never need it
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("numpy is required for NumPy-backed channel frames")
+
+    return numpy
+
+
+class ChannelFrame():
+    COLUMNS = ("thing_id", "channel", "type", "sensor", "value", "tags")
+
+    # NumPy-backed frames keep value as float64, NaN where the value isn't a number or boolean, and add:
+    #   value_valid   the value is a number or boolean
+    #   value_bool    the value is a boolean
+    #   value_object  the values as they were in the payload
+    NUMPY_COLUMNS = ("value_valid", "value_bool", "value_object")
+
+    def __init__(self, columns, tag_index=None):
+        self.columns = columns
+
+        # NumPy-backed frames only: (tag names, row of each thing tag, tag name index of each thing tag)
+        self.tag_index = tag_index
+
+    @classmethod
+    def from_payload(cls, things):
+        columns = {name: [] for name in cls.COLUMNS}
+
+        thing_ids = columns["thing_id"]
+        channel_names = columns["channel"]
+        types = columns["type"]
+        sensors = columns["sensor"]
+        values = columns["value"]
+        tags = columns["tags"]
+
+        for thing in things.values():
+            thing_id = thing["id"]
+            thing_tags = tuple(thing["tags"])
+
+            for channel_name, channel in thing["channels"].items():
+                thing_ids.append(thing_id)
+                channel_names.append(channel_name)
+                types.append(channel["type"])
+                sensors.append(channel["sensor"])
+                values.append(channel["value"])
+                tags.append(thing_tags)
+
+        return cls(columns)
+
+    @property
+    def is_numpy(self):
+        return not isinstance(self.columns["thing_id"], list)
+
+    def __len__(self):
+        return len(self.columns["thing_id"])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def to_numpy(self):
+        if self.is_numpy:
+            return self
+
+        numpy = _numpy()
+        values = self.columns["value"]
+
+        numbers = []
+        valid = []
+        booleans = []
+
+        for value in values:
+            is_number = isinstance(value, (int, float))
+
+            numbers.append(value if is_number else numpy.nan)
+            valid.append(is_number)
+            booleans.append(value is True or value is False)
+
+        columns = {
+            # fixed width strings, comparing them is a single vectorized operation
+            "thing_id": numpy.array(self.columns["thing_id"], dtype=str),
+            "channel": numpy.array(self.columns["channel"], dtype=str),
+            "type": numpy.array(self.columns["type"], dtype=str),
+            "sensor": numpy.array(self.columns["sensor"], dtype=bool),
+            "value": numpy.array(numbers, dtype=float),
+            "value_valid": numpy.array(valid, dtype=bool),
+            "value_bool": numpy.array(booleans, dtype=bool),
+        }
+
+        # lists and tuples would otherwise become extra dimensions
+        for name, column in (("value_object", values), ("tags", self.columns["tags"])):
+            columns[name] = numpy.empty(len(column), dtype=object)
+            columns[name][:] = column
+
+        # thing tags as flat (row, tag) pairs, rows of the same thing share their tags tuple
+        tag_codes = {}
+        tag_rows = []
+        tag_row_codes = []
+
+        for row, thing_tags in enumerate(self.columns["tags"]):
+            for tag in thing_tags:
+                tag_rows.append(row)
+                tag_row_codes.append(tag_codes.setdefault(tag, len(tag_codes)))
+
+        tag_index = (list(tag_codes), numpy.array(tag_rows, dtype=numpy.intp), numpy.array(tag_row_codes, dtype=numpy.intp))
+
+        return ChannelFrame(columns, tag_index)
+
+    def _numpy_equals(self, name, value):
+        numpy = _numpy()
+        column = self.columns[name]
+
+        if name == "value":
+            if isinstance(value, bool):
+                return self.columns["value_bool"] & (column == value)
+
+            if isinstance(value, (int, float)):
+                return self.columns["value_valid"] & ~self.columns["value_bool"] & (column == value)
+
+            column = self.columns["value_object"]
+        elif name == "sensor":
+            return column == value if isinstance(value, bool) else numpy.zeros(len(self), dtype=bool)
+        elif column.dtype.kind == "U":
+            return column == value if isinstance(value, str) else numpy.zeros(len(self), dtype=bool)
+
+        # lists, strings and nulls of value and the tags tuples are compared one by one
+        return numpy.fromiter((json_equal(item, value) for item in column), dtype=bool, count=len(column))
+
+    def mask(self, **equals):
+        # row mask for column == value with JSON equality, combined with and
+        if self.is_numpy:
+            result = _numpy().ones(len(self), dtype=bool)
+
+            for name, value in equals.items():
+                result &= self._numpy_equals(name, value)
+
+            return result
+
+        result = [True] * len(self)
+
+        for name, value in equals.items():
+            result = [selected and json_equal(column_value, value) for selected, column_value in zip(result, self.columns[name])]
+
+        return result
+
+    def select(self, mask):
+        if self.is_numpy:
+            numpy = _numpy()
+            mask = numpy.asarray(mask, dtype=bool)
+
+            tag_names, tag_rows, tag_codes = self.tag_index
+            kept = mask[tag_rows]
+            # new row numbers of the selected rows
+            rows = numpy.cumsum(mask) - 1
+
+            return ChannelFrame(
+                {name: column[mask] for name, column in self.columns.items()},
+                (tag_names, rows[tag_rows[kept]], tag_codes[kept]),
+            )
+
+        return ChannelFrame({
+            name: [value for value, selected in zip(column, mask) if selected]
+            for name, column in self.columns.items()
+        })
+
+    def count_by_tag(self, mask=None):
+        # rows per tag, of the masked rows if a mask is given
+        if self.is_numpy:
+            numpy = _numpy()
+            tag_names, tag_rows, tag_codes = self.tag_index
+
+            if mask is not None:
+                tag_codes = tag_codes[numpy.asarray(mask, dtype=bool)[tag_rows]]
+
+            counts = numpy.bincount(tag_codes, minlength=len(tag_names))
+
+            return {tag: int(count) for tag, count in zip(tag_names, counts) if count}
+
+        tags = self.columns["tags"]
+
+        if mask is not None:
+            tags = [value for value, selected in zip(tags, mask) if selected]
+
+        counts = {}
+
+        for thing_tags in tags:
+            for tag in thing_tags:
+                counts[tag] = counts.get(tag, 0) + 1
+
+        return counts
@@ -0,0 +1,147 @@
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from qozy_client.sampler import RingBuffer
+from qozy_client.stats import endpoint
+
+
+HedgeStats = namedtuple("HedgeStats", ("requests", "hedged", "hedge_won", "primary_won"))
+
+
+class HedgePolicy():
+    def __init__(self, percentile=95, min_samples=20, min_delay=0.005, max_delay=1.0, capacity=256, max_workers=8, max_hedge_ratio=0.1):
+        # a duplicate GET is sent once the primary took longer than the given latency percentile of its endpoint,
+        # endpoints with fewer than min_samples recorded latencies aren't hedged, max_workers bounds the hedged requests
+        # in flight and at most max_hedge_ratio of all requests get a duplicate, so a saturated daemon doesn't get twice
+        # the load
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.capacity = capacity
+        self.max_hedge_ratio = max_hedge_ratio
+
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_won = 0
+        self.primary_won = 0
+
+        # endpoint -> RingBuffer of (timestamp, seconds)
+        self._latencies = {}
+        self._lock = threading.Lock()
+        # each hedged request takes a slot, it runs its primary and hedge attempt on the bounded executor
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=2 * max_workers)
+
+    def record(self, method, path, seconds):
+        key = endpoint(method, path)
+
+        with self._lock:
+            latencies = self._latencies.get(key)
+
+            if latencies is None:
+                latencies = self._latencies[key] = RingBuffer(self.capacity)
+
+            latencies.append(time.time(), seconds)
+
+    def delay(self, method, path):
+        with self._lock:
+            latencies = self._latencies.get(endpoint(method, path))
+
+            if latencies is None or len(latencies) < self.min_samples:
+                return None
+
+            values = sorted(value for _, value in latencies.samples())
+
+        index = min(len(values) - 1, int(len(values) * self.percentile / 100))
+
+        return min(self.max_delay, max(self.min_delay, values[index]))
+
+    def _release_after(self, futures):
+        # the slot of a hedged request is only free again once all of its attempts returned, a losing one keeps
+        # running in the background
+        remaining = [len(futures)]
+        lock = threading.Lock()
+
+        def done(future):
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+
+            if last:
+                self._slots.release()
+
+        for future in futures:
+            future.add_done_callback(done)
+
+    def run(self, method, path, exchange):
+        # exchange() performs the request, it is called a second time if the first call is slow
+        delay = self.delay(method, path)
+
+        with self._lock:
+            self.requests += 1
+
+        # without a free slot the request isn't hedged and runs on the caller's thread
+        if delay is None or not self._slots.acquire(blocking=False):
+            return exchange()
+
+        # a slot guarantees an idle worker for each attempt, so the first one never queues behind other requests,
+        # otherwise every request of a busy client would look slow and get hedged, the caller's thread only waits
+        # so it can return whichever answer comes first
+        started = threading.Event()
+
+        def attempt():
+            started.set()
+
+            return exchange()
+
+        primary = self._executor.submit(attempt)
+
+        # the delay counts from when the request was actually sent off
+        started.wait()
+        done, _ = wait([primary], timeout=delay)
+
+        with self._lock:
+            within_budget = not done and self.hedged < self.requests * self.max_hedge_ratio
+
+            if within_budget:
+                self.hedged += 1
+
+        if not within_budget:
+            self._release_after([primary])
+
+            return primary.result()
+
+        hedge = self._executor.submit(exchange)
+        self._release_after([primary, hedge])
+
+        pending = {primary, hedge}
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+            # a failed attempt only counts if the other one failed as well
+            for future in done:
+                if future.exception() is None:
+                    with self._lock:
+                        if future is hedge:
+                            self.hedge_won += 1
+                        else:
+                            self.primary_won += 1
+
+                    return future.result()
+
+        return primary.result()
+
+    def stats(self):
+        with self._lock:
+            return HedgeStats(
+                requests=self.requests,
+                hedged=self.hedged,
+                hedge_won=self.hedge_won,
+                primary_won=self.primary_won,
+            )
+
+    def close(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,300 @@
+import math
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+
+OPERATIONS = ("things", "online", "apply", "rules")
+
+# reads only, writes have to be asked for since they reach real devices
+DEFAULT_MIX = {"things": 1, "online": 8, "rules": 1}
+
+OperationStats = namedtuple("OperationStats", ("operation", "requests", "errors", "throughput", "histogram"))
+IntervalStats = namedtuple("IntervalStats", ("elapsed", "target_rate", "requests", "errors", "throughput", "histogram"))
+
+
+def parse_mix(text):
+    # "things=1,online=8,apply=2" -> operation -> relative weight
+    mix = {}
+
+    for part in text.split(","):
+        if not part.strip():
+            continue
+
+        operation, _, weight = part.partition("=")
+        operation = operation.strip()
+
+        if operation not in OPERATIONS:
+            raise ValueError("Unknown operation \"{:s}\", expected one of {:s}".format(operation, ", ".join(OPERATIONS)))
+
+        mix[operation] = float(weight) if weight else 1.0
+
+        if mix[operation] < 0:
+            raise ValueError("Negative weight for \"{:s}\"".format(operation))
+
+    if not any(mix.values()):
+        raise ValueError("The mix has no operation with a positive weight")
+
+    return mix
+
+
+class LatencyHistogram():
+    # HDR style histogram of integer microseconds: values below 2**precision are counted exactly, every power of two
+    # above is split into 2**(precision - 1) buckets, so a recorded value is off by less than 2**(1 - precision)
+
+    def __init__(self, precision=8):
+        self.precision = precision
+        self._linear = 1 << precision
+        self._half = 1 << (precision - 1)
+
+        # bucket index -> count
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        if value < self._linear:
+            return value
+
+        shift = value.bit_length() - self.precision
+
+        return self._linear + (shift - 1) * self._half + (value >> shift) - self._half
+
+    def _highest_value(self, index):
+        # highest value counted in the bucket
+        if index < self._linear:
+            return index
+
+        shift, sub_bucket = divmod(index - self._linear, self._half)
+        shift += 1
+
+        return ((sub_bucket + self._half + 1) << shift) - 1
+
+    def record(self, seconds):
+        value = max(0, int(seconds * 1000000))
+        index = self._index(value)
+
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+
+        self.count += other.count
+        self.total += other.total
+
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, percentile):
+        # in seconds, None if nothing was recorded
+        if not self.count:
+            return None
+
+        rank = max(1, math.ceil(self.count * percentile / 100))
+        seen = 0
+
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+
+            if seen >= rank:
+                return min(self._highest_value(index), self.max) / 1000000
+
+        return self.max / 1000000
+
+    @property
+    def mean(self):
+        return self.total / self.count / 1000000 if self.count else None
+
+
+class LoadGenerator():
+    def __init__(self, client, rate=50, duration=30, ramp_up=0, mix=None, max_workers=64, seed=None):
+        # open loop: requests are started at rate per second whether or not earlier ones are answered, the rate climbs
+        # linearly from zero during the first ramp_up seconds, latencies count from the scheduled start, so time spent
+        # waiting for a free worker shows up in them instead of lowering the rate
+        if rate <= 0:
+            raise ValueError("The rate has to be positive")
+
+        self.client = client
+        self.rate = rate
+        self.duration = duration
+        self.ramp_up = min(ramp_up, duration)
+        self.mix = mix if mix is not None else dict(DEFAULT_MIX)
+        self.max_workers = max_workers
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        self.histograms = {operation: LatencyHistogram() for operation in self.mix}
+        self.requests = {operation: 0 for operation in self.mix}
+        self.errors = {operation: 0 for operation in self.mix}
+
+        # exception type name -> count
+        self.error_types = {}
+        self.elapsed = None
+
+        self._interval_histogram = LatencyHistogram()
+        self._interval_requests = 0
+        self._interval_errors = 0
+
+        self._things = []
+        self._channels = []
+
+    def _prepare(self):
+        if self.mix.get("online") or self.mix.get("apply"):
+            self._things = list(self.client.things())
+
+        if self.mix.get("apply"):
+            self._channels = [channel for thing in self._things for channel in thing.channels().values() if not channel.sensor]
+
+            if not self._channels:
+                raise ValueError("No writable channel to apply values to")
+
+        if self.mix.get("online") and not self._things:
+            raise ValueError("No thing to check online status of")
+
+    def arrivals(self):
+        # offsets in seconds from the start, the count of arrivals until t is the integral of the rate over t
+        ramp_requests = self.rate * self.ramp_up / 2
+        number = 0
+
+        while True:
+            if number < ramp_requests:
+                offset = math.sqrt(2 * self.ramp_up * number / self.rate)
+            else:
+                offset = self.ramp_up + (number - ramp_requests) / self.rate
+
+            if offset >= self.duration:
+                return
+
+            yield offset
+            number += 1
+
+    def target_rate(self, elapsed):
+        if self.ramp_up and elapsed < self.ramp_up:
+            return self.rate * elapsed / self.ramp_up
+
+        return self.rate
+
+    def _operation(self, operation):
+        # the target is picked by the scheduling thread, the random generator isn't shared with the workers
+        if operation == "things":
+            return lambda: list(self.client.things())
+
+        if operation == "rules":
+            return lambda: list(self.client.rules())
+
+        if operation == "online":
+            thing = self._random.choice(self._things)
+
+            return thing.online
+
+        # writes back the value the channel had when the run started
+        channel = self._random.choice(self._channels)
+        value = channel.value
+
+        return lambda: channel.apply(value)
+
+    def _execute(self, operation, function, scheduled):
+        error = None
+
+        try:
+            function()
+        except Exception as e:
+            error = e
+
+        latency = time.monotonic() - scheduled
+
+        with self._lock:
+            self.requests[operation] += 1
+            self.histograms[operation].record(latency)
+            self._interval_requests += 1
+            self._interval_histogram.record(latency)
+
+            if error is not None:
+                self.errors[operation] += 1
+                self._interval_errors += 1
+                self.error_types[type(error).__name__] = self.error_types.get(type(error).__name__, 0) + 1
+
+    def _take_interval(self, elapsed, interval):
+        with self._lock:
+            stats = IntervalStats(
+                elapsed=elapsed,
+                target_rate=self.target_rate(elapsed),
+                requests=self._interval_requests,
+                errors=self._interval_errors,
+                throughput=self._interval_requests / interval,
+                histogram=self._interval_histogram,
+            )
+
+            self._interval_histogram = LatencyHistogram()
+            self._interval_requests = 0
+            self._interval_errors = 0
+
+        return stats
+
+    def run(self, report_interval=None, on_interval=None):
+        # blocks for the duration, on_interval(IntervalStats) is called every report_interval seconds
+        self._prepare()
+
+        operations = list(self.mix)
+        weights = [self.mix[operation] for operation in operations]
+
+        started = time.monotonic()
+        next_report = started + report_interval if report_interval else None
+        last_report = started
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for offset in self.arrivals():
+                scheduled = started + offset
+
+                while True:
+                    now = time.monotonic()
+
+                    if next_report is not None and next_report <= scheduled:
+                        if now < next_report:
+                            time.sleep(next_report - now)
+
+                        on_interval(self._take_interval(next_report - started, report_interval))
+                        last_report = next_report
+                        next_report += report_interval
+                        continue
+
+                    if now < scheduled:
+                        time.sleep(scheduled - now)
+
+                    break
+
+                operation = self._random.choices(operations, weights)[0]
+                executor.submit(self._execute, operation, self._operation(operation), scheduled)
+
+        self.elapsed = time.monotonic() - started
+
+        if next_report is not None and self._interval_requests:
+            # what was answered after the last report, including the requests still in flight when scheduling ended
+            on_interval(self._take_interval(self.elapsed, started + self.elapsed - last_report))
+
+        return self.results()
+
+    def results(self):
+        with self._lock:
+            return [
+                OperationStats(
+                    operation=operation,
+                    requests=self.requests[operation],
+                    errors=self.errors[operation],
+                    throughput=self.requests[operation] / self.elapsed if self.elapsed else 0,
+                    histogram=self.histograms[operation],
+                )
+                for operation in self.mix
+                if self.requests[operation]
+            ]
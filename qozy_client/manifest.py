@@ -0,0 +1,204 @@
+import contextvars
+import json
+from concurrent.futures import ThreadPoolExecutor
+from qozy_client.utils.jsonschema import ValidationError
+from qozy_client.utils.mergepatch import create_merge_patch, apply_merge_patch
+
+
+class ManifestError(Exception):
+    pass
+
+
+def load_manifest(path):
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            # only imported for YAML manifests, every CLI command imports this module
+            try:
+                import yaml
+            except ImportError:
+                raise ManifestError("PyYAML is required to read YAML manifests")
+
+            manifest = yaml.safe_load(f)
+        else:
+            manifest = json.load(f)
+
+    if manifest is None:
+        return {}
+
+    if not isinstance(manifest, dict):
+        raise ManifestError("Manifest must be a mapping with \"things\" and/or \"bridges\"")
+
+    return manifest
+
+
+class Change():
+    def __init__(self, target, description, apply):
+        self.target = target
+        self.description = description
+        self.apply = apply
+
+    def __str__(self):
+        return self.description
+
+
+class ChangeResult():
+    def __init__(self, change, error=None):
+        self.change = change
+        self.error = error
+
+    @property
+    def success(self):
+        return self.error is None
+
+
+class Plan():
+    def __init__(self):
+        # changes to the same target are applied in order, different targets concurrently
+        self.targets = {}
+
+    def add(self, target, description, apply):
+        self.targets.setdefault(target, []).append(Change(target, description, apply))
+
+    def changes(self):
+        for changes in self.targets.values():
+            yield from changes
+
+    def __len__(self):
+        return sum(len(changes) for changes in self.targets.values())
+
+    @staticmethod
+    def _execute_target(changes):
+        results = []
+
+        for change in changes:
+            try:
+                change.apply()
+                results.append(ChangeResult(change))
+            except Exception as e:
+                results.append(ChangeResult(change, e))
+
+        return results
+
+    def execute(self, max_workers=8):
+        if not self.targets:
+            return []
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # every change runs in a copy of the caller's context, so a deadline set around execute() bounds it
+            futures = [executor.submit(contextvars.copy_context().run, self._execute_target, changes) for changes in self.targets.values()]
+
+            return [result for future in futures for result in future.result()]
+
+
+def _plan_thing(plan, thing, spec):
+    target = "thing {:s}".format(thing.id)
+
+    if "name" in spec and spec["name"] != thing.name:
+        plan.add(target, "rename \"{}\" -> \"{}\"".format(thing.name, spec["name"]), lambda: thing.set_name(spec["name"]))
+
+    if "tags" in spec:
+        current_tags = set(thing.tags)
+        # null is no tags
+        desired_tags = set(spec["tags"] or ())
+
+        for tag in sorted(desired_tags - current_tags):
+            plan.add(target, "add tag \"{:s}\"".format(tag), lambda tag=tag: thing.add_tag(tag))
+
+        for tag in sorted(current_tags - desired_tags):
+            plan.add(target, "remove tag \"{:s}\"".format(tag), lambda tag=tag: thing.remove_tag(tag))
+
+    for channel_name, value in (spec.get("channels") or {}).items():
+        channels = thing.channels()
+
+        if channel_name not in channels:
+            raise ManifestError("Thing \"{:s}\" has no channel \"{:s}\"".format(thing.id, channel_name))
+
+        channel = channels[channel_name]
+
+        if channel.value != value:
+            plan.add(target, "set channel \"{:s}\" {} -> {}".format(channel_name, json.dumps(channel.value), json.dumps(value)), lambda channel=channel, value=value: channel.apply(value))
+
+
+def _plan_bridge(plan, bridge, spec):
+    target = "bridge {:s}".format(bridge.id)
+
+    if "settings" in spec and spec["settings"] != bridge.settings:
+        try:
+            bridge.validate_settings(spec["settings"])
+        except ValidationError as e:
+            raise ManifestError("Invalid settings for bridge \"{:s}\", {:s}".format(bridge.id, str(e)))
+
+        patch = create_merge_patch(bridge.settings, spec["settings"])
+        # settings that aren't objects are replaced as a whole
+        description = "update settings {:s}".format(", ".join(sorted(patch))) if isinstance(patch, dict) else "replace settings"
+
+        plan.add(target, description, lambda: bridge.update_settings(spec["settings"], validate=False))
+
+
+def _specs(manifest, kind):
+    # id -> spec, an empty spec (a bare "thing-1:" in YAML) changes nothing
+    specs = manifest.get(kind) or {}
+
+    if not isinstance(specs, dict):
+        raise ManifestError("\"{:s}\" must be a mapping of ids to specs".format(kind))
+
+    for id, spec in specs.items():
+        if spec is not None and not isinstance(spec, dict):
+            raise ManifestError("Spec of \"{:s}\" must be a mapping".format(id))
+
+    return {id: spec or {} for id, spec in specs.items()}
+
+
+def plan_manifest(client, manifest, ignore_missing=False):
+    # bridge settings are merged into the current ones like a merge patch, null removes a key, unless the bridge's
+    # spec has "replace": true
+    plan = Plan()
+
+    thing_specs = _specs(manifest, "things")
+    bridge_specs = _specs(manifest, "bridges")
+
+    if thing_specs:
+        things = {thing.id: thing for thing in client.things()}
+
+        for thing_id, spec in thing_specs.items():
+            if thing_id not in things:
+                if ignore_missing:
+                    continue
+
+                raise ManifestError("Unknown thing \"{:s}\"".format(thing_id))
+
+            _plan_thing(plan, things[thing_id], spec)
+
+    if bridge_specs:
+        bridges = {bridge.id: bridge for bridge in client.bridges()}
+
+        for bridge_id, spec in bridge_specs.items():
+            if bridge_id not in bridges:
+                if ignore_missing:
+                    continue
+
+                raise ManifestError("Unknown bridge \"{:s}\"".format(bridge_id))
+
+            bridge = bridges[bridge_id]
+
+            if "settings" in spec and not spec.get("replace"):
+                spec = dict(spec, settings=apply_merge_patch(bridge.settings, spec["settings"]))
+
+            _plan_bridge(plan, bridge, spec)
+
+    return plan
+
+
+def plan_bridge_settings(bridges, answers, prefill=None):
+    # one answer set for the given bridges, merged into each bridge's own settings so unrelated keys are kept, answers
+    # given on top of prefilled settings only carry the fields that differ from them, so values of the bridge the
+    # prefill came from, like its host, aren't copied to the others
+    if prefill is not None:
+        answers = create_merge_patch(prefill, answers)
+
+    plan = Plan()
+
+    for bridge in bridges:
+        _plan_bridge(plan, bridge, {"settings": apply_merge_patch(bridge.settings, answers)})
+
+    return plan
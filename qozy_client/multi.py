@@ -0,0 +1,118 @@
+import contextvars
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from qozy_client.client import Client
+
+
+def parse_target(target, default_port):
+    # returns a daemon URL, targets with a scheme are taken as they are, IPv6 addresses with a port are written
+    # [addr]:port as in URLs
+    target = target.strip()
+
+    if "://" in target:
+        return target
+
+    if target.startswith("["):
+        host, _, port = target.partition("]")
+        host += "]"
+
+        if port and not port.startswith(":"):
+            raise ValueError("Invalid target \"{:s}\"".format(target))
+
+        port = port[1:]
+    elif target.count(":") > 1:
+        # bare IPv6 address
+        host, port = "[{:s}]".format(target), None
+    else:
+        host, _, port = target.partition(":")
+
+    return Client.URL_SCHEME.format(host=host, port=int(port) if port else default_port)
+
+
+def read_hosts_file(path, default_port):
+    targets = []
+
+    with open(path) as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+
+            if line:
+                targets.append(parse_target(line, default_port))
+
+    return targets
+
+
+class MultiClient():
+    _DONE = object()
+
+    def __init__(self, clients):
+        self.clients = clients
+
+        # label -> exception of the failed connect or last failed request per daemon
+        self.errors = {}
+
+    @classmethod
+    def connect(cls, urls, **client_options):
+        errors = {}
+
+        def connect(url):
+            try:
+                return Client(url=url, **client_options)
+            except Exception as e:
+                errors[Client.url_label(url)] = e
+
+        with ThreadPoolExecutor(max_workers=len(urls) or 1) as executor:
+            futures = [executor.submit(contextvars.copy_context().run, connect, url) for url in urls]
+            clients = [client for client in (future.result() for future in futures) if client is not None]
+
+        multi_client = cls(clients)
+        multi_client.errors.update(errors)
+
+        return multi_client
+
+    def _stream(self, fetch):
+        # items are yielded in arrival order, a slow daemon doesn't hold back the others
+        results = queue.Queue()
+
+        def run(client):
+            try:
+                for item in fetch(client):
+                    results.put(item)
+            except Exception as e:
+                self.errors[client.label] = e
+            finally:
+                results.put(self._DONE)
+
+        for client in self.clients:
+            # each thread runs in a copy of the caller's context, so a deadline around the call applies
+            threading.Thread(target=contextvars.copy_context().run, args=(run, client), daemon=True).start()
+
+        pending = len(self.clients)
+
+        while pending:
+            item = results.get()
+
+            if item is self._DONE:
+                pending -= 1
+            else:
+                yield item
+
+    def things(self, filter_tags=None):
+        return self._stream(lambda client: client.things(filter_tags=filter_tags))
+
+    def retag(self, filter_tags=None, add=(), remove=(), max_workers=8):
+        return list(self._stream(lambda client: client.retag(filter_tags=filter_tags, add=add, remove=remove, max_workers=max_workers)))
+
+    def bridges(self):
+        return self._stream(lambda client: client.bridges())
+
+    def rules(self):
+        return self._stream(lambda client: client.rules())
+
+    def notifications(self, since=None):
+        return self._stream(lambda client: client.notifications(since=since))
+
+    def close(self):
+        for client in self.clients:
+            client.close()
@@ -0,0 +1,39 @@
+from collections import OrderedDict
+
+
+class NotificationFeed():
+    def __init__(self, client, since=None, dedup_size=10000):
+        self.client = client
+
+        # created timestamp of the newest notification delivered so far
+        self.cursor = since
+        self.dedup_size = dedup_size
+        self._seen = OrderedDict()
+
+    @staticmethod
+    def _key(notification):
+        return (notification.context_id, notification.created, notification.title)
+
+    def poll(self):
+        new_notifications = []
+
+        for notification in self.client.notifications(since=self.cursor):
+            key = self._key(notification)
+
+            if key in self._seen:
+                continue
+
+            self._seen[key] = None
+
+            if len(self._seen) > self.dedup_size:
+                self._seen.popitem(last=False)
+
+            if self.cursor is None or notification.created > self.cursor:
+                self.cursor = notification.created
+
+            new_notifications.append(notification)
+
+        return new_notifications
+
+    def dismiss(self, notifications):
+        return self.client.dismiss_notifications(notifications)
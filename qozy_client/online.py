@@ -0,0 +1,218 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import namedtuple
+
+
+ScheduleEntry = namedtuple("ScheduleEntry", ("thing_id", "due_in", "interval", "online", "transitions", "last_change"))
+
+
+class _MonitoredThing():
+    __slots__ = ("thing", "online", "interval", "due", "transitions", "last_change")
+
+    def __init__(self, thing, interval):
+        self.thing = thing
+        self.online = None
+        self.interval = interval
+        self.due = None
+        self.transitions = 0
+        self.last_change = None
+
+
+class OnlineMonitor():
+    def __init__(self, client, min_interval=5, max_interval=300, backoff=2.0, max_rps=10, on_change=None):
+        # things that just changed state are polled every min_interval seconds, each stable poll multiplies
+        # the interval by backoff up to max_interval, all polls share a budget of max_rps requests per second
+        self.client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.max_rps = max_rps
+
+        # callables taking (thing, online), called from the monitor thread on every transition
+        self.listeners = [on_change] if on_change is not None else []
+
+        self.polls = 0
+        self.transitions = 0
+        self.errors = 0
+
+        self._things = {}
+        # (due, sequence, thing id), entries whose due doesn't match the thing's are stale and skipped
+        self._heap = []
+        self._sequence = itertools.count()
+
+        self._tokens = float(max_rps)
+        self._refilled = time.monotonic()
+
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = None
+
+    def _schedule(self, monitored, due):
+        monitored.due = due
+        heapq.heappush(self._heap, (due, next(self._sequence), monitored.thing.id))
+
+    def add(self, thing):
+        with self._condition:
+            if thing.id in self._things:
+                return
+
+            monitored = _MonitoredThing(thing, self.min_interval)
+            self._things[thing.id] = monitored
+            self._schedule(monitored, time.monotonic())
+
+            self._condition.notify()
+
+    def add_all(self, things):
+        for thing in things:
+            self.add(thing)
+
+    def remove(self, thing_id):
+        with self._condition:
+            self._things.pop(thing_id, None)
+
+    def online(self, thing_id):
+        # last polled state, None until the first poll succeeded
+        monitored = self._things.get(thing_id)
+
+        return monitored.online if monitored is not None else None
+
+    @staticmethod
+    def _entry(thing_id, monitored, now):
+        return ScheduleEntry(
+            thing_id=thing_id,
+            due_in=max(0, monitored.due - now) if monitored.due is not None else None,
+            interval=monitored.interval,
+            online=monitored.online,
+            transitions=monitored.transitions,
+            last_change=monitored.last_change,
+        )
+
+    def entry(self, thing_id):
+        with self._condition:
+            monitored = self._things.get(thing_id)
+
+            return self._entry(thing_id, monitored, time.monotonic()) if monitored is not None else None
+
+    def _next_due(self):
+        while self._heap:
+            due, _, thing_id = self._heap[0]
+            monitored = self._things.get(thing_id)
+
+            if monitored is not None and monitored.due == due:
+                return monitored
+
+            heapq.heappop(self._heap)
+
+        return None
+
+    def _take_token(self, now):
+        # token bucket holding at most one second of budget, returns the seconds until a token is available
+        self._tokens = min(float(self.max_rps), self._tokens + (now - self._refilled) * self.max_rps)
+        self._refilled = now
+
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0
+
+        return (1 - self._tokens) / self.max_rps
+
+    def _wait_next(self):
+        while not self._stopped:
+            monitored = self._next_due()
+            now = time.monotonic()
+
+            if monitored is None:
+                self._condition.wait()
+                continue
+
+            if monitored.due > now:
+                self._condition.wait(monitored.due - now)
+                continue
+
+            delay = self._take_token(now)
+
+            if delay:
+                self._condition.wait(delay)
+                continue
+
+            heapq.heappop(self._heap)
+
+            # in flight, it is rescheduled once the poll returns
+            monitored.due = None
+
+            return monitored
+
+        return None
+
+    def _poll(self, monitored):
+        try:
+            online = bool(monitored.thing.online())
+        except Exception:
+            online = None
+
+        with self._condition:
+            if self._things.get(monitored.thing.id) is not monitored:
+                return
+
+            self.polls += 1
+            changed = False
+
+            if online is None:
+                self.errors += 1
+            elif monitored.online is not None and online != monitored.online:
+                changed = True
+
+                self.transitions += 1
+                monitored.transitions += 1
+                monitored.last_change = time.time()
+                monitored.interval = self.min_interval
+            else:
+                monitored.interval = min(monitored.interval * self.backoff, self.max_interval)
+
+            if online is not None:
+                monitored.online = online
+
+            self._schedule(monitored, time.monotonic() + monitored.interval)
+
+        if changed:
+            for listener in self.listeners:
+                listener(monitored.thing, online)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                monitored = self._wait_next()
+
+            if monitored is None:
+                return
+
+            self._poll(monitored)
+
+    def schedule(self):
+        # upcoming polls in order, things currently being polled have a due_in of None
+        now = time.monotonic()
+
+        with self._condition:
+            entries = [self._entry(thing_id, monitored, now) for thing_id, monitored in self._things.items()]
+
+        return sorted(entries, key=lambda entry: (entry.due_in is not None, entry.due_in or 0))
+
+    def start(self):
+        with self._condition:
+            self._stopped = False
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+        return self
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+        if self._thread:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,131 @@
+import json
+
+
+THING_KEYS = ("thing_id", "thingId", "thing")
+CHANNEL_KEYS = ("channel", "channel_name", "channelName")
+
+
+def _action_references(actions):
+    # actions are free-form, collect every (thing id, channel name or None) pair mentioned anywhere
+    references = set()
+    pending = [actions]
+
+    while pending:
+        value = pending.pop()
+
+        if isinstance(value, dict):
+            thing_id = next((value[key] for key in THING_KEYS if isinstance(value.get(key), str)), None)
+
+            if thing_id is not None:
+                channel = next((value[key] for key in CHANNEL_KEYS if isinstance(value.get(key), str)), None)
+                references.add((thing_id, channel))
+
+            pending.extend(value.values())
+        elif isinstance(value, list):
+            pending.extend(value)
+
+    return references
+
+
+class RuleIndex():
+    def __init__(self, client):
+        self.client = client
+
+        self.rules = {}
+        self._payloads = {}
+        self._keys = {}
+
+        self._by_trigger = {}
+        self._by_event = {}
+        self._by_thing = {}
+        self._by_channel = {}
+
+        self.refresh()
+
+    def _add(self, index, key, rule_id):
+        # dicts as ordered sets, lookups return rules in fetch order
+        index.setdefault(key, {})[rule_id] = None
+
+    def _discard(self, index, key, rule_id):
+        rule_ids = index.get(key)
+
+        if rule_ids is not None:
+            rule_ids.pop(rule_id, None)
+
+            if not rule_ids:
+                del index[key]
+
+    def _index_rule(self, rule):
+        keys = []
+
+        for trigger in rule["triggers"]:
+            keys.append((self._by_trigger, trigger["id"]))
+            keys.append((self._by_event, trigger["eventName"]))
+
+        for thing_id, channel in _action_references(rule["actions"]):
+            keys.append((self._by_thing, thing_id))
+
+            if channel is not None:
+                keys.append((self._by_channel, (thing_id, channel)))
+
+        for index, key in keys:
+            self._add(index, key, rule["id"])
+
+        self._keys[rule["id"]] = keys
+
+    def _unindex_rule(self, rule_id):
+        for index, key in self._keys.pop(rule_id, ()):
+            self._discard(index, key, rule_id)
+
+    def refresh(self):
+        # one expanded fetch, only rules whose payload changed are re-indexed
+        rules = self.client.get("/rules")
+
+        added = changed = 0
+
+        for rule_id, rule in rules.items():
+            serialized = json.dumps(rule, sort_keys=True)
+            previous = self._payloads.get(rule_id)
+
+            if previous == serialized:
+                continue
+
+            if previous is None:
+                added += 1
+            else:
+                changed += 1
+                self._unindex_rule(rule_id)
+
+            self._payloads[rule_id] = serialized
+            self.rules[rule_id] = self.client._load_rule(rule)
+            self._index_rule(rule)
+
+        removed = [rule_id for rule_id in self.rules if rule_id not in rules]
+
+        for rule_id in removed:
+            self._unindex_rule(rule_id)
+            del self.rules[rule_id]
+            del self._payloads[rule_id]
+
+        return added, changed, len(removed)
+
+    def _lookup(self, index, key):
+        return [self.rules[rule_id] for rule_id in index.get(key, ())]
+
+    def by_trigger(self, trigger_id):
+        return self._lookup(self._by_trigger, trigger_id)
+
+    def by_event(self, event_name):
+        return self._lookup(self._by_event, event_name)
+
+    def by_thing(self, thing_id):
+        return self._lookup(self._by_thing, thing_id)
+
+    def by_channel(self, thing_id, channel):
+        return self._lookup(self._by_channel, (thing_id, channel))
+
+    def __len__(self):
+        return len(self.rules)
+
+    def __iter__(self):
+        return iter(self.rules.values())
@@ -0,0 +1,209 @@
+import threading
+import time
+from array import array
+
+
+class RingBuffer():
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.timestamps = array("d", bytes(8 * capacity))
+        self.values = array("d", bytes(8 * capacity))
+        self.start = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, timestamp, value):
+        if self.size < self.capacity:
+            index = (self.start + self.size) % self.capacity
+            self.size += 1
+        else:
+            # full, overwrite the oldest sample
+            index = self.start
+            self.start = (self.start + 1) % self.capacity
+
+        self.timestamps[index] = timestamp
+        self.values[index] = value
+
+    def copy(self):
+        buffer = RingBuffer(self.capacity)
+        buffer.timestamps = array("d", self.timestamps)
+        buffer.values = array("d", self.values)
+        buffer.start = self.start
+        buffer.size = self.size
+
+        return buffer
+
+    def _index(self, position):
+        return (self.start + position) % self.capacity
+
+    def _first_position(self, since):
+        # timestamps are appended in order, so binary search the logical positions
+        low, high = 0, self.size
+
+        while low < high:
+            middle = (low + high) // 2
+
+            if self.timestamps[self._index(middle)] < since:
+                low = middle + 1
+            else:
+                high = middle
+
+        return low
+
+    def samples(self, window=None, now=None):
+        if window is None:
+            first = 0
+        else:
+            first = self._first_position((now if now is not None else time.time()) - window)
+
+        for position in range(first, self.size):
+            index = self._index(position)
+
+            yield self.timestamps[index], self.values[index]
+
+    def last(self):
+        if not self.size:
+            return None
+
+        index = self._index(self.size - 1)
+
+        return self.timestamps[index], self.values[index]
+
+    def min(self, window=None, now=None):
+        return min((value for _, value in self.samples(window, now)), default=None)
+
+    def max(self, window=None, now=None):
+        return max((value for _, value in self.samples(window, now)), default=None)
+
+    def mean(self, window=None, now=None):
+        total = 0.0
+        count = 0
+
+        for _, value in self.samples(window, now):
+            total += value
+            count += 1
+
+        return total / count if count else None
+
+    def rate(self, window=None, now=None):
+        # change per second between the first and the last sample in the window
+        first = None
+        last = None
+
+        for sample in self.samples(window, now):
+            if first is None:
+                first = sample
+
+            last = sample
+
+        if first is None or last[0] == first[0]:
+            return None
+
+        return (last[1] - first[1]) / (last[0] - first[0])
+
+
+def _numeric(value):
+    if isinstance(value, bool):
+        return 1.0 if value else 0.0
+
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    return None
+
+
+class ChannelSampler():
+    def __init__(self, client, interval=5, capacity=720, bulk_threshold=20):
+        self.client = client
+        self.interval = interval
+        self.capacity = capacity
+        self.bulk_threshold = bulk_threshold
+
+        # thing id -> channel name -> RingBuffer
+        self._series = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add(self, thing_id, channel_name):
+        with self._lock:
+            channels = self._series.setdefault(thing_id, {})
+
+            if channel_name not in channels:
+                channels[channel_name] = RingBuffer(self.capacity)
+
+    def remove(self, thing_id, channel_name):
+        with self._lock:
+            channels = self._series.get(thing_id, {})
+            channels.pop(channel_name, None)
+
+            if not channels:
+                self._series.pop(thing_id, None)
+
+    def series(self, thing_id, channel_name):
+        # a copy taken under the lock, the sampler thread keeps appending to the buffer itself
+        with self._lock:
+            return self._series[thing_id][channel_name].copy()
+
+    def record(self, thing_id, channel_name, value, timestamp=None):
+        # entry point for pushed change events, values of untracked channels are ignored
+        value = _numeric(value)
+
+        if value is None:
+            return
+
+        with self._lock:
+            buffer = self._series.get(thing_id, {}).get(channel_name)
+
+            if buffer is not None:
+                buffer.append(timestamp if timestamp is not None else time.time(), value)
+
+    def _fetch_things(self, thing_ids):
+        if len(thing_ids) > self.bulk_threshold:
+            return [thing for thing in self.client.things() if thing.id in thing_ids]
+
+        return [self.client.thing(thing_id) for thing_id in thing_ids]
+
+    def sample(self):
+        with self._lock:
+            tracked = {thing_id: list(channels) for thing_id, channels in self._series.items()}
+
+        if not tracked:
+            return
+
+        timestamp = time.time()
+
+        for thing in self._fetch_things(set(tracked)):
+            channels = thing.channels()
+
+            for channel_name in tracked[thing.id]:
+                if channel_name in channels:
+                    self.record(thing.id, channel_name, channels[channel_name].value, timestamp)
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+
+            try:
+                self.sample()
+            except Exception:
+                # keep sampling through transient daemon errors
+                pass
+
+            self._stop.wait(max(0, self.interval - (time.monotonic() - started)))
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+        if self._thread:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,128 @@
+import queue
+import threading
+import time
+from collections import namedtuple
+
+
+ScanProgress = namedtuple("ScanProgress", ("elapsed", "discovered", "known", "done", "cancelled"))
+
+
+class ThingRegistry():
+    def __init__(self, things=()):
+        self._things = {thing.id: thing for thing in things}
+        self._lock = threading.Lock()
+
+    def add(self, thing):
+        with self._lock:
+            is_new = thing.id not in self._things
+            self._things[thing.id] = thing
+
+            return is_new
+
+    def get(self, id):
+        return self._things.get(id)
+
+    def ids(self):
+        with self._lock:
+            return set(self._things)
+
+    def __contains__(self, id):
+        return id in self._things
+
+    def __len__(self):
+        return len(self._things)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._things.values()))
+
+
+class ScanJob():
+    _DONE = object()
+
+    def __init__(self, client, registry=None, poll_interval=1.0):
+        self.client = client
+        self.registry = registry if registry is not None else ThingRegistry(client.things())
+        self.poll_interval = poll_interval
+
+        self.error = None
+        self.discovered = []
+
+        self._queue = queue.Queue()
+        self._done = threading.Event()
+        self._cancelled = threading.Event()
+        self._finished = threading.Event()
+        self._started = None
+
+    def start(self):
+        self._started = time.monotonic()
+
+        threading.Thread(target=self._scan, daemon=True).start()
+        threading.Thread(target=self._watch, daemon=True).start()
+
+        return self
+
+    def _scan(self):
+        try:
+            self.client.scan()
+        except Exception as e:
+            self.error = e
+        finally:
+            self._done.set()
+
+    def _poll(self):
+        # only ids are listed, things are fetched individually once they show up
+        things = self.client.get("/things")
+        thing_ids = things.keys() if isinstance(things, dict) else things
+
+        for thing_id in thing_ids:
+            if thing_id in self.registry or self._cancelled.is_set():
+                continue
+
+            thing = self.client.thing(thing_id)
+
+            if self.registry.add(thing):
+                self.discovered.append(thing)
+                self._queue.put(thing)
+
+    def _watch(self):
+        try:
+            while not self._cancelled.is_set():
+                finished = self._done.wait(self.poll_interval)
+
+                try:
+                    self._poll()
+                except Exception as e:
+                    if finished:
+                        self.error = self.error or e
+
+                if finished:
+                    break
+        finally:
+            self._finished.set()
+            self._queue.put(self._DONE)
+
+    def progress(self):
+        return ScanProgress(
+            elapsed=time.monotonic() - self._started if self._started is not None else 0,
+            discovered=len(self.discovered),
+            known=len(self.registry),
+            done=self._finished.is_set(),
+            cancelled=self._cancelled.is_set(),
+        )
+
+    def cancel(self):
+        # the daemon side scan can't be aborted, the job stops watching for and reporting new things
+        self._cancelled.set()
+
+    def wait(self, timeout=None):
+        return self._finished.wait(timeout)
+
+    def __iter__(self):
+        while True:
+            thing = self._queue.get()
+
+            if thing is self._DONE:
+                return
+
+            yield thing
@@ -0,0 +1,240 @@
+import contextvars
+import gzip
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+
+
+SNAPSHOT_VERSION = 1
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _open(path, mode, compress=None):
+    if compress is None:
+        compress = path.endswith(".gz")
+
+    if compress:
+        return gzip.open(path, mode + "t", encoding="utf-8")
+
+    return open(path, mode, encoding="utf-8")
+
+
+def _dump(record):
+    return json.dumps(record, sort_keys=True, separators=(",", ":"))
+
+
+def _bridge_records(client):
+    for bridge in client.get("/bridges", params={"expand": True}).values():
+        yield {
+            "kind": "bridge",
+            "id": bridge["id"],
+            "vendorPrefix": bridge["vendorPrefix"],
+            "instanceId": bridge["instanceId"],
+            "settings": bridge["settings"],
+        }
+
+
+def _thing_records(client):
+    for thing in client.get("/things", params={"expand": True}).values():
+        yield {
+            "kind": "thing",
+            "id": thing["id"],
+            "name": thing["name"],
+            "bridge_id": thing["bridge_id"],
+            "tags": sorted(thing["tags"]),
+            "channels": {
+                channel_name: [channel["type"], channel["sensor"], channel["value"]]
+                for channel_name, channel in thing["channels"].items()
+            },
+        }
+
+
+def _rule_records(client):
+    for rule in client.get("/rules").values():
+        yield {
+            "kind": "rule",
+            "id": rule["id"],
+            "name": rule["name"],
+            "actions": rule["actions"],
+            "triggers": sorted(trigger["id"] for trigger in rule["triggers"]),
+        }
+
+
+def _trigger_records(client):
+    for trigger in client.get("/triggers").values():
+        yield {
+            "kind": "trigger",
+            "id": trigger["id"],
+            "eventName": trigger["eventName"],
+        }
+
+
+def export_snapshot(client, path, compress=None):
+    # one JSON record per line, written while the resources are still being fetched concurrently, into a temporary
+    # file that only replaces path once every resource was exported, a failed export leaves path untouched
+    sources = (_bridge_records, _thing_records, _rule_records, _trigger_records)
+    temporary_path = "{:s}.{:d}.tmp".format(path, os.getpid())
+    count = 0
+
+    if compress is None:
+        compress = path.endswith(".gz")
+
+    # dumped records, None once a source is done, bounded so fetches can't run far ahead of the writing
+    lines = Queue(maxsize=1024)
+
+    def produce(source):
+        try:
+            for record in source(client):
+                lines.put(_dump(record))
+        finally:
+            lines.put(None)
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(sources)) as executor:
+            futures = [executor.submit(contextvars.copy_context().run, produce, source) for source in sources]
+            finished = 0
+
+            try:
+                with _open(temporary_path, "w", compress) as f:
+                    f.write(_dump({"kind": "snapshot", "version": SNAPSHOT_VERSION, "created": time.time()}))
+                    f.write("\n")
+
+                    while finished < len(sources):
+                        line = lines.get()
+
+                        if line is None:
+                            finished += 1
+                            continue
+
+                        f.write(line)
+                        f.write("\n")
+                        count += 1
+            finally:
+                # if writing failed, sources blocked on the full queue have to be let go
+                while finished < len(sources):
+                    if lines.get() is None:
+                        finished += 1
+
+            for future in futures:
+                future.result()
+
+        os.replace(temporary_path, path)
+    except BaseException:
+        try:
+            os.unlink(temporary_path)
+        except FileNotFoundError:
+            pass
+
+        raise
+
+    return count
+
+
+def read_snapshot(path):
+    records = {}
+
+    with _open(path, "r") as f:
+        header = json.loads(f.readline() or "{}")
+
+        if header.get("kind") != "snapshot":
+            raise SnapshotError("{:s} is not a qozy snapshot".format(path))
+
+        if header.get("version") != SNAPSHOT_VERSION:
+            raise SnapshotError("Unsupported snapshot version {}".format(header.get("version")))
+
+        for line in f:
+            line = line.rstrip("\n")
+
+            if not line:
+                continue
+
+            record = json.loads(line)
+            records[(record["kind"], record["id"])] = (line, record)
+
+    return records
+
+
+class SnapshotChange():
+    ADDED = "added"
+    REMOVED = "removed"
+    CHANGED = "changed"
+
+    def __init__(self, kind, id, status, fields=()):
+        self.kind = kind
+        self.id = id
+        self.status = status
+        self.fields = fields
+
+
+def _changed_fields(old, new):
+    fields = []
+
+    for key in sorted(set(old) | set(new)):
+        if key == "channels":
+            old_channels = old.get(key, {})
+            new_channels = new.get(key, {})
+
+            for channel_name in sorted(set(old_channels) | set(new_channels)):
+                if old_channels.get(channel_name) != new_channels.get(channel_name):
+                    fields.append("channels.{:s}".format(channel_name))
+        elif old.get(key) != new.get(key):
+            fields.append(key)
+
+    return fields
+
+
+def diff_snapshots(old_path, new_path):
+    old = read_snapshot(old_path)
+    new = read_snapshot(new_path)
+
+    changes = []
+
+    for key, (line, record) in old.items():
+        if key not in new:
+            changes.append(SnapshotChange(key[0], key[1], SnapshotChange.REMOVED))
+            continue
+
+        new_line, new_record = new[key]
+
+        # records are serialized with sorted keys, identical text means identical state
+        if line != new_line:
+            changes.append(SnapshotChange(key[0], key[1], SnapshotChange.CHANGED, _changed_fields(record, new_record)))
+
+    for key in new.keys() - old.keys():
+        changes.append(SnapshotChange(key[0], key[1], SnapshotChange.ADDED))
+
+    changes.sort(key=lambda change: (change.kind, change.id))
+
+    return changes
+
+
+def snapshot_manifest(path, channels=False):
+    # restoring actuator values switches the devices, so channel values are only restored if asked for, sensor
+    # channels are read-only and never are
+    manifest = {"things": {}, "bridges": {}}
+
+    for (kind, id), (_, record) in read_snapshot(path).items():
+        if kind == "thing":
+            manifest["things"][id] = {
+                "name": record["name"],
+                "tags": record["tags"],
+            }
+
+            if channels:
+                manifest["things"][id]["channels"] = {
+                    channel_name: value
+                    for channel_name, (type, sensor, value) in record["channels"].items()
+                    if not sensor
+                }
+        elif kind == "bridge":
+            manifest["bridges"][id] = {
+                "settings": record["settings"],
+                "replace": True,
+            }
+
+    return manifest
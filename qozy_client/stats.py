@@ -0,0 +1,62 @@
+import re
+import threading
+
+
+PATH_WORDS = {
+    "bridges", "things", "rules", "triggers", "notifications", "plugins",
+    "types", "tags", "scan", "online", "name", "channels", "settings", "running",
+}
+
+
+def endpoint(method, path):
+    # ids are collapsed so that e.g. every thing shares one /things/{id} entry
+    segments = [
+        segment if segment in PATH_WORDS else "{id}"
+        for segment in re.split("/+", path.strip("/"))
+        if segment
+    ]
+
+    return "{:s} /{:s}".format(method, "/".join(segments))
+
+
+class EndpointTransfer():
+    def __init__(self):
+        self.requests = 0
+        self.sent_bytes = 0
+        self.body_bytes = 0
+        self.wire_bytes = 0
+        self.decoded_bytes = 0
+
+    @property
+    def ratio(self):
+        # decoded bytes per byte on the wire, 1.0 without compression
+        return self.decoded_bytes / self.wire_bytes if self.wire_bytes else 1.0
+
+
+class TransferStats():
+    def __init__(self):
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def record(self, method, path, body_bytes, sent_bytes, wire_bytes, decoded_bytes):
+        key = endpoint(method, path)
+
+        with self._lock:
+            transfer = self._endpoints.get(key)
+
+            if transfer is None:
+                transfer = self._endpoints[key] = EndpointTransfer()
+
+            transfer.requests += 1
+            transfer.body_bytes += body_bytes
+            transfer.sent_bytes += sent_bytes
+            transfer.wire_bytes += wire_bytes
+            transfer.decoded_bytes += decoded_bytes
+
+    def endpoints(self):
+        with self._lock:
+            return dict(self._endpoints)
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
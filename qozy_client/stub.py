@@ -0,0 +1,650 @@
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from urllib.parse import urlsplit, parse_qs, quote
+from qozy_client.utils import compression
+from qozy_client.utils.mergepatch import apply_merge_patch
+
+
+CHANNEL_TYPES = (
+    ("SwitchChannel", False, lambda rnd: rnd.random() < 0.5),
+    ("DimmerChannel", False, lambda rnd: rnd.randint(0, 100)),
+    ("ColorChannel", False, lambda rnd: [rnd.randint(0, 255), rnd.randint(0, 255), rnd.randint(0, 255)]),
+    ("TemperatureChannel", True, lambda rnd: round(rnd.uniform(15, 28), 1)),
+    ("NumberChannel", True, lambda rnd: rnd.randint(0, 1000)),
+)
+
+BRIDGE_SETTINGS_SCHEMA = {
+    "type": "object",
+    "required": ["host"],
+    "properties": {
+        "host": {"type": "string", "title": "Host"},
+        "port": {"type": "integer", "title": "Port", "default": 8080},
+        "pollInterval": {"type": "number", "title": "Poll interval"},
+        "secure": {"type": "boolean", "title": "Use TLS"},
+        "mode": {"enum": ["auto", "manual"], "title": "Mode"},
+        "devices": {"type": "array", "items": {"type": "string"}},
+    },
+}
+
+
+class SyntheticInstall():
+    def __init__(self, bridges=2, things=20, channels=4, rules=10, triggers=5, notifications=5, seed=0):
+        rnd = random.Random(seed)
+
+        self.version = "0.1"
+
+        # validators are opaque revisions, every change counts up the install's revision, bridges keep the revision
+        # of their last settings change
+        self.revision = 0
+        self.bridge_revisions = {}
+        self.bridges = {}
+        self.things = {}
+        self.triggers = {}
+        self.rules = {}
+        self.notifications = []
+        self.online = {}
+
+        for bridge_index in range(bridges):
+            bridge_id = "bridge-{:d}".format(bridge_index)
+
+            self.bridges[bridge_id] = {
+                "id": bridge_id,
+                "vendorPrefix": "vendor{:d}".format(bridge_index % 3),
+                "instanceId": "instance-{:d}".format(bridge_index),
+                "settingsSchema": BRIDGE_SETTINGS_SCHEMA,
+                "settings": {
+                    "host": "10.0.{:d}.1".format(bridge_index % 256),
+                    "port": 8080,
+                    "mode": "auto",
+                    "devices": ["device-{:d}".format(i) for i in range(things // max(bridges, 1))],
+                },
+            }
+
+        bridge_ids = list(self.bridges) or [None]
+
+        for thing_index in range(things):
+            thing_id = "thing-{:d}".format(thing_index)
+            thing_channels = {}
+
+            for channel_index in range(channels):
+                type, sensor, value = CHANNEL_TYPES[(thing_index + channel_index) % len(CHANNEL_TYPES)]
+                channel_name = "{:s}{:d}".format(type[:-len("Channel")].lower(), channel_index)
+
+                thing_channels[channel_name] = {
+                    "id": "{:s}/{:s}".format(thing_id, channel_name),
+                    "name": channel_name,
+                    "sensor": sensor,
+                    "type": type,
+                    "value": value(rnd),
+                }
+
+            self.things[thing_id] = {
+                "id": thing_id,
+                "name": "Thing {:d}".format(thing_index) if thing_index % 4 else None,
+                "bridge_id": bridge_ids[thing_index % len(bridge_ids)],
+                "tags": ["floor-{:d}".format(thing_index % 5), "room-{:d}".format(thing_index % 50)],
+                "channels": thing_channels,
+            }
+            self.online[thing_id] = rnd.random() < 0.95
+
+        for trigger_index in range(triggers):
+            trigger_id = "trigger-{:d}".format(trigger_index)
+
+            self.triggers[trigger_id] = {
+                "id": trigger_id,
+                "eventName": "event.{:d}".format(trigger_index % 10),
+            }
+
+        trigger_ids = list(self.triggers)
+        thing_ids = list(self.things)
+
+        for rule_index in range(rules):
+            rule_id = "rule-{:d}".format(rule_index)
+            thing_id = thing_ids[rule_index % len(thing_ids)] if thing_ids else None
+
+            self.rules[rule_id] = {
+                "id": rule_id,
+                "name": "Rule {:d}".format(rule_index),
+                "actions": [{"type": "apply", "thing_id": thing_id, "channel": "switch0", "value": True}] if thing_id else [],
+                "triggers": [
+                    trigger_ids[(rule_index + offset) % len(trigger_ids)]
+                    for offset in range(min(2, len(trigger_ids)))
+                ],
+            }
+
+        for notification_index in range(notifications):
+            self.notifications.append({
+                "contextId": "notification-{:d}".format(notification_index),
+                "type": "info",
+                "dismissable": notification_index % 2 == 0,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(1600000000 + notification_index * 60)),
+                "title": "Notification {:d}".format(notification_index),
+                "summary": "Synthetic notification",
+            })
+
+    def touch(self, bridge_id=None):
+        # to be called after changing the install directly, the daemon's validators of it change
+        self.revision += 1
+
+        if bridge_id is not None:
+            self.bridge_revisions[bridge_id] = self.revision
+
+    def etag(self):
+        return "\"{:d}\"".format(self.revision)
+
+    def bridge_etag(self, bridge_id):
+        return "\"bridge-{:d}\"".format(self.bridge_revisions.get(bridge_id, 0))
+
+    def rule_payload(self, rule):
+        return dict(rule, triggers=[self.triggers[trigger_id] for trigger_id in rule["triggers"] if trigger_id in self.triggers])
+
+
+class StubError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+
+        self.status = status
+        self.message = message
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    # smaller bodies aren't worth compressing
+    COMPRESS_MIN_SIZE = 1024
+
+    ROUTES = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def _payload(self):
+        length = int(self.headers.get("Content-Length") or 0)
+
+        if not length:
+            return None
+
+        body = self.rfile.read(length)
+
+        try:
+            body = compression.decode(body, self.headers.get("Content-Encoding"))
+        except ValueError as e:
+            raise StubError(415, str(e))
+
+        return json.loads(body)
+
+    def _send_not_modified(self, etag):
+        self.send_response(304)
+        self.send_header("ETag", etag)
+        self.end_headers()
+
+    def _send(self, data, status=200, etag=None):
+        body = json.dumps(data).encode("utf-8") if status == 200 else str(data).encode("utf-8")
+        encoding = None
+
+        if len(body) >= self.COMPRESS_MIN_SIZE:
+            encoding = compression.negotiate(self.headers.get("Accept-Encoding"))
+
+        if encoding is not None:
+            body = compression.encode(body, encoding)
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json" if status == 200 else "text/plain")
+
+        if encoding is not None:
+            self.send_header("Content-Encoding", encoding)
+
+        if etag is not None:
+            self.send_header("ETag", etag)
+
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _dispatch(self, method):
+        url = urlsplit(self.path)
+        path = url.path
+
+        if not path.startswith("/api"):
+            return self._send("Not found", 404)
+
+        path = path[len("/api"):]
+        params = parse_qs(url.query)
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        # whether the path is routed for another method
+        routed = False
+
+        for route_method, pattern, handler, etag in self.ROUTES:
+            match = pattern.fullmatch(path)
+
+            if match and route_method != method:
+                routed = True
+            elif match:
+                install = self.server.install
+
+                try:
+                    with self.server.lock:
+                        result = handler(install, params, self._payload(), self.headers, *match.groups())
+
+                        if method != "GET":
+                            install.touch()
+
+                        # routes without a validator of their own have the one of the whole install
+                        etag = etag(install, *match.groups()) if etag is not None else install.etag()
+                except KeyError as e:
+                    return self._send("Unknown id {}".format(e), 404)
+                except StubError as e:
+                    return self._send(e.message, e.status)
+
+                if method == "GET" and self.headers.get("If-None-Match") == etag:
+                    return self._send_not_modified(etag)
+
+                return self._send(result, etag=etag)
+
+        # the body of an unanswered request is read anyway, the next request on the connection would start with it
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        if routed:
+            return self._send("Method not allowed", 405)
+
+        return self._send("Not found", 404)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+
+class UnixStubHandler(StubHandler):
+    disable_nagle_algorithm = False
+
+
+def route(method, pattern, etag=None):
+    # etag(install, *groups) is the validator of the resource, sent with every answer
+    def decorator(handler):
+        StubHandler.ROUTES.append((method, re.compile(pattern), handler, etag))
+        return handler
+
+    return decorator
+
+
+def _expand(params):
+    return params.get("expand", ["False"])[0].lower() == "true"
+
+
+@route("GET", r"")
+def _info(install, params, payload, headers):
+    return {"version": install.version}
+
+
+@route("GET", r"/bridges")
+def _bridges(install, params, payload, headers):
+    if _expand(params):
+        return install.bridges
+
+    return list(install.bridges)
+
+
+@route("GET", r"/bridges/types")
+def _bridge_types(install, params, payload, headers):
+    return sorted({bridge["vendorPrefix"] for bridge in install.bridges.values()})
+
+
+@route("POST", r"/bridges")
+def _add_bridge(install, params, payload, headers):
+    bridge_id = "bridge-{:d}".format(len(install.bridges))
+
+    install.bridges[bridge_id] = {
+        "id": bridge_id,
+        "vendorPrefix": payload,
+        "instanceId": "instance-{:d}".format(len(install.bridges)),
+        "settingsSchema": BRIDGE_SETTINGS_SCHEMA,
+        "settings": {},
+    }
+
+    return bridge_id
+
+
+@route("GET", r"/bridges/([^/]+)", etag=SyntheticInstall.bridge_etag)
+def _bridge(install, params, payload, headers, bridge_id):
+    return install.bridges[bridge_id]
+
+
+@route("DELETE", r"/bridges/([^/]+)")
+def _remove_bridge(install, params, payload, headers, bridge_id):
+    del install.bridges[bridge_id]
+
+    return True
+
+
+@route("GET", r"/bridges/([^/]+)/things")
+def _bridge_things(install, params, payload, headers, bridge_id):
+    install.bridges[bridge_id]
+
+    return {thing_id: thing for thing_id, thing in install.things.items() if thing["bridge_id"] == bridge_id}
+
+
+@route("GET", r"/bridges/([^/]+)/running")
+def _bridge_running(install, params, payload, headers, bridge_id):
+    install.bridges[bridge_id]
+
+    return True
+
+
+@route("GET", r"/bridges/([^/]+)/settings", etag=SyntheticInstall.bridge_etag)
+def _get_bridge_settings(install, params, payload, headers, bridge_id):
+    return install.bridges[bridge_id]["settings"]
+
+
+def _check_if_match(install, headers, bridge_id):
+    if "If-Match" in headers and headers["If-Match"] != install.bridge_etag(bridge_id):
+        raise StubError(412, "Settings were modified")
+
+
+@route("PUT", r"/bridges/([^/]+)/settings", etag=SyntheticInstall.bridge_etag)
+def _bridge_settings(install, params, payload, headers, bridge_id):
+    bridge = install.bridges[bridge_id]
+    _check_if_match(install, headers, bridge_id)
+
+    bridge["settings"] = payload
+    install.touch(bridge_id)
+
+    return True
+
+
+@route("PATCH", r"/bridges/([^/]+)/settings", etag=SyntheticInstall.bridge_etag)
+def _patch_bridge_settings(install, params, payload, headers, bridge_id):
+    bridge = install.bridges[bridge_id]
+    _check_if_match(install, headers, bridge_id)
+
+    bridge["settings"] = apply_merge_patch(bridge["settings"], payload)
+    install.touch(bridge_id)
+
+    return True
+
+
+@route("GET", r"/things")
+def _things(install, params, payload, headers):
+    tags = set(params.get("tag", []))
+    things = install.things
+
+    if tags:
+        things = {thing_id: thing for thing_id, thing in things.items() if tags.issubset(thing["tags"])}
+
+    if _expand(params):
+        return things
+
+    return list(things)
+
+
+@route("GET", r"/things/tags")
+def _tags(install, params, payload, headers):
+    return sorted({tag for thing in install.things.values() for tag in thing["tags"]})
+
+
+@route("GET", r"/things/scan")
+def _scan(install, params, payload, headers):
+    return True
+
+
+@route("GET", r"/things/([^/]+)")
+def _thing(install, params, payload, headers, thing_id):
+    return install.things[thing_id]
+
+
+@route("DELETE", r"/things/([^/]+)")
+def _remove_thing(install, params, payload, headers, thing_id):
+    del install.things[thing_id]
+
+    return True
+
+
+@route("GET", r"/things/([^/]+)/online")
+def _thing_online(install, params, payload, headers, thing_id):
+    install.things[thing_id]
+
+    return install.online.get(thing_id, False)
+
+
+@route("PUT", r"/things/([^/]+)/name")
+def _thing_name(install, params, payload, headers, thing_id):
+    install.things[thing_id]["name"] = payload
+
+    return True
+
+
+@route("POST", r"/things/([^/]+)/tags")
+def _add_thing_tag(install, params, payload, headers, thing_id):
+    tags = install.things[thing_id]["tags"]
+
+    if payload not in tags:
+        tags.append(payload)
+
+    return tags
+
+
+@route("DELETE", r"/things/([^/]+)/tags")
+def _remove_thing_tag(install, params, payload, headers, thing_id):
+    tags = install.things[thing_id]["tags"]
+
+    if payload in tags:
+        tags.remove(payload)
+
+    return tags
+
+
+@route("PUT", r"/things/([^/]+)/channels/([^/]+)")
+def _apply_channel(install, params, payload, headers, thing_id, channel_name):
+    install.things[thing_id]["channels"][channel_name]["value"] = payload
+
+    return True
+
+
+@route("GET", r"/notifications")
+def _notifications(install, params, payload, headers):
+    since = params.get("since", [None])[0]
+
+    if since is not None:
+        return [notification for notification in install.notifications if notification["created"] >= since]
+
+    return install.notifications
+
+
+@route("DELETE", r"/notifications")
+def _dismiss_notifications(install, params, payload, headers):
+    context_ids = set(payload or ())
+
+    install.notifications = [
+        notification
+        for notification in install.notifications
+        if not (notification["dismissable"] and notification["contextId"] in context_ids)
+    ]
+
+    return True
+
+
+@route("DELETE", r"/notifications/([^/]+)")
+def _dismiss_notification(install, params, payload, headers, context_id):
+    return _dismiss_notifications(install, params, [context_id], headers)
+
+
+@route("GET", r"/triggers")
+def _triggers(install, params, payload, headers):
+    return install.triggers
+
+
+@route("GET", r"/triggers/([^/]+)")
+def _trigger(install, params, payload, headers, trigger_id):
+    return install.triggers[trigger_id]
+
+
+@route("GET", r"/rules")
+def _rules(install, params, payload, headers):
+    return {rule_id: install.rule_payload(rule) for rule_id, rule in install.rules.items()}
+
+
+@route("POST", r"/rules")
+def _add_rule(install, params, payload, headers):
+    rule_id = "rule-{:d}".format(len(install.rules))
+
+    install.rules[rule_id] = {"id": rule_id, "name": None, "actions": [], "triggers": []}
+
+    return rule_id
+
+
+@route("GET", r"/rules/([^/]+)")
+def _rule(install, params, payload, headers, rule_id):
+    return install.rule_payload(install.rules[rule_id])
+
+
+@route("POST", r"/rules/([^/]+)/triggers")
+def _add_rule_trigger(install, params, payload, headers, rule_id):
+    install.triggers[payload]
+    install.rules[rule_id]["triggers"].append(payload)
+
+    return True
+
+
+@route("GET", r"/plugins")
+def _plugins(install, params, payload, headers):
+    return ["stub"]
+
+
+class StubServerMixin():
+    daemon_threads = True
+    request_queue_size = 128
+
+    def _init_stub(self, install, latency):
+        self.install = install or SyntheticInstall()
+        self.latency = latency
+        self.lock = threading.Lock()
+        self._thread = None
+
+    def handle_error(self, request, client_address):
+        # clients that hung up, e.g. after timing out, aren't an error of the stub
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+
+        super().handle_error(request, client_address)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+class StubServer(StubServerMixin, ThreadingHTTPServer):
+    def __init__(self, install=None, host="127.0.0.1", port=0, latency=0):
+        super().__init__((host, port), StubHandler)
+
+        self._init_stub(install, latency)
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    @property
+    def url(self):
+        return "http://{:s}:{:d}/api".format(self.server_address[0], self.port)
+
+
+class UnixStubServer(StubServerMixin, ThreadingMixIn, UnixStreamServer):
+    def __init__(self, socket_path, install=None, latency=0):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+        super().__init__(socket_path, UnixStubHandler)
+
+        self.socket_path = socket_path
+        self._init_stub(install, latency)
+
+    @property
+    def url(self):
+        return "http+unix://{:s}/api".format(quote(self.socket_path, safe=""))
+
+    def server_close(self):
+        super().server_close()
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stub qozy daemon serving a synthetic install")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9876)
+    parser.add_argument("--unix-socket", type=str, dest="unix_socket", help="serve on a unix domain socket instead of TCP")
+    parser.add_argument("--bridges", type=int, default=2)
+    parser.add_argument("--things", type=int, default=20)
+    parser.add_argument("--channels", type=int, default=4, help="channels per thing")
+    parser.add_argument("--rules", type=int, default=10)
+    parser.add_argument("--triggers", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0, help="artificial latency per request in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+
+    opts = parser.parse_args()
+
+    install = SyntheticInstall(
+        bridges=opts.bridges,
+        things=opts.things,
+        channels=opts.channels,
+        rules=opts.rules,
+        triggers=opts.triggers,
+        seed=opts.seed,
+    )
+
+    if opts.unix_socket:
+        server = UnixStubServer(opts.unix_socket, install, latency=opts.latency)
+    else:
+        server = StubServer(install, host=opts.host, port=opts.port, latency=opts.latency)
+
+    print("Serving {:d} bridges, {:d} things, {:d} channels on {:s}".format(
+        len(install.bridges), len(install.things), len(install.things) * opts.channels, server.url
+    ))
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import http.client
+import socket
+import threading
+from urllib.parse import urlsplit, unquote, urlencode
+import requests
+from urllib3.exceptions import ReadTimeoutError
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+# methods a request can be sent again for after the connection broke, the daemon may have processed it already
+IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "OPTIONS", "PUT", "DELETE"))
+
+
+def encode_params(params):
+    # same encoding as requests: None values are dropped, also inside lists, lists become repeated keys
+    return urlencode(
+        [
+            (key, item)
+            for key, value in (params or {}).items()
+            if value is not None
+            for item in (value if isinstance(value, (list, tuple)) else [value])
+            if item is not None
+        ],
+    )
+
+
+class Response():
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+
+class Transport():
+    # transports return the body as received on the wire, content coding is undone by the client,
+    # a request that runs into its timeout raises TimeoutError
+
+    def __init__(self, url):
+        self.url = url
+
+    def request(self, method, path, params=None, body=None, headers=None, timeout=None):
+        raise NotImplementedError()
+
+    def close(self):
+        pass
+
+
+class HttpTransport(Transport):
+    def __init__(self, url, keep_alive=True):
+        super().__init__(url)
+
+        # a session reuses connections, without it every request opens a new one
+        self.session = requests.Session() if keep_alive else None
+
+    def request(self, method, path, params=None, body=None, headers=None, timeout=None):
+        send = self.session.request if self.session is not None else requests.request
+
+        try:
+            response = send(method, self.url + path, params=params, data=body, headers=headers, timeout=timeout, stream=True)
+        except requests.Timeout as e:
+            raise TimeoutError(str(e)) from e
+
+        try:
+            content = response.raw.read(decode_content=False)
+        except BaseException as e:
+            response.close()
+
+            if isinstance(e, ReadTimeoutError):
+                raise TimeoutError(str(e)) from e
+
+            raise
+
+        # the body was read in full, the connection can go back to the pool
+        response.raw.release_conn()
+
+        return Response(response.status_code, response.headers, content)
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout=socket._GLOBAL_DEFAULT_TIMEOUT):
+        super().__init__("localhost", timeout=timeout)
+
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        if self.timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+            sock.settimeout(self.timeout)
+
+        sock.connect(self.socket_path)
+
+        self.sock = sock
+
+
+class UnixSocketTransport(Transport):
+    # http+unix://%2Frun%2Fqozy.sock/api, the socket path is the percent-encoded host part
+
+    def __init__(self, url):
+        super().__init__(url)
+
+        parts = urlsplit(url)
+
+        self.socket_path = unquote(parts.netloc)
+        self.base_path = parts.path.rstrip("/")
+
+        # one keep-alive connection per thread, http.client connections aren't thread-safe
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _connection(self, timeout):
+        connection = getattr(self._local, "connection", None)
+
+        if connection is None:
+            connection = UnixHTTPConnection(self.socket_path)
+            self._local.connection = connection
+
+            with self._lock:
+                self._connections.append(connection)
+
+        connection.timeout = timeout if timeout is not None else socket._GLOBAL_DEFAULT_TIMEOUT
+
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+
+        return connection
+
+    def request(self, method, path, params=None, body=None, headers=None, timeout=None):
+        query = encode_params(params)
+        target = self.base_path + path + ("?" + query if query else "")
+
+        for attempt in range(2):
+            connection = self._connection(timeout)
+
+            try:
+                connection.request(method, target, body=body, headers=headers or {})
+                response = connection.getresponse()
+
+                return Response(response.status, response.headers, response.read())
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                # the daemon closed an idle keep-alive connection, idempotent requests are retried once on a fresh one
+                connection.close()
+
+                if attempt or method not in IDEMPOTENT_METHODS:
+                    raise
+            except socket.timeout:
+                # the response may still arrive, the connection can't be reused
+                connection.close()
+                raise
+
+    def close(self):
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+
+            self._connections = []
+
+
+class Http2Transport(Transport):
+    # h2://host:port/api (TLS with ALPN) or h2c://host:port/api (cleartext, prior knowledge)
+
+    def __init__(self, url):
+        if httpx is None:
+            raise ImportError("httpx with the http2 extra is required for HTTP/2 transports")
+
+        parts = urlsplit(url)
+        cleartext = parts.scheme == "h2c"
+
+        super().__init__(parts._replace(scheme="http" if cleartext else "https").geturl())
+
+        # all requests are multiplexed over a single connection
+        self.session = httpx.Client(http1=not cleartext, http2=True)
+
+    def request(self, method, path, params=None, body=None, headers=None, timeout=None):
+        try:
+            with self.session.stream(
+                method,
+                self.url + path,
+                params=encode_params(params),
+                content=body,
+                headers=headers,
+                timeout=timeout,
+            ) as response:
+                content = b"".join(response.iter_raw())
+        except httpx.TimeoutException as e:
+            raise TimeoutError(str(e)) from e
+
+        return Response(response.status_code, response.headers, content)
+
+    def close(self):
+        self.session.close()
+
+
+TRANSPORTS = {
+    "http": HttpTransport,
+    "https": HttpTransport,
+    "http+unix": UnixSocketTransport,
+    "h2": Http2Transport,
+    "h2c": Http2Transport,
+}
+
+
+def create_transport(url):
+    scheme = urlsplit(url).scheme
+
+    if scheme not in TRANSPORTS:
+        raise ValueError("Unsupported URL scheme \"{:s}\", expected one of {:s}".format(scheme, ", ".join(TRANSPORTS)))
+
+    return TRANSPORTS[scheme](url)
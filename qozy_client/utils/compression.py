@@ -0,0 +1,60 @@
+import gzip
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def _zstd_decompress(content):
+    # frames without a content size in the header need the streaming decompressor
+    return zstandard.ZstdDecompressor().decompressobj().decompress(content)
+
+
+# content codings in order of preference, only those with an available library are offered
+CODECS = {}
+
+if zstandard is not None:
+    CODECS["zstd"] = (lambda content: zstandard.ZstdCompressor().compress(content), _zstd_decompress)
+
+if brotli is not None:
+    CODECS["br"] = (brotli.compress, brotli.decompress)
+
+CODECS["gzip"] = (lambda content: gzip.compress(content, compresslevel=6), gzip.decompress)
+CODECS["deflate"] = (zlib.compress, zlib.decompress)
+
+
+def accept_encoding():
+    return ", ".join(CODECS)
+
+
+def negotiate(accept_encoding_header):
+    accepted = [part.split(";", 1)[0].strip().lower() for part in (accept_encoding_header or "").split(",")]
+
+    for encoding in CODECS:
+        if encoding in accepted:
+            return encoding
+
+    return None
+
+
+def encode(content, encoding):
+    return CODECS[encoding][0](content)
+
+
+def decode(content, encoding):
+    encoding = (encoding or "identity").strip().lower()
+
+    if encoding == "identity":
+        return content
+
+    if encoding not in CODECS:
+        raise ValueError("Unsupported content encoding \"{:s}\"".format(encoding))
+
+    return CODECS[encoding][1](content)
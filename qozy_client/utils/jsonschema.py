@@ -1,3 +1,6 @@
+import json
+import threading
+from collections import OrderedDict
 from qozy_client.utils.cli import CliWriter, colorize, Color
 
 
@@ -5,15 +8,15 @@ class JsonSchemaReader():
     def __init__(self, writer: CliWriter):
         self.writer = writer
 
-    def _ask_enum(self, values, prompt="", default=None, help_text=None):
+    def _ask_enum(self, values, prompt="", default=None, help_text=None, labels=None):
         self.writer.writeline()
-        
-        default_index = (values.index(default) + 1) if default else None
 
-        for index, value in enumerate(values, 1):
+        default_index = (values.index(default) + 1) if default in values else None
+
+        for index, label in labels or _choice_labels(values):
             self.writer.write("  ")
-            self.writer.write(colorize(str(index) + ") ", Color.CYAN))
-            self.writer.writeline(value)
+            self.writer.write(index)
+            self.writer.writeline(label)
 
         while True:
             answer = self._ask_int(prompt, required=True, default=default_index, help_text=help_text)
@@ -21,19 +24,20 @@ class JsonSchemaReader():
             if 0 <= (answer - 1) < len(values):
                 return values[answer - 1]
 
-    def _ask_one_of(self, schemas, prompt="", help_text=None):
+    def _ask_choice(self, labels, prompt="", default=None, help_text=None):
+        # returns the index of the chosen label
         self.writer.writeline()
 
-        for index, schema in enumerate(schemas, 1):
+        for index, label in labels:
             self.writer.write("  ")
-            self.writer.write(colorize(str(index) + ") ", Color.CYAN))
-            self.writer.writeline(schema["title"])  # how to ensure that each sub-schema has an title?
+            self.writer.write(index)
+            self.writer.writeline(label)
 
         while True:
-            answer = self._ask_int(prompt or "Type", required=True, help_text=help_text)
+            answer = self._ask_int(prompt or "Type", required=True, default=default + 1 if default is not None else None, help_text=help_text)
 
-            if 0 <= (answer - 1) < len(schemas):
-                return self.read(schemas[answer - 1])
+            if 0 <= (answer - 1) < len(labels):
+                return answer - 1
 
     def _ask_int(self, prompt="", default=None, required=False, help_text=None):
         while True:
@@ -58,6 +62,10 @@ class JsonSchemaReader():
         while True:
             answer = self._ask(prompt, default=default, required=required, help_text=help_text)
 
+            if not isinstance(answer, str):
+                # the default was taken as it is
+                return answer
+
             try:
                 return int(answer)
             except:
@@ -73,7 +81,7 @@ class JsonSchemaReader():
             if required:
                 prompt_parts.append(colorize("*", Color.MAGENTA))
             
-            if default:
+            if default is not None and default != "":
                 prompt_parts.append(colorize(" [" + str(default) + "]", Color.BROWN))
 
             if help_text:
@@ -91,53 +99,365 @@ class JsonSchemaReader():
 
             if answer:
                 return answer
-            elif answer == "" and default:
+            elif answer == "" and default is not None and default != "":
                 return default
             elif answer == "" and not required:
                 return ""
 
-    def read(self, json_schema, prompt="", required=False):
-        description = json_schema.get("description", None)
-        default = json_schema.get("default", None)
-
-        if "const" in json_schema:
-            return json_schema["const"]
-        elif "enum" in json_schema:
-            return self._ask_enum(json_schema["enum"], prompt=prompt, default=default, help_text=description)
-        elif "oneOf" in json_schema:
-            return self._ask_one_of(json_schema["oneOf"], prompt=prompt, help_text=description)
-        elif "anyOf" in json_schema:
-            return self._ask_one_of(json_schema["anyOf"], prompt=prompt, help_text=description)
-        elif json_schema["type"] == "string":
-            return self._ask(prompt=prompt, required=required, default=default, help_text=description)
-        elif json_schema["type"] in ("number", "integer"):
-            return self._ask_number(prompt=prompt, required=required, default=default, help_text=description)
-        elif json_schema["type"] == "boolean":
-            return self._ask_boolean(prompt=prompt, help_text=description)
-        elif json_schema["type"] == "object":
-            required_fields = json_schema.get("required", ())
+    def read(self, json_schema, prompt="", required=False, current=None, vendor_prefix=None):
+        # current values, e.g. the settings a bridge has now, are offered as the defaults
+        return PromptPlan.compile(json_schema, vendor_prefix=vendor_prefix).read(self, prompt=prompt, required=required, current=current)
 
-            result = {}
 
-            for field, subschema in json_schema["properties"].items():
-                title = subschema.get("title", None)
-                is_required = field in required_fields
+def _choice_labels(labels):
+    return [(colorize(str(index) + ") ", Color.CYAN), str(label)) for index, label in enumerate(labels, 1)]
+
+
+def _compile_prompt(json_schema):
+    # returns ask(reader, prompt, required, current), the schema is only walked once per plan
+    if isinstance(json_schema, bool):
+        # nothing to ask for, a value that is there is kept
+        return lambda reader, prompt, required, current: current
+
+    description = json_schema.get("description", None)
+    default = json_schema.get("default", None)
+
+    if "const" in json_schema:
+        const = json_schema["const"]
+
+        return lambda reader, prompt, required, current: const
+
+    if "enum" in json_schema:
+        values = json_schema["enum"]
+        labels = _choice_labels(values)
+
+        def ask_enum(reader, prompt, required, current):
+            return reader._ask_enum(values, prompt=prompt, default=current if current in values else default, help_text=description, labels=labels)
+
+        return ask_enum
+
+    if "oneOf" in json_schema or "anyOf" in json_schema:
+        subschemas = json_schema.get("oneOf") or json_schema["anyOf"]
+        subprompts = [_compile_prompt(subschema) for subschema in subschemas]
+        validators = [JsonSchemaValidator.compile(subschema) for subschema in subschemas]
+        # how to ensure that each sub-schema has an title?
+        labels = _choice_labels([subschema["title"] for subschema in subschemas])
+
+        def ask_one_of(reader, prompt, required, current):
+            matching = next((index for index, validator in enumerate(validators) if current is not None and validator.is_valid(current)), None)
+            index = reader._ask_choice(labels, prompt=prompt, default=matching, help_text=description)
+
+            return subprompts[index](reader, "", False, current if index == matching else None)
 
-                sub_result = self.read(subschema, prompt=(title or field), required=is_required)
+        return ask_one_of
+
+    schema_type = json_schema["type"]
+
+    if schema_type == "string":
+        def ask_string(reader, prompt, required, current):
+            return reader._ask(prompt=prompt, required=required, default=current if isinstance(current, str) else default, help_text=description)
+
+        return ask_string
+
+    if schema_type in ("number", "integer"):
+        def ask_number(reader, prompt, required, current):
+            is_number = isinstance(current, (int, float)) and not isinstance(current, bool)
+
+            return reader._ask_number(prompt=prompt, required=required, default=current if is_number else default, help_text=description)
+
+        return ask_number
+
+    if schema_type == "boolean":
+        def ask_boolean(reader, prompt, required, current):
+            return reader._ask_boolean(prompt=prompt, default=current if isinstance(current, bool) else default is True, help_text=description)
+
+        return ask_boolean
+
+    if schema_type == "object":
+        required_fields = json_schema.get("required", ())
+        fields = [
+            (field, (subschema.get("title", None) if isinstance(subschema, dict) else None) or field, field in required_fields, _compile_prompt(subschema))
+            for field, subschema in json_schema["properties"].items()
+        ]
+
+        def ask_object(reader, prompt, required, current):
+            current = current if isinstance(current, dict) else {}
+            result = {}
+
+            for field, title, is_required, ask_field in fields:
+                sub_result = ask_field(reader, title, is_required, current.get(field))
 
                 if is_required or (not is_required and sub_result != None):
                     result[field] = sub_result
 
             return result
-        elif json_schema["type"] == "array":
+
+        return ask_object
+
+    if schema_type == "array":
+        ask_item = _compile_prompt(json_schema["items"])
+
+        def ask_array(reader, prompt, required, current):
             result = []
 
-            self.writer.writeline()
-            
+            reader.writer.writeline()
+
+            if isinstance(current, list) and current and reader._ask_boolean("Keep {:d} existing entries?".format(len(current))):
+                result.extend(current)
+
             while True:
-                add_new = self._ask_boolean("Add entry?")
+                add_new = reader._ask_boolean("Add entry?")
                 if not add_new:
                     break
-                result.append(self.read(json_schema["items"]))
+                result.append(ask_item(reader, "", False, None))
 
             return result
+
+        return ask_array
+
+    raise ValueError("Unsupported schema type \"{}\"".format(schema_type))
+
+
+class SchemaCache():
+    # compiled forms of schemas, bridges of the same vendor share their schema, so they are found by vendor prefix
+    # without serializing the schema again as long as it is equal to the one compiled for that vendor
+
+    def __init__(self, compile, max_documents=256):
+        self._compile = compile
+        self.max_documents = max_documents
+        # least recently used first
+        self._by_document = OrderedDict()
+        self._by_vendor = {}
+        self._lock = threading.Lock()
+
+    def get(self, json_schema, vendor_prefix=None):
+        if vendor_prefix is not None:
+            cached = self._by_vendor.get(vendor_prefix)
+
+            if cached is not None and (cached[0] is json_schema or cached[0] == json_schema):
+                return cached[1]
+
+        key = json.dumps(json_schema, sort_keys=True)
+
+        with self._lock:
+            compiled = self._by_document.get(key)
+
+            if compiled is not None:
+                self._by_document.move_to_end(key)
+
+        if compiled is None:
+            # compiled outside the lock, a schema compiled twice concurrently is cached once
+            compiled = self._compile(json_schema)
+
+            with self._lock:
+                compiled = self._by_document.setdefault(key, compiled)
+
+                if len(self._by_document) > self.max_documents:
+                    self._by_document.popitem(last=False)
+
+        if vendor_prefix is not None:
+            self._by_vendor[vendor_prefix] = (json_schema, compiled)
+
+        return compiled
+
+
+class PromptPlan():
+    def __init__(self, ask):
+        self._ask = ask
+
+    @classmethod
+    def compile(cls, json_schema, vendor_prefix=None):
+        return _prompt_plans.get(json_schema, vendor_prefix)
+
+    def read(self, reader, prompt="", required=False, current=None):
+        return self._ask(reader, prompt, required, current)
+
+
+_prompt_plans = SchemaCache(lambda json_schema: PromptPlan(_compile_prompt(json_schema)))
+
+
+class ValidationError(Exception):
+    def __init__(self, message, path=()):
+        self.message = message
+        self.path = tuple(path)
+
+        super().__init__("{:s}: {:s}".format("/" + "/".join(str(part) for part in self.path), message))
+
+
+def json_equal(a, b):
+    # unlike python, JSON does not consider true equal to 1, inside arrays and objects neither
+    if isinstance(a, bool) or isinstance(b, bool):
+        return isinstance(a, bool) and isinstance(b, bool) and a == b
+
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(json_equal(item, other) for item, other in zip(a, b))
+
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(json_equal(value, b[key]) for key, value in a.items())
+
+    return a == b
+
+
+def _is_type(value, type):
+    if type == "string":
+        return isinstance(value, str)
+    elif type == "integer":
+        return isinstance(value, int) and not isinstance(value, bool) or isinstance(value, float) and value.is_integer()
+    elif type == "number":
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    elif type == "boolean":
+        return isinstance(value, bool)
+    elif type == "object":
+        return isinstance(value, dict)
+    elif type == "array":
+        return isinstance(value, list)
+    elif type == "null":
+        return value is None
+
+    return True
+
+
+def _accept(value, path):
+    pass
+
+
+def _reject(value, path):
+    raise ValidationError("is not allowed", path)
+
+
+def _compile(json_schema):
+    # the boolean schemas true and false accept and reject everything
+    if isinstance(json_schema, bool):
+        return _accept if json_schema else _reject
+
+    checks = []
+
+    if "const" in json_schema:
+        const = json_schema["const"]
+
+        def check_const(value, path):
+            if not json_equal(value, const):
+                raise ValidationError("must be {:s}".format(json.dumps(const)), path)
+
+        checks.append(check_const)
+
+    if "enum" in json_schema:
+        enum = json_schema["enum"]
+
+        def check_enum(value, path):
+            if not any(json_equal(value, candidate) for candidate in enum):
+                raise ValidationError("must be one of {:s}".format(json.dumps(enum)), path)
+
+        checks.append(check_enum)
+
+    if "oneOf" in json_schema:
+        one_of = [_compile(subschema) for subschema in json_schema["oneOf"]]
+
+        def check_one_of(value, path):
+            matches = 0
+
+            for validator in one_of:
+                try:
+                    validator(value, path)
+                    matches += 1
+                except ValidationError:
+                    pass
+
+            if matches != 1:
+                raise ValidationError("must match exactly one schema of oneOf, matched {:d}".format(matches), path)
+
+        checks.append(check_one_of)
+
+    if "anyOf" in json_schema:
+        any_of = [_compile(subschema) for subschema in json_schema["anyOf"]]
+
+        def check_any_of(value, path):
+            for validator in any_of:
+                try:
+                    validator(value, path)
+                    return
+                except ValidationError:
+                    pass
+
+            raise ValidationError("must match at least one schema of anyOf", path)
+
+        checks.append(check_any_of)
+
+    if "type" in json_schema:
+        types = json_schema["type"] if isinstance(json_schema["type"], list) else [json_schema["type"]]
+
+        def check_type(value, path):
+            if not any(_is_type(value, type) for type in types):
+                raise ValidationError("must be of type {:s}".format(" or ".join(types)), path)
+
+        checks.append(check_type)
+
+    if "properties" in json_schema or "required" in json_schema or "additionalProperties" in json_schema:
+        properties = {field: _compile(subschema) for field, subschema in json_schema.get("properties", {}).items()}
+        required_fields = tuple(json_schema.get("required", ()))
+        additional_properties = json_schema.get("additionalProperties", True)
+        additional_validator = _compile(additional_properties) if isinstance(additional_properties, dict) else None
+
+        def check_object(value, path):
+            if not isinstance(value, dict):
+                return
+
+            for field in required_fields:
+                if field not in value:
+                    raise ValidationError("missing required property \"{:s}\"".format(field), path)
+
+            for field, field_value in value.items():
+                validator = properties.get(field)
+
+                if validator is not None:
+                    validator(field_value, path + (field,))
+                elif additional_validator is not None:
+                    additional_validator(field_value, path + (field,))
+                elif additional_properties is False:
+                    raise ValidationError("unexpected property \"{:s}\"".format(field), path)
+
+        checks.append(check_object)
+
+    if "items" in json_schema and isinstance(json_schema["items"], (dict, bool)):
+        items = _compile(json_schema["items"])
+
+        def check_array(value, path):
+            if not isinstance(value, list):
+                return
+
+            for index, item in enumerate(value):
+                items(item, path + (index,))
+
+        checks.append(check_array)
+
+    if len(checks) == 1:
+        return checks[0]
+
+    def check_all(value, path):
+        for check in checks:
+            check(value, path)
+
+    return check_all
+
+
+class JsonSchemaValidator():
+    def __init__(self, validator):
+        self._validator = validator
+
+    @classmethod
+    def compile(cls, json_schema, vendor_prefix=None):
+        # schemas are compiled once per distinct schema document
+        return _validators.get(json_schema, vendor_prefix)
+
+    def validate(self, value):
+        self._validator(value, ())
+
+    def is_valid(self, value):
+        try:
+            self._validator(value, ())
+            return True
+        except ValidationError:
+            return False
+
+
+_validators = SchemaCache(lambda json_schema: JsonSchemaValidator(_compile(json_schema)))
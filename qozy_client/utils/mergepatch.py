@@ -0,0 +1,46 @@
+# JSON merge patch (RFC 7386), null removes a member and arrays are replaced as a whole
+
+
+def create_merge_patch(source, target):
+    if not isinstance(source, dict) or not isinstance(target, dict):
+        return target
+
+    patch = {}
+
+    for key, value in target.items():
+        if key not in source:
+            patch[key] = value
+        elif source[key] != value:
+            if isinstance(source[key], dict) and isinstance(value, dict):
+                patch[key] = create_merge_patch(source[key], value)
+            else:
+                patch[key] = value
+
+    for key in source:
+        if key not in target:
+            patch[key] = None
+
+    return patch
+
+
+def apply_merge_patch(target, patch):
+    if not isinstance(patch, dict):
+        return patch
+
+    result = dict(target) if isinstance(target, dict) else {}
+
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+
+    return result
+
+
+def has_null_members(document):
+    # a merge patch can't set a member to null, null means removing it
+    if not isinstance(document, dict):
+        return False
+
+    return any(value is None or has_null_members(value) for value in document.values())
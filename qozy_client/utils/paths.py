@@ -0,0 +1,8 @@
+import os
+
+
+def default_cache_directory():
+    if os.getenv("QOZY_CACHE_DIR"):
+        return os.getenv("QOZY_CACHE_DIR")
+
+    return os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "qozy")
@@ -0,0 +1,183 @@
+import bisect
+import itertools
+import shutil
+from qozy_client.utils.cli import ColorizedString, DecoratedString
+
+
+CSI = "\033["
+
+
+def _plain(text):
+    if isinstance(text, (ColorizedString, DecoratedString)):
+        return str(text.text)
+
+    return str(text)
+
+
+def _truncate(text, width):
+    if len(text) <= width:
+        return text
+
+    if isinstance(text, ColorizedString):
+        return ColorizedString(text.text[:width], text.color, text.background_color)
+
+    if isinstance(text, DecoratedString):
+        return DecoratedString(text.text[:width], text.decorator)
+
+    return str(text)[:width]
+
+
+class LiveTable():
+    def __init__(self, *header, column_padding=3, sort_key=None):
+        # rows are kept by key, sort_key(key, columns) orders them, insertion order otherwise, the sort key of a row
+        # is taken when it is updated
+        self.header = header
+        self.column_padding = column_padding
+        self.sort_key = sort_key
+
+        self.rows = {}
+        # (sort key, key) of every row in order, kept sorted as rows change instead of sorting every frame
+        self._order = []
+        self._sort_keys = {}
+        # column widths only grow, so a value change doesn't shift the columns right of it
+        self.column_widths = [len(head) for head in header]
+
+    def _unorder(self, key):
+        position = bisect.bisect_left(self._order, (self._sort_keys.pop(key), key))
+        del self._order[position]
+
+    def update(self, key, *columns):
+        # returns whether the row changed
+        assert len(columns) == len(self.header)
+
+        previous = self.rows.get(key)
+
+        if previous is not None and [_plain(column) for column in previous] == [_plain(column) for column in columns]:
+            return False
+
+        self.rows[key] = columns
+        self.column_widths = [max(len(column), width) for column, width in zip(columns, self.column_widths)]
+
+        if self.sort_key is not None:
+            sort_key = self.sort_key(key, columns)
+
+            if previous is None or self._sort_keys[key] != sort_key:
+                if previous is not None:
+                    self._unorder(key)
+
+                bisect.insort(self._order, (sort_key, key))
+                self._sort_keys[key] = sort_key
+
+        return True
+
+    def remove(self, key):
+        if self.rows.pop(key, None) is None:
+            return False
+
+        if self.sort_key is not None:
+            self._unorder(key)
+
+        return True
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _cells(self, columns):
+        cells = []
+        x = 0
+
+        for column, width in zip(columns, self.column_widths):
+            cells.append((x, width + self.column_padding, column))
+            x += width + self.column_padding
+
+        return cells
+
+    def lines(self, offset=0, limit=None):
+        # header plus the visible rows as (x, width, text) cells
+        end = offset + limit if limit is not None else None
+
+        if self.sort_key is not None:
+            keys = [key for _, key in self._order[offset:end]]
+        else:
+            keys = itertools.islice(self.rows, offset, end)
+
+        return [self._cells(self.header)] + [self._cells(self.rows[key]) for key in keys]
+
+
+class Screen():
+    # draws frames of (x, width, text) cells, only cells that differ from the previous frame are written
+
+    def __init__(self, cli_writer):
+        self.writer = cli_writer
+        self.stream = cli_writer.output_stream
+
+        # (line, x) -> (plain text, width) as currently on the terminal
+        self._cells = {}
+        self._size = None
+
+    def size(self):
+        return shutil.get_terminal_size()
+
+    def __enter__(self):
+        # alternate screen buffer and hidden cursor, the previous terminal content is restored on exit
+        self.stream.write(CSI + "?1049h" + CSI + "?25l" + CSI + "2J")
+        self.stream.flush()
+
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stream.write(CSI + "?25h" + CSI + "?1049l")
+        self.stream.flush()
+
+    def _write_cell(self, line, x, width, text):
+        self.stream.write("{:s}{:d};{:d}H".format(CSI, line + 1, x + 1))
+        self.writer.write(text)
+        self.stream.write(" " * (width - len(text)))
+
+    def draw(self, lines):
+        # returns the number of cells written
+        size = self.size()
+
+        if size != self._size:
+            self.stream.write(CSI + "2J")
+            self._cells = {}
+            self._size = size
+
+        frame = {}
+
+        # the last line stays empty, writing its last cell would scroll some terminals
+        for line, cells in enumerate(lines[:size.lines - 1]):
+            for x, width, text in cells:
+                if x >= size.columns:
+                    break
+
+                frame[(line, x)] = (text, min(width, size.columns - x))
+
+        stale = set(self._cells) - set(frame)
+        drawn_lines = {line for line, _ in frame}
+
+        if any(line in drawn_lines for line, _ in stale):
+            # the columns moved, blanking the old cells would erase unchanged new ones
+            self.stream.write(CSI + "2J")
+            self._cells = {}
+            stale = set()
+
+        written = 0
+
+        for line, x in stale:
+            self._write_cell(line, x, self._cells.pop((line, x))[1], "")
+            written += 1
+
+        for key, (text, width) in frame.items():
+            state = (_plain(text), width)
+
+            if self._cells.get(key) == state:
+                continue
+
+            self._write_cell(key[0], key[1], width, _truncate(text, width))
+            self._cells[key] = state
+            written += 1
+
+        self.stream.flush()
+
+        return written
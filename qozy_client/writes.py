@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import namedtuple
+
+
+WriteStats = namedtuple("WriteStats", ("submitted", "sent", "dropped", "failed", "pending"))
+
+
+class WriteBehindQueue():
+    def __init__(self, client, interval=0.1, idle=0.02):
+        # pending writes are flushed at most interval seconds after the first one, or after idle seconds without a new one
+        self.client = client
+        self.interval = interval
+        self.idle = idle
+
+        self.submitted = 0
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+        self.last_error = None
+
+        # (thing id, channel name) -> latest value, in order of the first write
+        self._pending = {}
+        self._first_write = None
+        self._last_write = None
+
+        self._condition = threading.Condition()
+        self._send_lock = threading.Lock()
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+        return self
+
+    def put(self, thing_id, channel, value):
+        with self._condition:
+            key = (thing_id, channel)
+            now = time.monotonic()
+
+            if key in self._pending:
+                # superseded before it was sent
+                self.dropped += 1
+            elif not self._pending:
+                self._first_write = now
+
+            self._pending[key] = value
+            self._last_write = now
+            self.submitted += 1
+
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopped:
+                    self._condition.wait()
+
+                if self._stopped:
+                    return
+
+                while not self._stopped:
+                    deadline = min(self._first_write + self.interval, self._last_write + self.idle)
+                    remaining = deadline - time.monotonic()
+
+                    if remaining <= 0:
+                        break
+
+                    self._condition.wait(remaining)
+
+            self.flush()
+
+    def flush(self):
+        # the batch is taken under the send lock, so a later value for a channel is never sent before an earlier one
+        with self._send_lock:
+            with self._condition:
+                batch = self._pending
+                self._pending = {}
+
+            for (thing_id, channel), value in batch.items():
+                try:
+                    self.client.put("/things/{thing_id:s}/channels/{channel:s}".format(thing_id=thing_id, channel=channel), payload=value)
+                    self.sent += 1
+                except Exception as e:
+                    self.failed += 1
+                    self.last_error = e
+
+            return len(batch)
+
+    def stats(self):
+        with self._condition:
+            return WriteStats(
+                submitted=self.submitted,
+                sent=self.sent,
+                dropped=self.dropped,
+                failed=self.failed,
+                pending=len(self._pending),
+            )
+
+    def stop(self):
+        # pending writes are sent before returning
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        self.flush()
@@ -10,6 +10,12 @@ requires = [
     "requests",
 ]
 
+extras = {
+    "numpy": ["numpy"],
+    "yaml": ["PyYAML"],
+    "http2": ["httpx[http2]"],
+}
+
 setup(
     name="qozy-client",
     version="0.1",
@@ -18,13 +24,16 @@ setup(
     author="qozy.io",
     author_email="contact@qozy.io",
     url="https://www.qozy.io",
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks"]),
     include_package_data=True,
     zip_safe=False,
     install_requires=requires,
+    extras_require=extras,
     entry_points={
         "console_scripts": [
             "qozy = qozy_client.cli:main",
+            "qozy-stub = qozy_client.stub:main",
+            "qozy-complete = qozy_client.completion:main",
         ]
     },
 )
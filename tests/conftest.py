@@ -0,0 +1,23 @@
+import pytest
+from qozy_client.client import Client
+from qozy_client.stub import StubServer, SyntheticInstall
+
+
+@pytest.fixture
+def install():
+    return SyntheticInstall(bridges=3, things=30, channels=4)
+
+
+@pytest.fixture
+def server(install):
+    with StubServer(install) as server:
+        yield server
+
+
+@pytest.fixture
+def client(server):
+    client = Client(url=server.url)
+
+    yield client
+
+    client.close()
@@ -0,0 +1,110 @@
+import sys
+import pytest
+from qozy_client.cache import StateCache
+from qozy_client.cli import main, writer
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = StateCache(str(tmp_path / "state.sqlite"))
+
+    yield cache
+
+    cache.close()
+
+
+def _qozy(server, monkeypatch, capsys, *arguments):
+    monkeypatch.setattr(sys, "argv", ["qozy", "--port", str(server.port), "--no-colors"] + list(arguments))
+    # the writer holds on to the stdout of the time it was imported
+    monkeypatch.setattr(writer, "output_stream", sys.stdout)
+    capsys.readouterr()
+
+    main()
+
+    return capsys.readouterr().out
+
+
+def test_revalidate(client, install, cache):
+    assert cache.validator("things") is None
+    assert cache.revalidate(client, "things")
+    assert not cache.revalidate(client, "things")
+
+    install.things["thing-1"]["name"] = "Renamed"
+    install.touch()
+
+    assert cache.revalidate(client, "things")
+    assert cache.things()["thing-1"]["name"] == "Renamed"
+
+
+def test_revalidate_without_validator(client, install, cache, monkeypatch):
+    monkeypatch.setattr(client, "get_if_none_match", lambda path, params={}, etag=None: (client.get(path, params=params), None))
+
+    assert cache.revalidate(client, "things")
+    # the same listing again isn't reported as outdated
+    assert not cache.revalidate(client, "things")
+
+    install.things["thing-1"]["name"] = "Renamed"
+
+    assert cache.revalidate(client, "things")
+
+
+def test_tag_filters_and_counts(client, install, cache):
+    cache.revalidate(client, "things")
+
+    assert set(cache.things(filter_tags=["floor-1", "room-1"])) == {"thing-1"}
+    assert set(cache.things(filter_tags=["floor-1"])) == {thing_id for thing_id, thing in install.things.items() if "floor-1" in thing["tags"]}
+    assert sum(cache.thing_counts().values()) == len(install.things)
+
+
+def test_invalidate_drops_rows_and_validator(client, cache):
+    cache.revalidate(client, "things")
+    cache.invalidate("things", ["thing-1"])
+
+    assert cache.validator("things") is None
+    assert "thing-1" not in cache.things()
+    assert "thing-1" not in cache.things(filter_tags=["room-1"])
+    assert "thing-2" in cache.things()
+
+    with pytest.raises(ValueError):
+        cache.invalidate("channels")
+
+
+def test_existing(tmp_path):
+    assert StateCache.existing("http://pi:9876/api", directory=str(tmp_path)) is None
+
+    StateCache.for_daemon("http://pi:9876/api", directory=str(tmp_path)).close()
+    cache = StateCache.existing("http://pi:9876/api", directory=str(tmp_path))
+
+    assert cache is not None
+    cache.close()
+
+
+def test_cli_reads_the_cache_only_on_request(server, install, tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("QOZY_CACHE_DIR", str(tmp_path))
+
+    assert "Thing 3" in _qozy(server, monkeypatch, capsys, "things", "-t", "room-3")
+    assert list(tmp_path.iterdir()) == []
+
+    assert "Thing 3" in _qozy(server, monkeypatch, capsys, "--cache", "things", "-t", "room-3")
+
+    install.things["thing-3"]["name"] = "Changed elsewhere"
+    install.touch()
+
+    assert "Changed elsewhere" in _qozy(server, monkeypatch, capsys, "things", "-t", "room-3")
+
+
+def test_cli_writes_invalidate_the_cache(server, install, tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("QOZY_CACHE_DIR", str(tmp_path))
+
+    _qozy(server, monkeypatch, capsys, "--cache", "things")
+    _qozy(server, monkeypatch, capsys, "thing", "thing-3", "name", "NEWNAME")
+
+    output = _qozy(server, monkeypatch, capsys, "--cache", "things", "-t", "room-3")
+    assert "NEWNAME" in output
+    assert "outdated" not in output
+
+    _qozy(server, monkeypatch, capsys, "thing", "thing-3", "tags", "--add", "kitchen")
+
+    output = _qozy(server, monkeypatch, capsys, "--cache", "things", "-t", "kitchen")
+    assert "thing-3" in output
+    assert "outdated" not in output
@@ -0,0 +1,61 @@
+from qozy_client.decoding import thing_records
+
+
+def test_channels_are_built_on_access(client, install):
+    thing = client.thing("thing-2")
+    channels = thing.channels()
+    payload = install.things["thing-2"]["channels"]
+
+    assert channels._channels == {}
+    assert list(channels) == list(payload)
+    assert len(channels) == len(payload)
+    assert "missing" not in channels
+    assert channels._channels == {}
+
+    name = next(iter(payload))
+    channel = channels[name]
+
+    assert channels[name] is channel
+    assert thing.channel(name) is channel
+    assert list(channels._channels) == [name]
+    assert (channel.id, channel.channel, channel.sensor, channel.type, channel.value) == (
+        payload[name]["id"], name, payload[name]["sensor"], payload[name]["type"], payload[name]["value"],
+    )
+
+
+def test_refresh_keeps_built_channels(client, install):
+    thing = client.thing("thing-2")
+    channels = thing.channels()
+    payload = install.things["thing-2"]["channels"]
+    first, second = list(payload)[:2]
+    channel = channels[first]
+
+    payload[first]["value"] = "changed"
+    del payload[second]
+    client.thing("thing-2")
+
+    # built channels are refreshed in place, those gone from the payload are dropped
+    assert channels[first] is channel
+    assert channel.value == "changed"
+    assert second not in channels
+    assert len(channels) == len(payload)
+
+
+def test_channels_from_records(client, install):
+    things = list(install.things.values())[:3]
+    loaded = [client._load_thing_record(record) for record in thing_records(things)]
+
+    for thing, payload in zip(loaded, things):
+        assert thing is client.thing(payload["id"])
+        assert {name: channel.value for name, channel in thing.channels().items()} == {
+            name: channel["value"] for name, channel in payload["channels"].items()
+        }
+
+
+def test_apply_writes_channel(client, install):
+    thing = client.thing("thing-1")
+    name, payload = next((name, channel) for name, channel in install.things["thing-1"]["channels"].items() if not channel["sensor"])
+
+    thing.channel(name).apply(42)
+
+    assert payload["value"] == 42
@@ -0,0 +1,80 @@
+import subprocess
+import sys
+import pytest
+from qozy_client import completion
+from qozy_client.cli import build_argument_parser, main, writer
+
+
+def _qozy(server, monkeypatch, *arguments):
+    monkeypatch.setattr(sys, "argv", ["qozy", "--port", str(server.port), "--no-colors"] + list(arguments))
+    monkeypatch.setattr(writer, "output_stream", sys.stdout)
+
+    main()
+
+
+@pytest.fixture
+def directory(tmp_path, monkeypatch):
+    monkeypatch.setenv("QOZY_CACHE_DIR", str(tmp_path))
+
+    return completion.completion_directory()
+
+
+def test_index_key(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    assert completion.index_key(["pi"], 9876) == completion.index_key(["pi"], "9876")
+    assert completion.index_key(["pi"], 9876) != completion.index_key(["pi"], 9876, "hosts")
+    assert completion.index_key(None, 9876, "hosts") == completion.index_key(None, 9876, str(tmp_path / "hosts"))
+
+
+def test_refresh_and_complete(server, install, directory, monkeypatch):
+    _qozy(server, monkeypatch, "completion", "refresh")
+
+    words = ["--port", str(server.port)]
+
+    assert completion.complete(words + ["thing", "thing-1"], directory=directory) == sorted(
+        thing_id for thing_id in install.things if thing_id.startswith("thing-1")
+    )
+    assert completion.complete(words + ["thing", "thing-1", "set", ""], directory=directory) == sorted(install.things["thing-1"]["channels"])
+    assert completion.complete(words + ["things", "-t", "floor"], directory=directory) == ["floor-{:d}".format(i) for i in range(5)]
+    assert completion.complete(words + ["thi"], directory=directory) == ["thing", "things"]
+
+
+def test_refresh_with_a_hosts_file(server, install, directory, tmp_path, monkeypatch):
+    hosts_file = tmp_path / "hosts"
+    hosts_file.write_text("127.0.0.1:{:d}\n".format(server.port))
+
+    # the same daemon given twice is a single target
+    _qozy(server, monkeypatch, "--host", "127.0.0.1:{:d}".format(server.port), "--hosts-file", str(hosts_file), "completion", "refresh")
+
+    words = ["--port", str(server.port), "--host", "127.0.0.1:{:d}".format(server.port), "--hosts-file", str(hosts_file), "bridge", ""]
+
+    assert completion.complete(words, directory=directory) == sorted(install.bridges)
+
+
+def test_refresh_of_several_daemons_is_refused(server, directory, tmp_path, monkeypatch, capsys):
+    hosts_file = tmp_path / "hosts"
+    hosts_file.write_text("127.0.0.1:{:d}\nlocalhost:{:d}\n".format(server.port, server.port))
+
+    with pytest.raises(SystemExit) as exit:
+        _qozy(server, monkeypatch, "--hosts-file", str(hosts_file), "completion", "refresh")
+
+    assert exit.value.code == 1
+    assert "only supports a single host" in capsys.readouterr().out
+
+
+def test_stale_index_is_refreshed_with_the_same_targets(directory, tmp_path, monkeypatch):
+    started = []
+    monkeypatch.setattr(subprocess, "Popen", lambda arguments, **options: started.append(arguments))
+
+    completion.write_spec(build_argument_parser(), directory=directory)
+    hosts_file = str(tmp_path / "hosts")
+
+    assert completion.complete(["--hosts-file", hosts_file, "thing", ""], directory=directory) == []
+    assert started[0][-4:] == ["--hosts-file", hosts_file, "completion", "refresh"]
+
+    # a refresh is already running
+    completion.complete(["--hosts-file", hosts_file, "thing", ""], directory=directory)
+
+    assert len(started) == 1
+
@@ -0,0 +1,67 @@
+import pytest
+from qozy_client.client import Client
+from qozy_client.stats import endpoint
+from qozy_client.utils import compression
+
+
+@pytest.mark.parametrize("encoding", list(compression.CODECS))
+def test_round_trip(encoding):
+    content = b"{\"thing-1\": {\"name\": \"Thing 1\"}}" * 100
+
+    assert compression.decode(compression.encode(content, encoding), encoding) == content
+
+
+def test_negotiate_prefers_the_first_codec():
+    assert compression.negotiate("deflate, gzip;q=0.5") == "gzip"
+    assert compression.negotiate("identity") is None
+    assert compression.negotiate(None) is None
+
+
+def test_decode_unsupported_encoding():
+    assert compression.decode(b"plain", None) == b"plain"
+
+    with pytest.raises(ValueError):
+        compression.decode(b"", "compress")
+
+
+def test_endpoint_collapses_ids():
+    assert endpoint("GET", "/things/thing-1/channels/power") == "GET /things/{id}/channels/{id}"
+    assert endpoint("GET", "") == "GET /"
+
+
+def test_compressed_responses(client, install):
+    assert len(list(client.things())) == len(install.things)
+
+    transfer = client.transfer_stats.endpoints()["GET /things"]
+    assert transfer.requests == 1
+    assert transfer.wire_bytes < transfer.decoded_bytes
+    assert transfer.ratio > 1
+
+
+def test_uncompressed_responses(server, install):
+    client = Client(url=server.url, compress_responses=False)
+
+    try:
+        assert len(list(client.things())) == len(install.things)
+
+        transfer = client.transfer_stats.endpoints()["GET /things"]
+        assert transfer.wire_bytes == transfer.decoded_bytes
+        assert transfer.ratio == 1.0
+    finally:
+        client.close()
+
+
+def test_compressed_request_bodies(server, install):
+    client = Client(url=server.url, compress_requests_over=0)
+
+    try:
+        bridge = client.bridge("bridge-1")
+        settings = dict(bridge.settings, devices=["device-{:d}".format(i) for i in range(200)])
+
+        assert bridge.update_settings(settings)
+        assert install.bridges["bridge-1"]["settings"] == settings
+
+        transfer = client.transfer_stats.endpoints()["PATCH /bridges/{id}/settings"]
+        assert transfer.sent_bytes < transfer.body_bytes
+    finally:
+        client.close()
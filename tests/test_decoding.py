@@ -0,0 +1,55 @@
+import os
+import pytest
+from qozy_client.decoding import DecodePool, thing_records
+
+
+def _summary(things):
+    return sorted((thing.id, thing.name, thing.bridge_id, tuple(thing.tags), tuple(sorted(thing.channels()))) for thing in things)
+
+
+@pytest.fixture
+def cpus(monkeypatch):
+    def set_cpus(count):
+        monkeypatch.setattr(os, "cpu_count", lambda: count)
+
+    return set_cpus
+
+
+def test_thing_records(install):
+    records = thing_records(install.things.values(), filter_tags=["floor-1", "room-1"])
+
+    assert [record[0] for record in records] == ["thing-1"]
+
+    thing_id, name, bridge_id, tags, channels = records[0]
+    channel_name = next(iter(channels))
+
+    assert channels[channel_name][:2] == (install.things["thing-1"]["channels"][channel_name]["id"], channel_name)
+
+
+def test_no_pool_on_a_single_cpu(client, cpus):
+    cpus(1)
+
+    assert client.enable_process_decoding() is None
+    assert client.decode_pool is None
+
+
+def test_things_decoded_in_processes(client, install, cpus):
+    cpus(2)
+    expected = _summary(client.things())
+    pool = client.enable_process_decoding(processes=2, min_things=0)
+
+    assert pool is not None
+    client.transfer_stats.reset()
+
+    assert _summary(client.things()) == expected
+    assert client.transfer_stats.endpoints()["GET /bridges/{id}/things"].requests == len(install.bridges)
+    assert _summary(client.things(filter_tags=["floor-1"])) == [thing for thing in expected if "floor-1" in thing[3]]
+
+
+def test_small_listings_are_decoded_in_process(client, install, cpus):
+    cpus(2)
+    client.enable_process_decoding(processes=2)
+
+    assert len(install.things) < DecodePool.MIN_THINGS
+    assert len(list(client.things())) == len(install.things)
+    assert "GET /bridges/{id}/things" not in client.transfer_stats.endpoints()
@@ -0,0 +1,91 @@
+import subprocess
+import sys
+import pytest
+from qozy_client.frame import ChannelFrame
+
+
+numpy = pytest.importorskip("numpy")
+
+THINGS = {
+    "a": {"id": "a", "tags": ["x"], "channels": {
+        "switch": {"type": "SwitchChannel", "sensor": False, "value": True},
+        "dimmer": {"type": "DimmerChannel", "sensor": False, "value": 1},
+    }},
+    "b": {"id": "b", "tags": ["x", "y"], "channels": {
+        "color": {"type": "ColorChannel", "sensor": False, "value": [1, 2, 3]},
+        "temperature": {"type": "TemperatureChannel", "sensor": True, "value": 21.5},
+    }},
+    "c": {"id": "c", "tags": [], "channels": {
+        "label": {"type": "TextChannel", "sensor": True, "value": "1"},
+        "missing": {"type": "NumberChannel", "sensor": True, "value": None},
+        "off": {"type": "SwitchChannel", "sensor": False, "value": False},
+    }},
+}
+
+
+@pytest.fixture(params=[False, True], ids=["list", "numpy"])
+def frame(request):
+    frame = ChannelFrame.from_payload(THINGS)
+
+    return frame.to_numpy() if request.param else frame
+
+
+def _rows(frame, mask):
+    return [channel for channel, selected in zip(frame["channel"], mask) if selected]
+
+
+@pytest.mark.parametrize("equals, channels", [
+    ({"value": True}, ["switch"]),
+    ({"value": 1}, ["dimmer"]),
+    ({"value": False}, ["off"]),
+    ({"value": 0}, []),
+    ({"value": 21.5}, ["temperature"]),
+    ({"value": "1"}, ["label"]),
+    ({"value": None}, ["missing"]),
+    ({"value": [1, 2, 3]}, ["color"]),
+    ({"sensor": True}, ["temperature", "label", "missing"]),
+    ({"sensor": 1}, []),
+    ({"type": "SwitchChannel", "sensor": False}, ["switch", "off"]),
+    ({"thing_id": "b"}, ["color", "temperature"]),
+    ({"thing_id": 1}, []),
+])
+def test_mask_uses_json_equality(frame, equals, channels):
+    assert _rows(frame, frame.mask(**equals)) == channels
+
+
+def test_select_and_count_by_tag(frame):
+    assert frame.count_by_tag() == {"x": 4, "y": 2}
+
+    selected = frame.select(frame.mask(thing_id="b"))
+
+    assert len(selected) == 2
+    assert list(selected["channel"]) == ["color", "temperature"]
+    assert selected.count_by_tag() == {"x": 2, "y": 2}
+    assert frame.count_by_tag(frame.mask(sensor=False)) == {"x": 3, "y": 1}
+    assert selected.count_by_tag(selected.mask(sensor=True)) == {"x": 1, "y": 1}
+
+
+def test_numpy_columns():
+    frame = ChannelFrame.from_payload(THINGS).to_numpy()
+
+    assert frame.is_numpy
+    assert frame["thing_id"].dtype.kind == "U"
+    assert frame["value"].dtype == numpy.float64
+    assert list(frame["value_valid"]) == [True, True, False, True, False, False, True]
+    assert list(frame["value_bool"]) == [True, False, False, False, False, False, True]
+    assert frame["value_object"][2] == [1, 2, 3]
+    assert frame.to_numpy() is frame
+
+
+def test_channel_frame_from_stub(client, install):
+    frame = client.channel_frame(filter_tags=["floor-1"], numpy=True)
+    things = [thing for thing in install.things.values() if "floor-1" in thing["tags"]]
+
+    assert len(frame) == sum(len(thing["channels"]) for thing in things)
+    assert frame.count_by_tag()["floor-1"] == len(frame)
+
+
+def test_numpy_is_imported_on_first_use():
+    code = "import sys, qozy_client.client, qozy_client.cli; print('numpy' in sys.modules)"
+
+    assert subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.strip() == "False"
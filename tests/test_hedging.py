@@ -0,0 +1,129 @@
+import sys
+import threading
+import time
+import pytest
+from qozy_client.cli import main, writer
+from qozy_client.client import Client, DeadlineExceeded, deadline
+from qozy_client.hedging import HedgePolicy
+from qozy_client.stub import StubServer
+
+
+@pytest.fixture
+def policy():
+    policy = HedgePolicy(min_samples=5, min_delay=0.01, max_delay=0.01, max_workers=2, max_hedge_ratio=1)
+
+    for _ in range(5):
+        policy.record("GET", "/things", 0.001)
+
+    yield policy
+
+    policy.close()
+
+
+def test_unknown_endpoints_run_on_the_callers_thread(policy):
+    assert policy.delay("GET", "/rules") is None
+    assert policy.run("GET", "/rules", threading.current_thread) is threading.current_thread()
+    assert policy.stats().hedged == 0
+
+
+def test_slow_primary_is_hedged(policy):
+    calls = []
+
+    def exchange():
+        calls.append(None)
+
+        if len(calls) == 1:
+            time.sleep(0.5)
+            return "primary"
+
+        return "hedge"
+
+    assert policy.run("GET", "/things", exchange) == "hedge"
+    assert policy.stats() == (1, 1, 1, 0)
+
+
+def test_failed_hedge_falls_back_to_the_primary(policy):
+    calls = []
+
+    def exchange():
+        calls.append(None)
+
+        if len(calls) == 1:
+            time.sleep(0.1)
+            return "primary"
+
+        raise ConnectionError()
+
+    assert policy.run("GET", "/things", exchange) == "primary"
+    assert policy.stats().primary_won == 1
+
+
+def test_hedged_requests_are_bounded(policy):
+    release = threading.Event()
+    callers = []
+
+    def exchange():
+        if threading.current_thread() in callers:
+            return "unhedged"
+
+        release.wait(5)
+        return "hedged"
+
+    results = []
+
+    def request():
+        callers.append(threading.current_thread())
+        results.append(policy.run("GET", "/things", exchange))
+
+    threads = [threading.Thread(target=request) for _ in range(6)]
+
+    for thread in threads:
+        thread.start()
+
+    # two slots, the other requests aren't hedged and return right away
+    until = time.monotonic() + 5
+
+    while len(results) < 4 and time.monotonic() < until:
+        time.sleep(0.01)
+
+    assert results == ["unhedged"] * 4
+    assert policy._executor._max_workers == 4
+
+    release.set()
+
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == ["hedged"] * 2 + ["unhedged"] * 4
+
+    # the slots are free again once all attempts returned
+    for _ in range(2):
+        assert policy._slots.acquire(timeout=5)
+
+
+def test_deadline_covers_model_calls(server, install):
+    server.latency = 0.2
+    client = Client(url=server.url)
+
+    try:
+        with pytest.raises(DeadlineExceeded):
+            with deadline(0.3):
+                client.thing("thing-1")
+                client.thing("thing-2")
+    finally:
+        client.close()
+
+
+def test_cli_reports_deadlines_at_connect(install, monkeypatch, capsys):
+    with StubServer(install, latency=0.5) as server:
+        monkeypatch.setattr(sys, "argv", ["qozy", "--port", str(server.port), "--no-colors", "--timeout", "0.1", "things"])
+        monkeypatch.setattr(writer, "output_stream", sys.stdout)
+
+        with pytest.raises(SystemExit) as exit:
+            main()
+
+    assert exit.value.code == 1
+
+    output = capsys.readouterr().out
+    assert "Timed out connecting" in output
+    assert "Could not connect" not in output
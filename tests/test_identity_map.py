@@ -0,0 +1,63 @@
+import gc
+from qozy_client.client import Bridge, Client, Thing, Trigger
+
+
+def test_things_are_interned(client):
+    first = {thing.id: thing for thing in client.things()}
+    second = {thing.id: thing for thing in client.things()}
+
+    assert all(second[thing_id] is thing for thing_id, thing in first.items())
+    assert client.thing("thing-1") is first["thing-1"]
+    assert client.identity_map.get(Thing, "thing-1") is first["thing-1"]
+
+
+def test_refresh_updates_interned_instance(client, install):
+    thing = client.thing("thing-1")
+    name = next(iter(install.things["thing-1"]["channels"]))
+    channel = thing.channel(name)
+
+    install.things["thing-1"]["name"] = "Renamed"
+    install.things["thing-1"]["channels"][name]["value"] = "changed"
+
+    assert client.thing("thing-1") is thing
+    assert thing.name == "Renamed"
+    assert thing.channel(name) is channel
+    assert channel.value == "changed"
+
+
+def test_unreferenced_instances_are_dropped(client):
+    things = list(client.things())
+    bridges = list(client.bridges())
+    count = len(client.identity_map)
+
+    assert count == len(things) + len(bridges)
+    assert client.identity_map.get(Bridge, bridges[0].id) is bridges[0]
+
+    del things, bridges
+    gc.collect()
+
+    assert len(client.identity_map) == 0
+
+
+def test_rules_share_interned_triggers(client, install):
+    rules = list(client.rules())
+    triggers = {trigger.id: trigger for trigger in client.triggers()}
+
+    for rule in rules:
+        assert all(trigger is triggers[trigger.id] for trigger in rule.triggers())
+
+    assert client.trigger("trigger-0") is triggers["trigger-0"]
+    assert client.identity_map.get(Trigger, "trigger-0") is triggers["trigger-0"]
+    assert client.rule(rules[0].id) is rules[0]
+
+
+def test_clients_have_own_instances(server):
+    first = Client(url=server.url)
+    second = Client(url=server.url)
+
+    try:
+        assert first.thing("thing-1") is not second.thing("thing-1")
+        assert first.thing("thing-1").client is first
+    finally:
+        first.close()
+        second.close()
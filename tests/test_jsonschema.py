@@ -0,0 +1,139 @@
+import io
+import pytest
+from qozy_client.stub import BRIDGE_SETTINGS_SCHEMA
+from qozy_client.utils.cli import CliWriter
+from qozy_client.utils.jsonschema import JsonSchemaReader, JsonSchemaValidator, SchemaCache, ValidationError, json_equal
+
+
+def test_valid_settings():
+    validator = JsonSchemaValidator.compile(BRIDGE_SETTINGS_SCHEMA)
+
+    validator.validate({"host": "10.0.0.1", "port": 80, "secure": True, "mode": "manual", "devices": ["a"]})
+
+
+@pytest.mark.parametrize("settings, path", [
+    ({"port": 80}, ()),
+    ({"host": 1}, ("host",)),
+    ({"host": "h", "port": True}, ("port",)),
+    ({"host": "h", "port": 1.5}, ("port",)),
+    ({"host": "h", "mode": "other"}, ("mode",)),
+    ({"host": "h", "devices": ["a", 2]}, ("devices", 1)),
+    ([], ()),
+])
+def test_invalid_settings(settings, path):
+    validator = JsonSchemaValidator.compile(BRIDGE_SETTINGS_SCHEMA)
+
+    with pytest.raises(ValidationError) as error:
+        validator.validate(settings)
+
+    assert error.value.path == path
+    assert not validator.is_valid(settings)
+
+
+def test_one_of_and_const():
+    validator = JsonSchemaValidator.compile({"oneOf": [{"type": "integer"}, {"type": "number"}, {"const": "off"}]})
+
+    assert validator.is_valid(1.5)
+    assert validator.is_valid("off")
+    # an integer is a number as well
+    assert not validator.is_valid(1)
+    assert not validator.is_valid(False)
+
+
+def test_additional_properties():
+    validator = JsonSchemaValidator.compile({"properties": {"a": {"type": "string"}}, "additionalProperties": {"type": "integer"}})
+
+    assert validator.is_valid({"a": "x", "b": 1})
+    assert not validator.is_valid({"b": "x"})
+    assert not JsonSchemaValidator.compile({"additionalProperties": False}).is_valid({"b": 1})
+
+
+def test_equal_schemas_compile_once():
+    schema = {"type": "object", "required": ["x"]}
+
+    assert JsonSchemaValidator.compile(schema) is JsonSchemaValidator.compile(dict(schema))
+    assert JsonSchemaValidator.compile(schema, vendor_prefix="a") is JsonSchemaValidator.compile(schema, vendor_prefix="b")
+    assert JsonSchemaValidator.compile(schema) is not JsonSchemaValidator.compile({"type": "object"})
+
+
+def test_vendor_schema_change_is_compiled(client):
+    bridge = next(client.bridges())
+
+    assert bridge.settings_validator.is_valid(bridge.settings)
+
+    bridge._refresh(bridge.vendor_prefix, bridge.instance_id, {"type": "object", "required": ["missing"]}, bridge.settings)
+
+    assert not bridge.settings_validator.is_valid(bridge.settings)
+
+
+def test_boolean_schemas():
+    assert JsonSchemaValidator.compile(True).is_valid({"any": "thing"})
+    assert not JsonSchemaValidator.compile(False).is_valid(None)
+
+    validator = JsonSchemaValidator.compile({"properties": {"free": True, "never": False}, "items": False})
+
+    assert validator.is_valid({"free": [1]})
+    assert not validator.is_valid({"never": 1})
+
+    with pytest.raises(ValidationError) as error:
+        JsonSchemaValidator.compile({"type": "array", "items": False}).validate([1])
+
+    assert error.value.path == (0,)
+
+
+@pytest.mark.parametrize("a, b, equal", [
+    (1, 1.0, True),
+    (True, 1, False),
+    ([True], [1], False),
+    ({"a": [0]}, {"a": [False]}, False),
+    ({"a": [1, {"b": None}]}, {"a": [1, {"b": None}]}, True),
+    ({"a": 1}, {"a": 1, "b": 2}, False),
+])
+def test_json_equal(a, b, equal):
+    assert json_equal(a, b) is equal
+
+
+def test_enum_uses_json_equality():
+    validator = JsonSchemaValidator.compile({"enum": [[1, 2], {"a": 1}]})
+
+    assert validator.is_valid([1, 2])
+    assert not validator.is_valid([True, 2])
+    assert not validator.is_valid({"a": True})
+
+
+def test_schema_cache_is_bounded():
+    compiled = []
+    cache = SchemaCache(lambda schema: compiled.append(schema) or len(compiled), max_documents=2)
+
+    assert cache.get({"a": 1}) == 1
+    assert cache.get({"b": 1}) == 2
+    # used recently, so {"b": 1} is the one evicted
+    assert cache.get({"a": 1}) == 1
+    assert cache.get({"c": 1}) == 3
+    assert cache.get({"a": 1}) == 1
+    assert cache.get({"b": 1}) == 4
+    assert len(cache._by_document) == 2
+
+
+def _read(schema, answers, current=None, monkeypatch=None):
+    answers = iter(answers)
+    monkeypatch.setattr("builtins.input", lambda: next(answers))
+
+    return JsonSchemaReader(CliWriter(io.StringIO())).read(schema, current=current)
+
+
+def test_reader_boolean_defaults(monkeypatch):
+    schema = {"type": "object", "properties": {
+        "plain": {"type": "boolean"},
+        "on": {"type": "boolean", "default": True},
+        "off": {"type": "boolean", "default": False},
+    }}
+
+    assert _read(schema, ["", "", ""], monkeypatch=monkeypatch) == {"plain": False, "on": True, "off": False}
+    assert _read(schema, ["", "", ""], current={"plain": True, "on": False}, monkeypatch=monkeypatch) == {"plain": True, "on": False, "off": False}
+
+
+def test_reader_keeps_values_of_boolean_subschemas(monkeypatch):
+    schema = {"type": "object", "properties": {"host": {"type": "string"}, "extra": True}}
+
+    assert _read(schema, ["h"], current={"extra": [1]}, monkeypatch=monkeypatch) == {"host": "h", "extra": [1]}
@@ -0,0 +1,94 @@
+import math
+import random
+import sys
+import pytest
+from qozy_client.cli import main, writer
+from qozy_client.loadgen import LatencyHistogram, LoadGenerator, parse_mix
+
+
+def test_histogram_small_values_are_exact():
+    histogram = LatencyHistogram()
+
+    for microseconds in range(1, 101):
+        histogram.record(microseconds / 1000000)
+
+    assert histogram.count == 100
+    assert histogram.percentile(50) == 50 / 1000000
+    assert histogram.percentile(99) == 99 / 1000000
+    assert histogram.percentile(100) == 100 / 1000000
+    assert histogram.mean == pytest.approx(50.5 / 1000000)
+
+
+def test_histogram_relative_error():
+    histogram = LatencyHistogram(precision=8)
+    values = sorted(random.Random(1).randrange(1, 10000000) for _ in range(10000))
+
+    for value in values:
+        histogram.record(value / 1000000)
+
+    for percentile in (50, 90, 99, 99.9):
+        exact = values[math.ceil(len(values) * percentile / 100) - 1]
+        # buckets are below 2 ** (1 - precision) wide relative to their values
+        assert histogram.percentile(percentile) * 1000000 == pytest.approx(exact, rel=2 ** -7)
+
+    assert histogram.percentile(100) == values[-1] / 1000000
+
+
+def test_histogram_merge():
+    first = LatencyHistogram()
+    second = LatencyHistogram()
+    merged = LatencyHistogram()
+
+    for seconds in (0.001, 0.002, 0.5):
+        first.record(seconds)
+        merged.record(seconds)
+
+    for seconds in (0.0001, 0.03):
+        second.record(seconds)
+        merged.record(seconds)
+
+    first.merge(second)
+
+    assert first.counts == merged.counts
+    assert (first.count, first.min, first.max) == (5, 100, 500000)
+    assert LatencyHistogram().percentile(50) is None
+
+
+def test_parse_mix():
+    assert parse_mix("things=1, online=8,apply") == {"things": 1.0, "online": 8.0, "apply": 1.0}
+
+    with pytest.raises(ValueError):
+        parse_mix("unknown=1")
+
+    with pytest.raises(ValueError):
+        parse_mix("things=0")
+
+
+def test_arrivals_follow_ramp_up(client):
+    generator = LoadGenerator(client, rate=100, duration=3, ramp_up=2)
+    arrivals = list(generator.arrivals())
+
+    # half the rate on average during the ramp up, then the full rate
+    assert len(arrivals) == pytest.approx(100 * 2 / 2 + 100 * 1, abs=1)
+    assert sum(1 for offset in arrivals if offset < 1) == pytest.approx(25, abs=1)
+
+
+def test_load_generator_against_stub(client):
+    generator = LoadGenerator(client, rate=100, duration=0.5, mix={"things": 1, "online": 1}, seed=1)
+    results = {stats.operation: stats for stats in generator.run()}
+
+    assert sum(stats.requests for stats in results.values()) == 50
+    assert all(stats.errors == 0 for stats in results.values())
+    assert all(stats.histogram.count == stats.requests for stats in results.values())
+
+
+def test_bench_against_a_stub_needs_no_daemon(monkeypatch, capsys):
+    # nothing listens on port 1
+    monkeypatch.setattr(sys, "argv", ["qozy", "--port", "1", "--no-colors", "bench", "--stub", "--stub-things", "20", "--rate", "20", "--duration", "0.5", "--report-interval", "0"])
+    monkeypatch.setattr(writer, "output_stream", sys.stdout)
+
+    main()
+
+    output = capsys.readouterr().out
+    assert "request(s) in" in output
+    assert "Could not connect" not in output
@@ -0,0 +1,131 @@
+import json
+import pytest
+from qozy_client.manifest import ManifestError, load_manifest, plan_bridge_settings, plan_manifest
+
+
+def test_load_manifest(tmp_path):
+    (tmp_path / "manifest.json").write_text(json.dumps({"things": {"thing-1": {"name": "Kitchen"}}}))
+    (tmp_path / "manifest.yaml").write_text("things:\n  thing-1:\n    name: Kitchen\n")
+    (tmp_path / "empty.yaml").write_text("")
+    (tmp_path / "list.json").write_text("[]")
+
+    assert load_manifest(str(tmp_path / "manifest.json")) == load_manifest(str(tmp_path / "manifest.yaml"))
+    assert load_manifest(str(tmp_path / "empty.yaml")) == {}
+
+    with pytest.raises(ManifestError):
+        load_manifest(str(tmp_path / "list.json"))
+
+
+def test_plan_manifest(client, install):
+    thing = install.things["thing-1"]
+    manifest = {
+        "things": {
+            "thing-1": {"name": "Kitchen", "tags": thing["tags"][:1] + ["new"]},
+            "thing-2": {"name": install.things["thing-2"]["name"]},
+        },
+        "bridges": {
+            "bridge-0": {"settings": {"port": 9090}},
+        },
+    }
+
+    plan = plan_manifest(client, manifest)
+
+    assert sorted(str(change) for change in plan.changes()) == sorted([
+        "rename \"Thing 1\" -> \"Kitchen\"",
+        "add tag \"new\"",
+        "remove tag \"{:s}\"".format(thing["tags"][1]),
+        "update settings port",
+    ])
+
+    results = plan.execute()
+
+    assert all(result.success for result in results)
+    assert thing["name"] == "Kitchen"
+    assert thing["tags"] == [thing["tags"][0], "new"]
+    assert install.bridges["bridge-0"]["settings"]["port"] == 9090
+    assert len(plan_manifest(client, manifest)) == 0
+
+
+def test_bridge_settings_are_merged(client, install):
+    settings = install.bridges["bridge-1"]["settings"]
+    plan = plan_manifest(client, {"bridges": {"bridge-1": {"settings": {"host": "10.1.1.1", "port": 1, "mode": None}}}})
+
+    assert [str(change) for change in plan.changes()] == ["update settings host, mode, port"]
+    assert all(result.success for result in plan.execute())
+    assert install.bridges["bridge-1"]["settings"] == {"host": "10.1.1.1", "port": 1, "devices": settings["devices"]}
+
+
+def test_bridge_settings_replace(client, install):
+    plan = plan_manifest(client, {"bridges": {"bridge-1": {"settings": {"host": "10.1.1.1"}, "replace": True}}})
+
+    assert all(result.success for result in plan.execute())
+    assert install.bridges["bridge-1"]["settings"] == {"host": "10.1.1.1"}
+
+
+def test_empty_specs(client, install):
+    tags = install.things["thing-1"]["tags"]
+
+    assert len(plan_manifest(client, {"things": {"thing-1": None, "thing-2": {"channels": None}}})) == 0
+
+    plan = plan_manifest(client, {"things": {"thing-1": {"tags": None}}})
+
+    assert sorted(str(change) for change in plan.changes()) == sorted("remove tag \"{:s}\"".format(tag) for tag in tags)
+
+    with pytest.raises(ManifestError):
+        plan_manifest(client, {"things": {"thing-1": ["name"]}})
+
+    with pytest.raises(ManifestError):
+        plan_manifest(client, {"things": ["thing-1"]})
+
+
+def test_plan_manifest_unknown_things(client):
+    manifest = {"things": {"missing": {"name": "x"}}}
+
+    with pytest.raises(ManifestError):
+        plan_manifest(client, manifest)
+
+    assert len(plan_manifest(client, manifest, ignore_missing=True)) == 0
+
+
+def test_plan_manifest_invalid_settings(client):
+    with pytest.raises(ManifestError):
+        plan_manifest(client, {"bridges": {"bridge-0": {"settings": {"host": 1}}}})
+
+
+def test_plan_keeps_errors_per_change(client, install):
+    plan = plan_manifest(client, {"things": {"thing-1": {"name": "Kitchen"}}})
+    del install.things["thing-1"]
+
+    results = plan.execute()
+
+    assert len(results) == 1
+    assert not results[0].success
+
+
+def test_plan_bridge_settings(client, install):
+    bridges = [bridge for bridge in client.bridges() if bridge.vendor_prefix == "vendor0"]
+    plan = plan_bridge_settings(bridges, {"mode": "manual"})
+
+    assert len(plan) == len(bridges)
+    assert all(result.success for result in plan.execute())
+
+    for bridge in install.bridges.values():
+        # unrelated settings are kept
+        assert bridge["settings"]["mode"] == ("manual" if bridge["vendorPrefix"] == "vendor0" else "auto")
+        assert bridge["settings"]["host"]
+
+
+def test_plan_bridge_settings_applies_only_changed_answers(client, install):
+    install.bridges["bridge-1"]["vendorPrefix"] = "vendor0"
+    bridges = [bridge for bridge in client.bridges() if bridge.vendor_prefix == "vendor0"]
+    prefill = bridges[0].settings
+
+    # as answered interactively, the first bridge's settings with the port changed
+    plan = plan_bridge_settings(bridges, dict(prefill, port=9090), prefill=prefill)
+
+    assert all(result.success for result in plan.execute())
+    assert install.bridges["bridge-0"]["settings"]["host"] == "10.0.0.1"
+    assert install.bridges["bridge-1"]["settings"]["host"] == "10.0.1.1"
+    assert all(install.bridges[bridge.id]["settings"]["port"] == 9090 for bridge in bridges)
+
+    assert len(plan_bridge_settings(bridges, dict(prefill), prefill=prefill)) == 0
@@ -0,0 +1,137 @@
+import pytest
+from qozy_client.client import PreconditionFailed, RequestError
+from qozy_client.stub import StubHandler
+from qozy_client.utils.mergepatch import create_merge_patch, apply_merge_patch, has_null_members
+
+
+# examples of RFC 7386, appendix A
+RFC_EXAMPLES = [
+    ({"a": "b"}, {"a": "c"}, {"a": "c"}),
+    ({"a": "b"}, {"b": "c"}, {"a": "b", "b": "c"}),
+    ({"a": "b"}, {"a": None}, {}),
+    ({"a": "b", "b": "c"}, {"a": None}, {"b": "c"}),
+    ({"a": ["b"]}, {"a": "c"}, {"a": "c"}),
+    ({"a": "c"}, {"a": ["b"]}, {"a": ["b"]}),
+    ({"a": {"b": "c"}}, {"a": {"b": "d", "c": None}}, {"a": {"b": "d"}}),
+    ({"a": [{"b": "c"}]}, {"a": [1]}, {"a": [1]}),
+    (["a", "b"], ["c", "d"], ["c", "d"]),
+    ({"a": "b"}, ["c"], ["c"]),
+    ({"a": "foo"}, None, None),
+    ({"a": "foo"}, "bar", "bar"),
+    ({"e": None}, {"a": 1}, {"e": None, "a": 1}),
+    ([1, 2], {"a": "b", "c": None}, {"a": "b"}),
+    ({}, {"a": {"bb": {"ccc": None}}}, {"a": {"bb": {}}}),
+]
+
+
+@pytest.mark.parametrize("target, patch, result", RFC_EXAMPLES)
+def test_apply_merge_patch(target, patch, result):
+    assert apply_merge_patch(target, patch) == result
+
+
+@pytest.mark.parametrize("source, target", [
+    ({"a": 1, "b": {"c": 2, "d": 3}}, {"a": 1, "b": {"c": 4}, "e": [5]}),
+    ({"a": [1, 2]}, {"a": []}),
+    ({"a": {"b": 1}}, {}),
+    ({"a": 1}, []),
+])
+def test_create_merge_patch_round_trip(source, target):
+    assert apply_merge_patch(source, create_merge_patch(source, target)) == target
+
+
+def test_create_merge_patch_only_holds_changes():
+    source = {"host": "10.0.0.1", "port": 8080, "mode": "auto"}
+
+    assert create_merge_patch(source, dict(source, port=9090)) == {"port": 9090}
+    assert create_merge_patch(source, source) == {}
+
+
+def test_has_null_members():
+    assert has_null_members({"a": {"b": None}})
+    assert not has_null_members({"a": {"b": 1}, "c": [None]})
+    assert not has_null_members(None)
+
+
+def test_update_settings_sends_patch(client, install):
+    bridge = next(client.bridges())
+    settings = dict(bridge.settings, port=9090)
+
+    assert bridge.update_settings(settings)
+    assert install.bridges[bridge.id]["settings"] == settings
+    assert not bridge.update_settings(settings)
+
+
+def test_update_settings_sends_if_match_without_refetching(client, install):
+    bridge = client.bridge("bridge-1")
+    etag = bridge.etag
+
+    assert etag == install.bridge_etag("bridge-1")
+    assert bridge.update_settings(dict(bridge.settings, port=9090))
+    assert bridge.etag not in (None, etag)
+    assert bridge.update_settings(dict(bridge.settings, port=9091))
+
+    endpoints = client.transfer_stats.endpoints()
+    assert endpoints["GET /bridges/{id}"].requests == 1
+    assert "GET /bridges/{id}/settings" not in endpoints
+    assert endpoints["PATCH /bridges/{id}/settings"].requests == 2
+
+
+def test_update_settings_without_validator_patches_unconditionally(client, install):
+    bridge = next(client.bridges())
+
+    assert bridge.etag is None
+    assert bridge.update_settings(dict(bridge.settings, port=9090))
+    assert install.bridges[bridge.id]["settings"]["port"] == 9090
+    assert bridge.etag == install.bridge_etag(bridge.id)
+
+
+def test_update_settings_puts_null_members(client, install):
+    bridge = client.bridge("bridge-1")
+    settings = dict(bridge.settings, mode=None)
+
+    assert bridge.update_settings(settings, validate=False)
+    assert install.bridges[bridge.id]["settings"] == settings
+    assert client.transfer_stats.endpoints()["PUT /bridges/{id}/settings"].requests == 1
+
+
+def test_update_settings_put_needs_validator(client, install):
+    bridge = next(client.bridges())
+    settings = dict(bridge.settings, mode=None)
+
+    with pytest.raises(RequestError) as error:
+        bridge.update_settings(settings, validate=False)
+
+    assert error.value.status_code == 428
+    assert install.bridges[bridge.id]["settings"]["mode"] == "auto"
+
+    assert bridge.update_settings(settings, validate=False, unconditional=True)
+    assert install.bridges[bridge.id]["settings"] == settings
+
+
+def test_update_settings_falls_back_to_put(client, install, monkeypatch):
+    monkeypatch.setattr(StubHandler, "ROUTES", [route for route in StubHandler.ROUTES if route[0] != "PATCH"])
+    bridge = client.bridge("bridge-1")
+    settings = dict(bridge.settings, port=9090)
+
+    assert bridge.update_settings(settings)
+    assert install.bridges[bridge.id]["settings"] == settings
+
+
+def test_update_settings_replaces_with_falsy_settings(client, install):
+    bridge = next(client.bridges())
+
+    assert bridge.update_settings([], validate=False)
+    assert install.bridges[bridge.id]["settings"] == []
+
+
+def test_update_settings_detects_concurrent_change(client, install):
+    bridge = client.bridge("bridge-1")
+
+    install.bridges[bridge.id]["settings"] = dict(bridge.settings, port=1)
+    install.touch(bridge.id)
+
+    with pytest.raises(PreconditionFailed):
+        bridge.update_settings(dict(bridge.settings, mode="manual"))
+
+    assert install.bridges[bridge.id]["settings"]["port"] == 1
+    assert install.bridges[bridge.id]["settings"]["mode"] == "auto"
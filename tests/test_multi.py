@@ -0,0 +1,55 @@
+import pytest
+from qozy_client.multi import MultiClient, parse_target, read_hosts_file
+
+
+@pytest.mark.parametrize("target, url", [
+    ("pi", "http://pi:9876/api"),
+    ("pi:8000", "http://pi:8000/api"),
+    ("10.0.0.1", "http://10.0.0.1:9876/api"),
+    ("[::1]", "http://[::1]:9876/api"),
+    ("[fe80::1]:8000", "http://[fe80::1]:8000/api"),
+    ("fe80::1", "http://[fe80::1]:9876/api"),
+    ("http+unix://%2Frun%2Fqozy.sock/api", "http+unix://%2Frun%2Fqozy.sock/api"),
+])
+def test_parse_target(target, url):
+    assert parse_target(target, 9876) == url
+
+
+@pytest.mark.parametrize("target", ["[::1]8000", "pi:port"])
+def test_parse_invalid_target(target):
+    with pytest.raises(ValueError):
+        parse_target(target, 9876)
+
+
+def test_read_hosts_file(tmp_path):
+    path = tmp_path / "hosts"
+    path.write_text("# daemons\npi\n\n[::1]:8000  # local\n")
+
+    assert read_hosts_file(str(path), 9876) == ["http://pi:9876/api", "http://[::1]:8000/api"]
+
+
+def test_errors_are_keyed_by_label(server):
+    unreachable = "http://127.0.0.1:1/api"
+    client = MultiClient.connect([server.url, unreachable])
+
+    try:
+        assert len(client.clients) == 1
+        assert set(client.errors) == {"127.0.0.1:1"}
+
+        def fail(single_client):
+            raise ValueError("failed")
+
+        assert list(client._stream(fail)) == []
+        assert set(client.errors) == {"127.0.0.1:1", client.clients[0].label}
+    finally:
+        client.close()
+
+
+def test_things_from_every_daemon(server, install):
+    client = MultiClient.connect([server.url, server.url])
+
+    try:
+        assert len(list(client.things())) == 2 * len(install.things)
+        assert client.errors == {}
+    finally:
+        client.close()
@@ -0,0 +1,71 @@
+from qozy_client.notifications import NotificationFeed
+from qozy_client.stub import StubHandler
+
+
+def _without_route(method, path):
+    return [route for route in StubHandler.ROUTES if not (route[0] == method and route[1].pattern == path)]
+
+
+def _ignoring_since(install, params, payload, headers):
+    return install.notifications
+
+
+def _notification(install, index, created):
+    notification = dict(install.notifications[0], contextId="notification-new-{:d}".format(index), created=created, dismissable=True)
+    install.notifications.append(notification)
+
+
+def test_since_includes_the_timestamp(client, install):
+    since = install.notifications[2]["created"]
+
+    assert [notification.created for notification in client.notifications(since=since)] == [
+        notification["created"] for notification in install.notifications[2:]
+    ]
+
+
+def test_since_is_filtered_if_the_daemon_ignores_it(client, install, monkeypatch):
+    monkeypatch.setattr(StubHandler, "ROUTES", [
+        (method, pattern, _ignoring_since if method == "GET" and pattern.pattern == r"/notifications" else handler, etag)
+        for method, pattern, handler, etag in StubHandler.ROUTES
+    ])
+    since = install.notifications[3]["created"]
+
+    assert [notification.context_id for notification in client.notifications(since=since)] == ["notification-3", "notification-4"]
+
+
+def test_feed_delivers_notifications_sharing_the_cursor_timestamp(client, install):
+    feed = NotificationFeed(client)
+
+    assert len(feed.poll()) == len(install.notifications)
+    assert feed.poll() == []
+
+    # created within the same second as the newest one already delivered
+    _notification(install, 0, feed.cursor)
+
+    assert [notification.context_id for notification in feed.poll()] == ["notification-new-0"]
+    assert feed.poll() == []
+
+
+def test_dismiss_in_bulk(client, install):
+    dismissed = client.dismiss_notifications(client.notifications())
+
+    assert dismissed == ["notification-0", "notification-2", "notification-4"]
+    assert [notification["contextId"] for notification in install.notifications] == ["notification-1", "notification-3"]
+    assert client.transfer_stats.endpoints()["DELETE /notifications"].requests == 1
+
+
+def test_dismiss_falls_back_to_single_requests(client, install, monkeypatch):
+    monkeypatch.setattr(StubHandler, "ROUTES", _without_route("DELETE", r"/notifications"))
+
+    dismissed = client.dismiss_notifications(client.notifications())
+
+    assert dismissed == ["notification-0", "notification-2", "notification-4"]
+    assert [notification["contextId"] for notification in install.notifications] == ["notification-1", "notification-3"]
+    assert client.transfer_stats.endpoints()["DELETE /notifications/{id}"].requests == 3
+
+    # the bulk endpoint isn't tried again
+    _notification(install, 0, install.notifications[0]["created"])
+    assert client.dismiss_notifications(client.notifications()) == ["notification-new-0"]
+
+    assert client.transfer_stats.endpoints()["DELETE /notifications"].requests == 1
+    assert client.transfer_stats.endpoints()["DELETE /notifications/{id}"].requests == 4
@@ -0,0 +1,99 @@
+import time
+from qozy_client.online import OnlineMonitor
+
+
+def _monitored(monitor, thing_id):
+    return monitor._things[thing_id]
+
+
+def test_stable_things_back_off(client, install):
+    monitor = OnlineMonitor(client, min_interval=1, max_interval=4, backoff=2)
+    monitor.add(client.thing("thing-1"))
+
+    for interval in (2, 4, 4):
+        monitor._poll(_monitored(monitor, "thing-1"))
+
+        assert monitor.entry("thing-1").interval == interval
+
+    assert monitor.online("thing-1") == install.online["thing-1"]
+    assert monitor.polls == 3
+    assert monitor.transitions == 0
+
+
+def test_transitions_reset_the_interval_and_notify(client, install):
+    changes = []
+    monitor = OnlineMonitor(client, min_interval=1, max_interval=8, on_change=lambda thing, online: changes.append((thing.id, online)))
+    monitor.add(client.thing("thing-1"))
+    install.online["thing-1"] = True
+
+    monitor._poll(_monitored(monitor, "thing-1"))
+    monitor._poll(_monitored(monitor, "thing-1"))
+    install.online["thing-1"] = False
+    monitor._poll(_monitored(monitor, "thing-1"))
+
+    entry = monitor.entry("thing-1")
+    assert entry.interval == 1
+    assert entry.transitions == 1
+    assert entry.last_change is not None
+    assert changes == [("thing-1", False)]
+
+
+def test_failed_polls_keep_the_last_state(client, install):
+    monitor = OnlineMonitor(client)
+    thing = client.thing("thing-1")
+    monitor.add(thing)
+    monitor._poll(_monitored(monitor, "thing-1"))
+
+    del install.things["thing-1"]
+    monitor._poll(_monitored(monitor, "thing-1"))
+
+    assert monitor.errors == 1
+    assert monitor.online("thing-1") == install.online["thing-1"]
+
+
+def test_removed_things_are_dropped(client):
+    monitor = OnlineMonitor(client)
+    monitor.add_all([client.thing("thing-1"), client.thing("thing-2")])
+    monitored = _monitored(monitor, "thing-1")
+
+    monitor.remove("thing-1")
+    monitor._poll(monitored)
+
+    assert monitor.polls == 0
+    assert monitor.online("thing-1") is None
+    assert [entry.thing_id for entry in monitor.schedule()] == ["thing-2"]
+
+
+def test_token_bucket_limits_the_rate(client):
+    monitor = OnlineMonitor(client, max_rps=2)
+    now = time.monotonic()
+
+    assert monitor._take_token(now) == 0
+    assert monitor._take_token(now) == 0
+    assert 0 < monitor._take_token(now) <= 0.5
+    assert monitor._take_token(now + 0.5) == 0
+
+
+def test_schedule_is_ordered_by_due_time(client):
+    monitor = OnlineMonitor(client, min_interval=1, backoff=10, max_interval=100)
+    monitor.add_all(client.thing(thing_id) for thing_id in ("thing-1", "thing-2", "thing-3"))
+    monitor._poll(_monitored(monitor, "thing-1"))
+
+    assert [entry.thing_id for entry in monitor.schedule()][-1] == "thing-1"
+
+
+def test_monitor_thread_polls_every_thing(client, install):
+    monitor = OnlineMonitor(client, min_interval=60, max_rps=1000)
+    monitor.add_all(client.things())
+    monitor.start()
+
+    try:
+        deadline = time.monotonic() + 10
+
+        while monitor.polls < len(install.things) and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        monitor.stop()
+
+    assert monitor.polls == len(install.things)
+    assert all(monitor.online(thing_id) == install.online[thing_id] for thing_id in install.things)
@@ -0,0 +1,36 @@
+from qozy_client.client import DeadlineExceeded, deadline
+
+
+def test_retag(client, install):
+    results = client.retag(filter_tags=["floor-1"], add=["a", "floor-1"], remove=["floor-1", "b"], max_workers=4)
+    things = [thing for thing in install.things.values() if "a" in thing["tags"]]
+
+    assert len(results) == len(things) == 6
+    assert all(result.success and result.added == ["a"] and result.removed == [] for result in results)
+    assert all(thing["tags"].count("floor-1") == 1 for thing in things)
+
+    results = client.retag(filter_tags=["a"], add=["a"])
+
+    assert not any(result.changed for result in results)
+
+
+def test_retag_removes_tags(client, install):
+    results = client.retag(filter_tags=["room-1"], remove=["room-1", "missing"])
+
+    assert [result.removed for result in results] == [["room-1"]]
+    assert "room-1" not in install.things["thing-1"]["tags"]
+
+
+def test_retag_without_matches(client):
+    assert client.retag(filter_tags=["missing"], add=["a"]) == []
+
+
+def test_retag_runs_in_the_callers_context(client, server):
+    server.latency = 0.05
+
+    with deadline(0.3):
+        results = client.retag(add=["a"], max_workers=2)
+
+    # the deadline applied to the requests on the worker threads, those past it failed
+    assert any(result.success for result in results)
+    assert any(isinstance(result.error, DeadlineExceeded) for result in results)
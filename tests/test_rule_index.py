@@ -0,0 +1,52 @@
+from qozy_client.rule_index import RuleIndex
+
+
+def _ids(rules):
+    return [rule.id for rule in rules]
+
+
+def test_lookups_match_a_scan(client, install):
+    index = RuleIndex(client)
+
+    assert len(index) == len(install.rules)
+
+    for trigger_id, trigger in install.triggers.items():
+        expected = [rule_id for rule_id, rule in install.rules.items() if trigger_id in rule["triggers"]]
+
+        assert _ids(index.by_trigger(trigger_id)) == expected
+        assert set(_ids(index.by_event(trigger["eventName"]))) >= set(expected)
+
+    for rule_id, rule in install.rules.items():
+        action = rule["actions"][0]
+
+        assert rule_id in _ids(index.by_thing(action["thing_id"]))
+        assert rule_id in _ids(index.by_channel(action["thing_id"], action["channel"]))
+
+    assert index.by_thing("missing") == []
+
+
+def test_nested_action_references(client, install):
+    install.rules["rule-0"]["actions"] = [{"type": "scene", "steps": [{"thingId": "thing-29", "channelName": "dimmer1"}, {"thing": "thing-28"}]}]
+    index = RuleIndex(client)
+
+    assert _ids(index.by_channel("thing-29", "dimmer1")) == ["rule-0"]
+    assert _ids(index.by_thing("thing-28")) == ["rule-0"]
+
+
+def test_refresh_reindexes_changes_only(client, install):
+    index = RuleIndex(client)
+    rule = index.rules["rule-1"]
+
+    assert index.refresh() == (0, 0, 0)
+
+    install.rules["rule-1"]["actions"] = [{"thing_id": "thing-27", "channel": "switch0"}]
+    del install.rules["rule-2"]
+    install.rules["rule-new"] = {"id": "rule-new", "name": "New", "actions": [], "triggers": ["trigger-0"]}
+
+    assert index.refresh() == (1, 1, 1)
+    assert index.rules["rule-1"] is rule
+    assert _ids(index.by_thing("thing-27")) == ["rule-1"]
+    assert "rule-1" not in _ids(index.by_thing(install.things["thing-1"]["id"]))
+    assert "rule-2" not in index.rules
+    assert "rule-2" not in _ids(index.by_trigger("trigger-2"))
+    assert "rule-new" in _ids(index.by_trigger("trigger-0"))
@@ -0,0 +1,107 @@
+import threading
+import pytest
+from qozy_client.sampler import ChannelSampler, RingBuffer
+
+
+def test_ring_buffer_keeps_newest_samples():
+    buffer = RingBuffer(4)
+
+    for second in range(10):
+        buffer.append(float(second), second * 10.0)
+
+    assert len(buffer) == 4
+    assert list(buffer.samples()) == [(6.0, 60.0), (7.0, 70.0), (8.0, 80.0), (9.0, 90.0)]
+    assert buffer.last() == (9.0, 90.0)
+
+
+def test_ring_buffer_window():
+    buffer = RingBuffer(8)
+
+    for second in range(12):
+        buffer.append(float(second), float(second % 3))
+
+    assert [timestamp for timestamp, _ in buffer.samples(window=2, now=11)] == [9.0, 10.0, 11.0]
+    assert buffer.min(window=2, now=11) == 0.0
+    assert buffer.max(window=2, now=11) == 2.0
+    assert buffer.mean(window=2, now=11) == 1.0
+    assert buffer.mean(window=2, now=100) is None
+
+
+def test_ring_buffer_rate():
+    buffer = RingBuffer(16)
+
+    assert buffer.rate() is None
+    assert buffer.last() is None
+
+    for second in range(5):
+        buffer.append(float(second), second * 2.5)
+
+    assert buffer.rate() == 2.5
+    assert buffer.rate(window=0, now=4) is None
+
+
+def test_ring_buffer_copy_is_independent():
+    buffer = RingBuffer(3)
+    buffer.append(1.0, 1.0)
+    copy = buffer.copy()
+
+    for second in range(2, 6):
+        buffer.append(float(second), float(second))
+
+    assert list(copy.samples()) == [(1.0, 1.0)]
+    assert list(buffer.samples()) == [(3.0, 3.0), (4.0, 4.0), (5.0, 5.0)]
+
+
+def test_sampler_samples_tracked_channels(client, install):
+    sampler = ChannelSampler(client)
+    name, channel = next((name, channel) for name, channel in install.things["thing-1"]["channels"].items() if isinstance(channel["value"], (int, float)))
+    sampler.add("thing-1", name)
+    sampler.add("thing-1", "missing")
+
+    sampler.sample()
+    channel["value"] = 7
+    sampler.sample()
+
+    series = sampler.series("thing-1", name)
+
+    assert [value for _, value in series.samples()][-1] == 7.0
+    assert len(series) == 2
+    assert len(sampler.series("thing-1", "missing")) == 0
+
+    # strings aren't sampled, booleans count as 0 and 1
+    sampler.record("thing-1", name, "on")
+    sampler.record("thing-1", name, True)
+
+    assert sampler.series("thing-1", name).last()[1] == 1.0
+
+    sampler.remove("thing-1", name)
+
+    with pytest.raises(KeyError):
+        sampler.series("thing-1", name)
+
+
+def test_series_is_consistent_while_recording(client):
+    sampler = ChannelSampler(client, capacity=64)
+    sampler.add("thing-1", "switch0")
+    stop = threading.Event()
+
+    def record():
+        timestamp = 0
+
+        while not stop.is_set():
+            timestamp += 1
+            sampler.record("thing-1", "switch0", timestamp, timestamp=timestamp)
+
+    thread = threading.Thread(target=record)
+    thread.start()
+
+    try:
+        for _ in range(2000):
+            samples = list(sampler.series("thing-1", "switch0").samples())
+
+            # values equal their timestamps, a torn read shows up as a gap or a mismatch
+            assert all(timestamp == value for timestamp, value in samples)
+            assert all(b[0] - a[0] == 1 for a, b in zip(samples, samples[1:]))
+    finally:
+        stop.set()
+        thread.join()
@@ -0,0 +1,43 @@
+from qozy_client.scan import ScanJob, ThingRegistry
+
+
+def test_registry_reports_new_things(client):
+    thing = client.thing("thing-1")
+    registry = ThingRegistry()
+
+    assert registry.add(thing)
+    assert not registry.add(thing)
+    assert "thing-1" in registry
+    assert registry.ids() == {"thing-1"}
+    assert list(registry) == [thing]
+
+
+def test_scan_without_new_things(client, install):
+    job = ScanJob(client, poll_interval=0.01).start()
+
+    assert list(job) == []
+    assert job.error is None
+
+    progress = job.progress()
+    assert progress.done and not progress.cancelled
+    assert progress.discovered == 0
+    assert progress.known == len(install.things)
+
+
+def test_scan_yields_things_missing_from_the_registry(client, install):
+    registry = ThingRegistry(thing for thing in client.things() if thing.id not in ("thing-3", "thing-4"))
+    job = ScanJob(client, registry=registry, poll_interval=0.01).start()
+
+    assert sorted(thing.id for thing in job) == ["thing-3", "thing-4"]
+    assert registry.ids() == set(install.things)
+    assert job.progress().discovered == 2
+
+
+def test_cancelled_scan_stops_reporting(client):
+    job = ScanJob(client, registry=ThingRegistry(), poll_interval=0.01)
+    job.cancel()
+    job.start()
+
+    assert job.wait(5)
+    assert list(job) == []
+    assert job.progress().cancelled
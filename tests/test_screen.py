@@ -0,0 +1,97 @@
+import io
+import os
+import time
+from argparse import Namespace
+from qozy_client.cli import TopCLI, writer
+from qozy_client.utils.cli import CliWriter
+from qozy_client.utils.screen import LiveTable, Screen
+
+
+class FixedScreen(Screen):
+    def __init__(self, cli_writer, columns=80, lines=24):
+        super().__init__(cli_writer)
+
+        self.terminal_size = os.terminal_size((columns, lines))
+
+    def size(self):
+        return self.terminal_size
+
+
+def _texts(lines):
+    return [[text for _, _, text in cells] for cells in lines]
+
+
+def test_live_table_keeps_rows_sorted():
+    table = LiveTable("ID", "STATE", sort_key=lambda key, columns: (columns[1], key))
+
+    assert table.update("b", "b", "2")
+    assert table.update("a", "a", "3")
+    assert table.update("c", "c", "1")
+    assert not table.update("c", "c", "1")
+
+    assert _texts(table.lines()) == [["ID", "STATE"], ["c", "1"], ["b", "2"], ["a", "3"]]
+
+    table.update("a", "a", "0")
+    table.remove("b")
+
+    assert not table.remove("b")
+    assert _texts(table.lines(offset=1, limit=1)) == [["ID", "STATE"], ["c", "1"]]
+    assert len(table) == 2
+
+
+def test_live_table_columns_only_grow():
+    table = LiveTable("ID", "NAME")
+    table.update("a", "a", "a long name")
+    table.update("a", "a", "short")
+
+    assert table.column_widths == [2, len("a long name")]
+    assert [x for x, _, _ in table.lines()[1]] == [0, 5]
+
+
+def test_screen_writes_only_changed_cells():
+    screen = FixedScreen(CliWriter(io.StringIO()))
+    lines = [[(0, 10, "a"), (10, 10, "b")], [(0, 10, "c")]]
+
+    assert screen.draw(lines) == 3
+    assert screen.draw(lines) == 0
+    assert screen.draw([[(0, 10, "a"), (10, 10, "x")], [(0, 10, "c")]]) == 1
+
+    # a cell that disappeared is blanked
+    assert screen.draw([[(0, 10, "a"), (10, 10, "x")]]) == 1
+
+    screen.terminal_size = os.terminal_size((40, 24))
+
+    assert screen.draw([[(0, 10, "a"), (10, 10, "x")]]) == 2
+
+
+def test_screen_clips_to_the_terminal():
+    screen = FixedScreen(CliWriter(io.StringIO()), columns=15, lines=3)
+
+    assert screen.draw([[(0, 10, "a"), (10, 10, "b"), (20, 10, "c")], [(0, 10, "d")], [(0, 10, "e")]]) == 3
+    assert screen._cells[(0, 10)] == ("b", 5)
+
+
+def test_top(client, install, monkeypatch):
+    output = io.StringIO()
+    frames = []
+
+    def sleep(seconds):
+        frames.append(seconds)
+
+        if len(frames) == 3:
+            raise KeyboardInterrupt()
+
+    monkeypatch.setattr(writer, "output_stream", output)
+    monkeypatch.setattr(Screen, "size", lambda self: os.terminal_size((120, 50)))
+    monkeypatch.setattr(time, "sleep", sleep)
+
+    options = Namespace(tags=["floor-1"], interval=5, refresh=0.25, min_interval=5, max_interval=120, max_rps=1000)
+    TopCLI(client).execute(options)
+
+    text = output.getvalue()
+    things = [thing_id for thing_id, thing in install.things.items() if "floor-1" in thing["tags"]]
+
+    assert "{:d} things".format(len(things)) in text
+    assert all(thing_id in text for thing_id in things)
+    assert "thing-2 " not in text
+    assert client.transfer_stats.endpoints()["GET /things"].requests == 1
@@ -0,0 +1,101 @@
+import os
+import sys
+import pytest
+from qozy_client import snapshot
+from qozy_client.cli import main
+from qozy_client.client import RequestError
+from qozy_client.manifest import plan_manifest
+from qozy_client.snapshot import SnapshotChange, SnapshotError, diff_snapshots, export_snapshot, read_snapshot, snapshot_manifest
+
+
+@pytest.mark.parametrize("name", ["snapshot.jsonl", "snapshot.jsonl.gz"])
+def test_export_snapshot(client, install, tmp_path, name):
+    path = str(tmp_path / name)
+    count = export_snapshot(client, path)
+    records = read_snapshot(path)
+
+    assert count == len(records) == len(install.bridges) + len(install.things) + len(install.rules) + len(install.triggers)
+    assert records[("thing", "thing-1")][1]["name"] == install.things["thing-1"]["name"]
+    assert records[("bridge", "bridge-0")][1]["settings"] == install.bridges["bridge-0"]["settings"]
+    assert os.listdir(str(tmp_path)) == [name]
+
+
+def test_failed_export_keeps_previous_snapshot(client, tmp_path, monkeypatch):
+    path = str(tmp_path / "snapshot.jsonl")
+    export_snapshot(client, path)
+
+    with open(path, "rb") as f:
+        previous = f.read()
+
+    def failing_rules(client):
+        yield from ()
+        raise RequestError(500, "failed")
+
+    monkeypatch.setattr(snapshot, "_rule_records", failing_rules)
+
+    with pytest.raises(RequestError):
+        export_snapshot(client, path)
+
+    with open(path, "rb") as f:
+        assert f.read() == previous
+
+    assert os.listdir(str(tmp_path)) == ["snapshot.jsonl"]
+
+
+def test_read_snapshot_rejects_other_files(tmp_path):
+    path = tmp_path / "other.jsonl"
+    path.write_text("{\"kind\": \"thing\"}\n")
+
+    with pytest.raises(SnapshotError):
+        read_snapshot(str(path))
+
+
+def test_diff_snapshots(client, install, tmp_path):
+    old = str(tmp_path / "old.jsonl")
+    new = str(tmp_path / "new.jsonl")
+
+    export_snapshot(client, old)
+    install.things["thing-1"]["name"] = "Renamed"
+    del install.rules["rule-1"]
+    install.triggers["trigger-new"] = {"id": "trigger-new", "eventName": "event.new"}
+    export_snapshot(client, new)
+
+    changes = [(change.kind, change.id, change.status, change.fields) for change in diff_snapshots(old, new)]
+
+    assert changes == [
+        ("rule", "rule-1", SnapshotChange.REMOVED, ()),
+        ("thing", "thing-1", SnapshotChange.CHANGED, ["name"]),
+        ("trigger", "trigger-new", SnapshotChange.ADDED, ()),
+    ]
+
+
+def test_import_leaves_channel_values_alone(client, install, tmp_path):
+    path = str(tmp_path / "snapshot.jsonl")
+    export_snapshot(client, path)
+
+    thing = install.things["thing-1"]
+    thing["name"] = "Renamed"
+    channel = next(channel for channel in thing["channels"].values() if not channel["sensor"])
+    value = channel["value"]
+    channel["value"] = "changed"
+
+    plan = plan_manifest(client, snapshot_manifest(path), ignore_missing=True)
+
+    assert [str(change) for change in plan.changes()] == ["rename \"Renamed\" -> \"Thing 1\""]
+
+    # only with channels=True actuators are set back
+    plan = plan_manifest(client, snapshot_manifest(path, channels=True), ignore_missing=True)
+
+    assert all(result.success for result in plan.execute())
+    assert thing["name"] == "Thing 1"
+    assert channel["value"] == value
+
+
+def test_cli_errors_exit_with_failure(server, tmp_path, monkeypatch):
+    for arguments in (["import", str(tmp_path / "missing.jsonl")], ["export", str(tmp_path / "missing" / "snapshot.jsonl")]):
+        monkeypatch.setattr(sys, "argv", ["qozy", "--port", str(server.port), "--no-colors", "snapshot"] + arguments)
+
+        with pytest.raises(SystemExit) as exit:
+            main()
+
+        assert exit.value.code == 1
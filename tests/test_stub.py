@@ -0,0 +1,96 @@
+import http.client
+import json
+from urllib.parse import urlsplit
+from qozy_client.stub import SyntheticInstall
+
+
+def _request(server, method, path, body=None, headers=None):
+    url = urlsplit(server.url)
+    connection = http.client.HTTPConnection(url.hostname, url.port)
+    connection.request(method, url.path + path, body=json.dumps(body) if body is not None else None, headers=headers or {})
+    response = connection.getresponse()
+
+    return response.status, response.getheader("ETag"), response.read()
+
+
+def test_synthetic_install_size():
+    install = SyntheticInstall(bridges=4, things=40, channels=3, rules=6, triggers=2)
+
+    assert len(install.bridges) == 4
+    assert len(install.things) == 40
+    assert all(len(thing["channels"]) == 3 for thing in install.things.values())
+    assert {thing["bridge_id"] for thing in install.things.values()} == set(install.bridges)
+    assert all(len(rule["triggers"]) == 2 for rule in install.rules.values())
+
+
+def test_synthetic_install_is_reproducible():
+    assert SyntheticInstall(seed=3).things == SyntheticInstall(seed=3).things
+
+
+def test_client_reads_install(client, install):
+    assert {thing.id for thing in client.things()} == set(install.things)
+    assert {bridge.id for bridge in client.bridges()} == set(install.bridges)
+    assert {rule.id for rule in client.rules()} == set(install.rules)
+
+
+def test_validators_are_revisions(server, install):
+    status, etag, _ = _request(server, "GET", "/things")
+
+    assert status == 200
+    # opaque, not derived from the payload
+    assert etag == install.etag()
+    assert _request(server, "GET", "/things", headers={"If-None-Match": etag})[0] == 304
+
+    _request(server, "PUT", "/things/thing-1/name", body="Renamed")
+
+    status, changed_etag, _ = _request(server, "GET", "/things", headers={"If-None-Match": etag})
+
+    assert status == 200
+    assert changed_etag != etag
+
+
+def test_direct_changes_need_touch(server, install):
+    _, etag, _ = _request(server, "GET", "/things")
+    install.things["thing-1"]["name"] = "Renamed"
+    install.touch()
+
+    assert _request(server, "GET", "/things", headers={"If-None-Match": etag})[0] == 200
+
+
+def test_bridge_settings_are_conditional(server, install):
+    _, etag, _ = _request(server, "GET", "/bridges/bridge-0")
+
+    # other changes don't touch the bridge's validator
+    _request(server, "PUT", "/things/thing-1/name", body="Renamed")
+
+    status, new_etag, _ = _request(server, "PATCH", "/bridges/bridge-0/settings", body={"port": 1}, headers={"If-Match": etag})
+
+    assert status == 200
+    assert new_etag != etag
+    assert install.bridges["bridge-0"]["settings"]["port"] == 1
+    assert _request(server, "PATCH", "/bridges/bridge-0/settings", body={"port": 2}, headers={"If-Match": etag})[0] == 412
+    assert _request(server, "PUT", "/bridges/bridge-0/settings", body={}, headers={"If-Match": etag})[0] == 412
+    assert install.bridges["bridge-0"]["settings"]["port"] == 1
+
+
+def test_unrouted_requests(server):
+    url = urlsplit(server.url)
+    connection = http.client.HTTPConnection(url.hostname, url.port)
+
+    # the body of an unanswered request doesn't spill into the next one on the connection
+    connection.request("PATCH", url.path + "/things", body=json.dumps({"a": 1}))
+    response = connection.getresponse()
+    response.read()
+
+    assert response.status == 405
+
+    connection.request("GET", url.path + "/unknown")
+    response = connection.getresponse()
+    response.read()
+
+    assert response.status == 404
+
+    connection.request("GET", url.path + "")
+    response = connection.getresponse()
+
+    assert json.loads(response.read()) == {"version": "0.1"}
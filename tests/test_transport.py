@@ -0,0 +1,60 @@
+import http.client
+import pytest
+from qozy_client.client import Client
+from qozy_client.stub import UnixStubServer
+from qozy_client.transport import UnixSocketTransport, create_transport, encode_params
+
+
+class DisconnectingConnection():
+    sock = None
+
+    def __init__(self, requests):
+        self.requests = requests
+
+    def request(self, method, target, body=None, headers=None):
+        self.requests.append(method)
+
+    def getresponse(self):
+        raise http.client.RemoteDisconnected("Remote end closed connection without response")
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def unix_server(install, tmp_path):
+    with UnixStubServer(str(tmp_path / "qozy.sock"), install) as server:
+        yield server
+
+
+def test_encode_params_drops_none():
+    assert encode_params({"tag": ["a", None, "b"], "expand": True, "since": None}) == "tag=a&tag=b&expand=True"
+    assert encode_params({"tag": [None]}) == ""
+    assert encode_params(None) == ""
+
+
+def test_unsupported_scheme():
+    with pytest.raises(ValueError):
+        create_transport("ftp://localhost/api")
+
+
+def test_unix_socket_transport(unix_server, install):
+    client = Client(url=unix_server.url)
+
+    try:
+        assert isinstance(client.transport, UnixSocketTransport)
+        assert len(list(client.things(filter_tags=[None]))) == len(install.things)
+    finally:
+        client.close()
+
+
+@pytest.mark.parametrize("method, attempts", [("GET", 2), ("DELETE", 2), ("POST", 1), ("PATCH", 1)])
+def test_only_idempotent_requests_are_retried(method, attempts):
+    transport = UnixSocketTransport("http+unix://%2Fnonexistent.sock/api")
+    requests = []
+    transport._connection = lambda timeout: DisconnectingConnection(requests)
+
+    with pytest.raises(http.client.RemoteDisconnected):
+        transport.request(method, "/things")
+
+    assert requests == [method] * attempts
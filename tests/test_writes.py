@@ -0,0 +1,59 @@
+import time
+from qozy_client.writes import WriteBehindQueue, WriteStats
+
+
+def _channel(install, thing_id):
+    return next(iter(install.things[thing_id]["channels"]))
+
+
+def test_coalesces_writes_to_the_latest_value(client, install):
+    queue = WriteBehindQueue(client)
+    channel = _channel(install, "thing-1")
+
+    for value in range(5):
+        queue.put("thing-1", channel, value)
+
+    queue.put("thing-2", _channel(install, "thing-2"), True)
+
+    assert queue.stats() == WriteStats(submitted=6, sent=0, dropped=4, failed=0, pending=2)
+    assert queue.flush() == 2
+    assert install.things["thing-1"]["channels"][channel]["value"] == 4
+    assert install.things["thing-2"]["channels"][_channel(install, "thing-2")]["value"] is True
+    assert client.transfer_stats.endpoints()["PUT /things/{id}/channels/{id}"].requests == 2
+    assert queue.stats().pending == 0
+
+
+def test_failed_writes_are_counted(client):
+    queue = WriteBehindQueue(client)
+    queue.put("thing-missing", "switch0", True)
+
+    assert queue.flush() == 1
+    assert queue.stats().failed == 1
+    assert queue.last_error is not None
+
+
+def test_background_flush(client, install):
+    queue = client.enable_write_behind(interval=0.05, idle=0.01)
+    channel = client.thing("thing-1").channel(_channel(install, "thing-1"))
+
+    channel.apply(1)
+    channel.apply(2)
+
+    deadline = time.monotonic() + 5
+
+    while queue.stats().sent < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert install.things["thing-1"]["channels"][channel.channel]["value"] == 2
+    assert queue.stats().sent == 1
+
+
+def test_stop_sends_pending_writes(client, install):
+    queue = WriteBehindQueue(client, interval=60, idle=60).start()
+    channel = _channel(install, "thing-1")
+    queue.put("thing-1", channel, 7)
+
+    queue.stop()
+
+    assert install.things["thing-1"]["channels"][channel]["value"] == 7
+    assert queue.stats().sent == 1